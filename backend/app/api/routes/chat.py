@@ -5,44 +5,59 @@ Chat API endpoints for AI ChatBot
 Handles text-based chat interactions
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
-from typing import List, Optional
+from typing import Dict, Optional, Tuple
+import asyncio
+import base64
+import binascii
 import structlog
-from uuid import uuid4
 
 from app.models.chat import (
     ChatRequest,
     ChatResponse,
     ChatHistory,
     ConversationSummary,
-    Message,
-    ChatSettings
+    ConversationList,
+    Message
 )
+from app.core.config import get_settings
 from app.services.ai_service import AIService
 from app.services.memory_service import MemoryService
-from app.core.exceptions import AIServiceException, MemoryServiceException
+from app.core.exceptions import ChatBotException, MemoryServiceException
 from app.services.message_handler_service import MessageHandlerService
-from app.services.research_service import ResearchService
+
 logger = structlog.get_logger()
 router = APIRouter()
 
+settings = get_settings()
+
+# Backpressure for /message: cap concurrent AI calls and shed load past the queue limit
+_chat_semaphore = asyncio.Semaphore(settings.chat_max_concurrency)
+_chat_queue_depth = 0
+
+
+def get_ai_service(request: Request) -> AIService:
+    """Dependency to get the app-scoped AI service instance"""
+    return request.app.state.ai_service
 
-def get_ai_service() -> AIService:
-    """Dependency to get AI service instance"""
-    return AIService()
 
+def get_memory_service(request: Request) -> MemoryService:
+    """Dependency to get the app-scoped memory service instance"""
+    return request.app.state.memory_service
 
-def get_memory_service() -> MemoryService:
-    """Dependency to get memory service instance"""
-    return MemoryService()
 
+def get_message_handler_service(request: Request) -> MessageHandlerService:
+    return request.app.state.message_handler_service
 
-def get_message_handler_service() -> MessageHandlerService:
-    return MessageHandlerService()
 
-def get_research_service() -> ResearchService:
-    return ResearchService()
+def get_chat_load() -> Dict[str, int]:
+    """Get current /message load for metrics"""
+    return {
+        "queue_depth": _chat_queue_depth,
+        "max_queue_depth": settings.chat_max_queue_depth,
+        "max_concurrency": settings.chat_max_concurrency
+    }
 
 
 @router.post("/message", response_model=ChatResponse)
@@ -53,9 +68,17 @@ async def send_message(
 ) -> ChatResponse:
     """Send a chat message and get AI response"""
 
+    global _chat_queue_depth
+    if _chat_queue_depth >= settings.chat_max_queue_depth:
+        logger.warning("Chat queue full, rejecting message", queue_depth=_chat_queue_depth)
+        raise HTTPException(status_code=429, detail="Server is overloaded, please retry later")
+
+    _chat_queue_depth += 1
     try:
-        user_msg = Message(content=request.message, role="user", session_id=request.session_id)
-        result = await handler_service.process_message(request.session_id, user_msg)
+        # ChatRequest already validated and stripped the message, so skip re-validation
+        user_msg = Message.model_construct(content=request.message, role="user", session_id=request.session_id)
+        async with _chat_semaphore:
+            result = await handler_service.process_message(request.session_id, user_msg)
         return ChatResponse(
             response=result["message"],
             session_id=result["session_id"],
@@ -74,60 +97,66 @@ async def send_message(
                     details=e.details)
         raise HTTPException(status_code=400, detail=e.message)
     except Exception as e:
-        logger.error("Unexpected error in chat endpoint", error=str(e), exc_info=True)
+        # Tracebacks are costly to format on a hot error path; only include them in debug
+        logger.error("Unexpected error in chat endpoint", error=str(e), exc_info=settings.debug)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    finally:
+        _chat_queue_depth -= 1
+
 
 @router.get("/history/{session_id}", response_model=ChatHistory)
 async def get_chat_history(
     session_id: str,
-    page: int = 1,
-    page_size: int = 50,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
     memory_service: MemoryService = Depends(get_memory_service)
 ) -> ChatHistory:
-    """Get chat history for a session"""
+    """Get chat history for a session (keyset pagination via `cursor`)"""
 
     try:
-        # Validate pagination parameters
-        if page < 1:
-            raise HTTPException(status_code=400, detail="Page must be >= 1")
-        if page_size < 1 or page_size > 100:
-            raise HTTPException(status_code=400, detail="Page size must be between 1 and 100")
+        if page is not None or page_size is not None:
+            return await _get_chat_history_by_page(
+                session_id, page or 1, page_size or 50, memory_service
+            )
 
-        # Calculate offset
-        offset = (page - 1) * page_size
+        # Validate pagination parameters
+        if limit < 1 or limit > 100:
+            raise HTTPException(status_code=400, detail="Limit must be between 1 and 100")
 
-        # Get messages
-        messages = await memory_service.get_conversation_history(
+        # Get messages older than the cursor, one extra to check if there are more
+        messages = await memory_service.get_conversation_history_after(
             session_id,
-            limit=page_size + 1,  # Get one extra to check if there are more
-            offset=offset
+            cursor=cursor,
+            limit=limit + 1
         )
 
-        # Check if there are more messages
-        has_more = len(messages) > page_size
+        # The extra message, if any, is the oldest one
+        has_more = len(messages) > limit
         if has_more:
-            messages = messages[:page_size]
+            messages = messages[1:]
 
-        # Get total message count
-        conversation = await memory_service.load_conversation(session_id)
-        total_messages = conversation.message_count if conversation else 0
+        next_cursor = messages[0].id if has_more else None
 
         logger.info("Chat history retrieved",
                    session_id=session_id,
-                   page=page,
-                   page_size=page_size,
+                   cursor=cursor,
+                   limit=limit,
                    returned_messages=len(messages))
 
         return ChatHistory(
             session_id=session_id,
             messages=messages,
-            total_messages=total_messages,
-            page=page,
-            page_size=page_size,
-            has_more=has_more
+            page_size=limit,
+            has_more=has_more,
+            next_cursor=next_cursor
         )
 
+    except HTTPException:
+        raise
+
     except MemoryServiceException as e:
         logger.error("Memory service error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -137,37 +166,109 @@ async def get_chat_history(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/conversations", response_model=List[ConversationSummary])
+async def _get_chat_history_by_page(
+    session_id: str,
+    page: int,
+    page_size: int,
+    memory_service: MemoryService
+) -> ChatHistory:
+    """Offset-based history pagination (deprecated, use `cursor` instead)"""
+
+    logger.warning("Deprecated page/page_size pagination used for chat history",
+                  session_id=session_id)
+
+    # Validate pagination parameters
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Page must be >= 1")
+    if page_size < 1 or page_size > 100:
+        raise HTTPException(status_code=400, detail="Page size must be between 1 and 100")
+
+    # Calculate offset
+    offset = (page - 1) * page_size
+
+    # Get messages
+    messages = await memory_service.get_conversation_history(
+        session_id,
+        limit=page_size + 1,  # Get one extra to check if there are more
+        offset=offset
+    )
+
+    # Check if there are more messages
+    has_more = len(messages) > page_size
+    if has_more:
+        messages = messages[:page_size]
+
+    # Get total message count
+    total_messages = await memory_service.get_message_count(session_id)
+
+    logger.info("Chat history retrieved",
+               session_id=session_id,
+               page=page,
+               page_size=page_size,
+               returned_messages=len(messages))
+
+    return ChatHistory(
+        session_id=session_id,
+        messages=messages,
+        total_messages=total_messages,
+        page=page,
+        page_size=page_size,
+        has_more=has_more
+    )
+
+
+def _encode_conversation_cursor(summary: ConversationSummary) -> str:
+    """Encode the (updated_at, session_id) position of a conversation"""
+    raw = f"{summary.updated_at.timestamp()!r}:{summary.session_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_conversation_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode a cursor produced by `_encode_conversation_cursor`"""
+    try:
+        timestamp, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        return float(timestamp), session_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/conversations", response_model=ConversationList)
 async def list_conversations(
-    page: int = 1,
-    page_size: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = 20,
     memory_service: MemoryService = Depends(get_memory_service)
-) -> List[ConversationSummary]:
-    """List all conversations"""
+) -> ConversationList:
+    """List conversations, newest first (keyset pagination via `cursor`)"""
 
     try:
         # Validate pagination parameters
-        if page < 1:
-            raise HTTPException(status_code=400, detail="Page must be >= 1")
-        if page_size < 1 or page_size > 50:
-            raise HTTPException(status_code=400, detail="Page size must be between 1 and 50")
-
-        # Calculate offset
-        offset = (page - 1) * page_size
-
-        # Get conversations
-        conversations = await memory_service.list_conversations(
-            limit=page_size,
-            offset=offset
+        if limit < 1 or limit > 50:
+            raise HTTPException(status_code=400, detail="Limit must be between 1 and 50")
+
+        before = _decode_conversation_cursor(cursor) if cursor else None
+
+        # Get conversations, one extra to check if there are more
+        conversations = await memory_service.list_conversations_after(
+            before=before,
+            limit=limit + 1
         )
 
+        has_more = len(conversations) > limit
+        if has_more:
+            conversations = conversations[:limit]
+
         logger.info("Conversations listed",
-                   page=page,
-                   page_size=page_size,
+                   limit=limit,
                    returned_count=len(conversations))
 
-        return conversations
+        return ConversationList(
+            conversations=conversations,
+            has_more=has_more,
+            next_cursor=_encode_conversation_cursor(conversations[-1]) if has_more else None
+        )
 
+    except HTTPException:
+        raise
     except MemoryServiceException as e:
         logger.error("Memory service error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -219,10 +320,10 @@ async def export_conversation(
                 detail="Format must be one of: json, txt, markdown"
             )
 
-        # Export conversation
-        exported_data = await memory_service.export_conversation(session_id, format)
+        # Export conversation as a chunk stream
+        exported_chunks = await memory_service.iter_export_conversation(session_id, format)
 
-        if not exported_data:
+        if exported_chunks is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
         # Set content type and filename
@@ -239,11 +340,14 @@ async def export_conversation(
                    format=format)
 
         return StreamingResponse(
-            iter([exported_data]),
+            exported_chunks,
             media_type=content_types[format],
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
 
+    except HTTPException:
+        raise
+
     except MemoryServiceException as e:
         logger.error("Memory service error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -317,7 +421,7 @@ async def get_ai_providers(
     """Get information about available AI providers"""
 
     try:
-        provider_info = ai_service.get_provider_info()
+        provider_info = await ai_service.get_provider_info()
         return provider_info
 
     except Exception as e:
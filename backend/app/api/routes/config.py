@@ -5,10 +5,13 @@ Configuration API endpoints for AI ChatBot
 Handles runtime configuration management
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import Dict, Any, Optional, Tuple
 import structlog
-import json
+import asyncio
+import anyio
+import orjson
 from pathlib import Path
 
 from app.core.config import get_settings
@@ -19,57 +22,151 @@ from app.utils.prompts import PromptManager
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Settings updates are flushed to disk in the background once a burst settles
+SETTINGS_SAVE_DEBOUNCE = 0.5  # seconds
+_pending_settings_save = asyncio.Event()
+
+# Public configuration layout: section -> response key -> Settings field
+CONFIG_SNAPSHOT_LAYOUT = {
+    "ai": {
+        "model": "openai_model",
+        "max_tokens": "max_tokens",
+        "temperature": "temperature",
+        "top_p": "top_p",
+        "frequency_penalty": "frequency_penalty",
+        "presence_penalty": "presence_penalty"
+    },
+    "voice": {
+        "model": "whisper_model",
+        "enabled": "voice_enabled",
+        "auto_send": "auto_send_after_transcription",
+        "max_duration": "max_audio_duration",
+        "sample_rate": "audio_sample_rate",
+        "channels": "audio_channels"
+    },
+    "memory": {
+        "type": "memory_type",
+        "max_history": "max_history_messages",
+        "auto_save": "auto_save"
+    },
+    "server": {
+        "host": "host",
+        "port": "port",
+        "debug": "debug",
+        "log_level": "log_level"
+    },
+    "features": {
+        "voice_output": "feature_voice_output",
+        "file_upload": "feature_file_upload",
+        "multi_language": "feature_multi_language",
+        "streaming_responses": "beta_streaming_responses",
+        "conversation_search": "beta_conversation_search"
+    }
+}
+_CONFIG_SNAPSHOT_FIELDS = {
+    field for fields in CONFIG_SNAPSHOT_LAYOUT.values() for field in fields.values()
+}
+# Built on first GET / and dropped whenever settings are updated
+_config_snapshot: Optional[Dict[str, Any]] = None
+# Serialized GET /voice body, dropped along with the snapshot
+_voice_settings_body: Optional[bytes] = None
+
+DEFAULT_CONFIGURATION = {
+    "chat": {
+        "model": "gpt-3.5-turbo",
+        "temperature": 0.7,
+        "max_tokens": 1000,
+        "context_window": 10
+    },
+    "voice": {
+        "model": "base",
+        "language": "auto",
+        "task": "transcribe",
+        "auto_send": True
+    },
+    "memory": {
+        "type": "json",
+        "max_history": 50,
+        "auto_save": True
+    },
+    "ui": {
+        "theme": "auto",
+        "animations": True,
+        "auto_scroll": True
+    }
+}
+
+# Parsed flows.json keyed on its st_mtime_ns, reused while the file is unchanged
+_flows_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+
+# orjson writes UTF-8 directly, matching json.dump(..., ensure_ascii=False)
+JSON_WRITE_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+
+def get_prompt_manager(request: Request) -> PromptManager:
+    """Dependency to get the app-scoped prompt manager instance"""
+    return request.app.state.prompt_manager
+
+
+def _write_json_file(path: Path, content: Dict[str, Any]):
+    """Serialize and write a JSON config file (blocking; run it in a worker thread)"""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(orjson.dumps(content, option=JSON_WRITE_OPTIONS))
+
+
+def _invalidate_config_snapshot():
+    """Drop the memoized configuration after a settings update"""
+
+    global _config_snapshot, _voice_settings_body
+    _config_snapshot = None
+    _voice_settings_body = None
+
+
+async def persist_settings_loop(debounce: float = SETTINGS_SAVE_DEBOUNCE):
+    """Save settings after updates, coalescing bursts (run as a background task)"""
 
-def get_prompt_manager() -> PromptManager:
-    """Dependency to get prompt manager instance"""
-    return PromptManager()
+    while True:
+        await _pending_settings_save.wait()
+        await asyncio.sleep(debounce)
+        await flush_settings()
+
+
+async def flush_settings():
+    """Write pending settings changes to settings.json"""
+
+    if not _pending_settings_save.is_set():
+        return
+    _pending_settings_save.clear()
+
+    settings = get_settings()
+    try:
+        await anyio.to_thread.run_sync(
+            settings.save_to_file, str(Path(settings.config_path) / "settings.json")
+        )
+    except Exception as e:
+        logger.error("Failed to save settings", error=str(e))
 
 
 @router.get("/")
 async def get_configuration() -> Dict[str, Any]:
     """Get current configuration"""
 
-    settings = get_settings()
+    global _config_snapshot
+    if _config_snapshot is None:
+        _config_snapshot = _build_config_snapshot()
+
+    return _config_snapshot
 
-    # Return safe configuration (no secrets)
-    config = {
-        "ai": {
-            "model": settings.openai_model,
-            "max_tokens": settings.max_tokens,
-            "temperature": settings.temperature,
-            "top_p": settings.top_p,
-            "frequency_penalty": settings.frequency_penalty,
-            "presence_penalty": settings.presence_penalty
-        },
-        "voice": {
-            "model": settings.whisper_model,
-            "enabled": settings.voice_enabled,
-            "auto_send": settings.auto_send_after_transcription,
-            "max_duration": settings.max_audio_duration,
-            "sample_rate": settings.audio_sample_rate,
-            "channels": settings.audio_channels
-        },
-        "memory": {
-            "type": settings.memory_type,
-            "max_history": settings.max_history_messages,
-            "auto_save": settings.auto_save
-        },
-        "server": {
-            "host": settings.host,
-            "port": settings.port,
-            "debug": settings.debug,
-            "log_level": settings.log_level
-        },
-        "features": {
-            "voice_output": settings.feature_voice_output,
-            "file_upload": settings.feature_file_upload,
-            "multi_language": settings.feature_multi_language,
-            "streaming_responses": settings.beta_streaming_responses,
-            "conversation_search": settings.beta_conversation_search
-        }
-    }
 
-    return config
+def _build_config_snapshot() -> Dict[str, Any]:
+    """Build the safe configuration (no secrets) from current settings"""
+
+    values = get_settings().model_dump(include=_CONFIG_SNAPSHOT_FIELDS)
+    return {
+        section: {key: values[field] for key, field in fields.items()}
+        for section, fields in CONFIG_SNAPSHOT_LAYOUT.items()
+    }
 
 
 @router.get("/chat", response_model=ChatSettings)
@@ -78,7 +175,8 @@ async def get_chat_settings() -> ChatSettings:
 
     settings = get_settings()
 
-    return ChatSettings(
+    # Values come from the already validated Settings, so skip re-validation
+    return ChatSettings.model_construct(
         model=settings.openai_model,
         temperature=settings.temperature,
         max_tokens=settings.max_tokens,
@@ -105,8 +203,9 @@ async def update_chat_settings(
     settings.presence_penalty = chat_settings.presence_penalty
     settings.context_window = chat_settings.context_window
 
-    # Save updated settings to file
-    settings.save_to_file(str(Path(settings.config_path) / "settings.json"))
+    # Save updated settings to file in the background
+    _invalidate_config_snapshot()
+    _pending_settings_save.set()
 
     logger.info("Chat settings updated", settings=chat_settings.dict())
 
@@ -114,16 +213,21 @@ async def update_chat_settings(
 
 
 @router.get("/voice", response_model=VoiceSettings)
-async def get_voice_settings() -> VoiceSettings:
+async def get_voice_settings() -> Response:
     """Get voice-specific settings"""
 
-    settings = get_settings()
+    global _voice_settings_body
+    if _voice_settings_body is None:
+        settings = get_settings()
 
-    return VoiceSettings(
-        model=settings.whisper_model,
-        language="auto",  # Default
-        task="transcribe"
-    )
+        # Values come from the already validated Settings, so skip re-validation
+        _voice_settings_body = VoiceSettings.model_construct(
+            model=settings.whisper_model,
+            language="auto",  # Default
+            task="transcribe"
+        ).model_dump_json().encode()
+
+    return Response(content=_voice_settings_body, media_type="application/json")
 
 
 @router.post("/voice", response_model=VoiceSettings)
@@ -142,8 +246,9 @@ async def update_voice_settings(
     settings.voice_enabled = True # Assuming voice is enabled when settings are updated
     settings.auto_send_after_transcription = voice_settings.auto_send # Assuming auto_send is part of VoiceSettings
 
-    # Save updated settings to file
-    settings.save_to_file(str(Path(settings.config_path) / "settings.json"))
+    # Save updated settings to file in the background
+    _invalidate_config_snapshot()
+    _pending_settings_save.set()
 
     logger.info("Voice settings updated", settings=voice_settings.dict())
 
@@ -155,19 +260,26 @@ async def get_flow_configuration() -> Dict[str, Any]:
     """Get flow configuration from flows.json"""
 
     try:
+        global _flows_cache
+
         settings = get_settings()
         flows_file = Path(settings.config_path) / "flows.json"
 
-        if flows_file.exists():
-            with open(flows_file, 'r', encoding='utf-8') as f:
-                flows = json.load(f)
-
-            logger.info("Flow configuration retrieved")
-            return flows
-        else:
+        try:
+            stat = await anyio.to_thread.run_sync(flows_file.stat)
+        except FileNotFoundError:
             logger.warning("Flows configuration file not found")
             return {"error": "Flows configuration not found"}
 
+        if _flows_cache is not None and _flows_cache[0] == stat.st_mtime_ns:
+            return _flows_cache[1]
+
+        flows = orjson.loads(await anyio.to_thread.run_sync(flows_file.read_bytes))
+        _flows_cache = (stat.st_mtime_ns, flows)
+
+        logger.info("Flow configuration retrieved")
+        return flows
+
     except Exception as e:
         logger.error("Failed to load flows configuration", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to load configuration")
@@ -193,9 +305,7 @@ async def update_flow_configuration(
                 )
 
         # Save flows configuration
-        flows_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(flows_file, 'w', encoding='utf-8') as f:
-            json.dump(flows, f, indent=2, ensure_ascii=False)
+        await anyio.to_thread.run_sync(_write_json_file, flows_file, flows)
 
         logger.info("Flow configuration updated")
 
@@ -213,7 +323,9 @@ async def get_prompts(
     """Get prompt templates"""
 
     try:
-        # Return current prompts
+        # Pick up external edits to prompts.json; a no-op while its mtime is unchanged
+        await anyio.to_thread.run_sync(prompt_manager.refresh)
+
         return prompt_manager.prompts
 
     except Exception as e:
@@ -232,8 +344,8 @@ async def update_prompts(
         settings = get_settings()
         prompts_file = Path(settings.config_path) / "prompts.json"
 
-        # Validate prompts structure
-        validation_result = prompt_manager.validate_prompt_config()
+        # Validate the incoming prompts before they reach the disk
+        validation_result = prompt_manager.validate_payload(prompts)
         if not validation_result["valid"]:
             raise HTTPException(
                 status_code=400,
@@ -241,17 +353,17 @@ async def update_prompts(
             )
 
         # Save prompts
-        prompts_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(prompts_file, 'w', encoding='utf-8') as f:
-            json.dump(prompts, f, indent=2, ensure_ascii=False)
+        await anyio.to_thread.run_sync(_write_json_file, prompts_file, prompts)
 
-        # Reload prompts
-        prompt_manager.reload_prompts()
+        # Use the payload we just wrote instead of re-reading the file
+        await anyio.to_thread.run_sync(prompt_manager.apply, prompts)
 
         logger.info("Prompts updated")
 
         return {"message": "Prompts updated successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to update prompts", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to update prompts")
@@ -264,7 +376,7 @@ async def reload_prompts(
     """Reload prompts from file"""
 
     try:
-        prompt_manager.reload_prompts()
+        await anyio.to_thread.run_sync(prompt_manager.reload_prompts)
 
         logger.info("Prompts reloaded")
 
@@ -318,30 +430,8 @@ async def get_environment_info() -> Dict[str, Any]:
 
 
 @router.get("/defaults")
-async def get_default_configuration() -> Dict[str, Any]:
+async def get_default_configuration() -> ORJSONResponse:
     """Get default configuration values"""
 
-    return {
-        "chat": {
-            "model": "gpt-3.5-turbo",
-            "temperature": 0.7,
-            "max_tokens": 1000,
-            "context_window": 10
-        },
-        "voice": {
-            "model": "base",
-            "language": "auto",
-            "task": "transcribe",
-            "auto_send": True
-        },
-        "memory": {
-            "type": "json",
-            "max_history": 50,
-            "auto_save": True
-        },
-        "ui": {
-            "theme": "auto",
-            "animations": True,
-            "auto_scroll": True
-        }
-    }
+    # Static payload: serialize directly, skipping response validation and caching
+    return ORJSONResponse(DEFAULT_CONFIGURATION)
@@ -5,15 +5,20 @@ Health check endpoints for AI ChatBot
 System status and monitoring endpoints
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import ORJSONResponse
 from typing import Dict, Any
 import structlog
+import asyncio
+import anyio
 import time
 import psutil
 import platform
 from datetime import datetime
+from functools import lru_cache
 
 from app.core.config import get_settings
+from app.api.routes.chat import get_chat_load
 from app.services.ai_service import AIService
 from app.services.voice_service import VoiceService
 from app.services.memory_service import MemoryService
@@ -22,74 +27,82 @@ from app.services.vector_memory_service import VectorMemoryService
 logger = structlog.get_logger()
 router = APIRouter()
 
+SERVICE_HEALTH_TIMEOUT = 2.0  # seconds
+MEMORY_TOTAL_TTL = 10.0  # seconds
+_memory_total_cache: Dict[str, float] = {"value": 0, "expires_at": 0.0}
+
+METRICS_SAMPLE_INTERVAL = 5.0  # seconds
+_latest_metrics: Dict[str, Any] = {}
+_process = psutil.Process()
+
+# Probes are hit several times per second; format the timestamp at most once per second
+_timestamp_cache: Dict[str, Any] = {"second": None, "value": ""}
+
+HEALTH_STATUS = {
+    "status": "healthy",
+    "service": "AI ChatBot",
+    "version": "1.0.0"
+}
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in ISO format, cached per wall-clock second"""
+
+    now = time.time()
+    second = int(now)
+    if _timestamp_cache["second"] != second:
+        _timestamp_cache["value"] = datetime.utcfromtimestamp(now).isoformat()
+        _timestamp_cache["second"] = second
+    return _timestamp_cache["value"]
+
 
 @router.get("/")
-async def health_check() -> Dict[str, Any]:
+async def health_check() -> ORJSONResponse:
     """Basic health check endpoint"""
 
-    return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "service": "AI ChatBot",
-        "version": "1.0.0"
-    }
+    return ORJSONResponse({**HEALTH_STATUS, "timestamp": _utc_timestamp()})
 
 
 @router.get("/detailed")
-async def detailed_health_check() -> Dict[str, Any]:
+async def detailed_health_check(request: Request) -> Dict[str, Any]:
     """Detailed health check with service status"""
 
     start_time = time.time()
     settings = get_settings()
 
-    # Initialize services
-    ai_service = AIService()
-    voice_service = VoiceService()
-    memory_service = MemoryService()
-    vector_service = VectorMemoryService()
+    # Reuse the app-scoped services
+    ai_service: AIService = request.app.state.ai_service
+    voice_service: VoiceService = request.app.state.voice_service
+    memory_service: MemoryService = request.app.state.memory_service
+    vector_service: VectorMemoryService = request.app.state.vector_memory_service
+
+    # Check all services concurrently, each bounded so a hung dependency can't stall the probe
+    checks = {
+        "ai_service": ai_service.health_check(),
+        "voice_service": voice_service.health_check(),
+        "memory_service": memory_service.health_check(),  # Redis/JSON
+        "vector_memory_service": vector_service.health_check()  # ChromaDB
+    }
+    *results, system_info = await asyncio.gather(
+        *(asyncio.wait_for(check, timeout=SERVICE_HEALTH_TIMEOUT) for check in checks.values()),
+        get_system_info(),
+        return_exceptions=True
+    )
 
-    # Check each service
     services_status = {}
-
-    # AI Service
-    try:
-        ai_health = await ai_service.health_check()
-        services_status["ai_service"] = ai_health
-    except Exception as e:
-        services_status["ai_service"] = {
-            "status": "unhealthy",
-            "error": str(e)
-        }
-
-    # Voice Service
-    try:
-        voice_health = await voice_service.health_check()
-        services_status["voice_service"] = voice_health
-    except Exception as e:
-        services_status["voice_service"] = {
-            "status": "unhealthy",
-            "error": str(e)
-        }
-
-    # Memory Service (Redis/JSON)
-    try:
-        mem_health = await memory_service.health_check()
-        services_status["memory_service"] = mem_health
-    except Exception as e:
-        services_status["memory_service"] = {
-            "status": "unhealthy",
-            "error": str(e)
-        }
-
-    # Vector DB (ChromaDB)
-    try:
-        chroma_health = await vector_service.health_check()
-        services_status["vector_memory_service"] = chroma_health
-    except Exception as e:
-        services_status["vector_memory_service"] = {
-            "status": "unhealthy",
-            "error": str(e)
-        }
+    for name, result in zip(checks, results):
+        if isinstance(result, asyncio.TimeoutError):
+            services_status[name] = {
+                "status": "unhealthy",
+                "error": f"Health check timed out after {SERVICE_HEALTH_TIMEOUT}s"
+            }
+        elif isinstance(result, Exception):
+            services_status[name] = {
+                "status": "unhealthy",
+                "error": str(result)
+            }
+        else:
+            services_status[name] = result
 
     # Overall status
     all_healthy = all(
@@ -101,10 +114,10 @@ async def detailed_health_check() -> Dict[str, Any]:
 
     return {
         "status": "healthy" if all_healthy else "degraded",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _utc_timestamp(),
         "response_time": response_time,
         "services": services_status,
-        "system": await get_system_info(),
+        "system": system_info,
         "configuration": {
             "debug_mode": settings.debug,
             "log_level": settings.log_level,
@@ -123,19 +136,28 @@ async def system_info() -> Dict[str, Any]:
 
 @router.get("/metrics")
 async def metrics() -> Dict[str, Any]:
-    """Basic metrics endpoint"""
+    """Basic metrics endpoint (served from the background sampler)"""
+
+    sample = _latest_metrics or await anyio.to_thread.run_sync(_sample_metrics)
+
+    return {
+        "timestamp": _utc_timestamp(),
+        **sample,
+        "chat": get_chat_load()
+    }
+
+
+def _sample_metrics() -> Dict[str, Any]:
+    """Collect system and process metrics (blocking)"""
 
-    # Get system metrics
-    cpu_percent = psutil.cpu_percent(interval=1)
+    # Non-blocking: CPU usage since the previous sample
+    cpu_percent = psutil.cpu_percent(interval=None)
     memory = psutil.virtual_memory()
     disk = psutil.disk_usage('/')
 
-    # Get process metrics
-    process = psutil.Process()
-    process_memory = process.memory_info()
+    process_memory = _process.memory_info()
 
     return {
-        "timestamp": datetime.utcnow().isoformat(),
         "system": {
             "cpu_percent": cpu_percent,
             "memory_total": memory.total,
@@ -148,13 +170,24 @@ async def metrics() -> Dict[str, Any]:
         "process": {
             "memory_rss": process_memory.rss,
             "memory_vms": process_memory.vms,
-            "cpu_percent": process.cpu_percent(),
-            "num_threads": process.num_threads(),
-            "create_time": process.create_time()
+            "cpu_percent": _process.cpu_percent(),
+            "num_threads": _process.num_threads(),
+            "create_time": _process.create_time()
         }
     }
 
 
+async def sample_metrics_loop(interval: float = METRICS_SAMPLE_INTERVAL):
+    """Refresh the cached metrics every `interval` seconds (run as a background task)"""
+
+    while True:
+        try:
+            _latest_metrics.update(await anyio.to_thread.run_sync(_sample_metrics))
+        except Exception as e:
+            logger.warning("Failed to sample metrics", error=str(e))
+        await asyncio.sleep(interval)
+
+
 @router.get("/readiness")
 async def readiness_check() -> Dict[str, Any]:
     """Kubernetes readiness probe endpoint"""
@@ -172,7 +205,7 @@ async def readiness_check() -> Dict[str, Any]:
 
         return {
             "status": "ready",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": _utc_timestamp()
         }
 
     except Exception as e:
@@ -184,29 +217,48 @@ async def readiness_check() -> Dict[str, Any]:
 
 
 @router.get("/liveness")
-async def liveness_check() -> Dict[str, Any]:
+async def liveness_check() -> ORJSONResponse:
     """Kubernetes liveness probe endpoint"""
 
-    return {
+    return ORJSONResponse({
         "status": "alive",
-        "timestamp": datetime.utcnow().isoformat(),
-        "uptime": time.time() - psutil.Process().create_time()
+        "timestamp": _utc_timestamp(),
+        "uptime": time.time() - _process.create_time()
+    })
+
+
+@lru_cache(maxsize=1)
+def _get_static_system_info() -> Dict[str, Any]:
+    """Get host information that never changes in-process"""
+
+    return {
+        "platform": platform.platform(),
+        "python_version": platform.python_version(),
+        "architecture": platform.architecture(),
+        "processor": platform.processor(),
+        "hostname": platform.node(),
+        "cpu_count": psutil.cpu_count(),
+        "boot_time": psutil.boot_time()
     }
 
 
+def _get_memory_total() -> int:
+    """Get total system memory, refreshed at most every MEMORY_TOTAL_TTL seconds"""
+
+    now = time.monotonic()
+    if now >= _memory_total_cache["expires_at"]:
+        _memory_total_cache["value"] = psutil.virtual_memory().total
+        _memory_total_cache["expires_at"] = now + MEMORY_TOTAL_TTL
+    return _memory_total_cache["value"]
+
+
 async def get_system_info() -> Dict[str, Any]:
     """Get system information"""
 
     try:
         return {
-            "platform": platform.platform(),
-            "python_version": platform.python_version(),
-            "architecture": platform.architecture(),
-            "processor": platform.processor(),
-            "hostname": platform.node(),
-            "cpu_count": psutil.cpu_count(),
-            "memory_total": psutil.virtual_memory().total,
-            "boot_time": psutil.boot_time()
+            **_get_static_system_info(),
+            "memory_total": _get_memory_total()
         }
     except Exception as e:
         logger.warning("Failed to get system info", error=str(e))
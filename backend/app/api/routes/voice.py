@@ -5,20 +5,25 @@ Voice API endpoints for AI ChatBot
 Handles audio upload and speech-to-text processing
 """
 
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, UploadFile, File, Form, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Optional, Literal, Tuple, Dict, Any, AsyncIterator
 import structlog
+import orjson
+import time
 from uuid import uuid4
 
 from app.models.voice import (
     VoiceRequest,
     VoiceResponse,
     TranscriptionResult,
-    AudioFile,
+    AudioFileDTO,
     VoiceSettings,
     AudioProcessingStatus
 )
-from app.services.voice_service import VoiceService
+from app.core.config import get_settings
+from app.services.voice_service import VoiceService, get_audio_size
 from app.services.memory_service import MemoryService
 from app.models.chat import Message
 from app.core.exceptions import VoiceServiceException, MemoryServiceException
@@ -26,23 +31,125 @@ from app.core.exceptions import VoiceServiceException, MemoryServiceException
 logger = structlog.get_logger()
 router = APIRouter()
 
+WHISPER_MODELS = [
+    {
+        "name": "tiny",
+        "quantization": ["fp32", "int8"],
+        "size": "39 MB",
+        "speed": "Very Fast",
+        "accuracy": "Low"
+    },
+    {
+        "name": "base",
+        "quantization": ["fp32", "int8", "int4"],
+        "size": "74 MB",
+        "speed": "Fast",
+        "accuracy": "Medium"
+    },
+    {
+        "name": "small",
+        "quantization": ["fp32", "int8", "int4"],
+        "size": "244 MB",
+        "speed": "Medium",
+        "accuracy": "Good"
+    },
+    {
+        "name": "medium",
+        "quantization": ["fp32", "int8", "int4"],
+        "size": "769 MB",
+        "speed": "Slow",
+        "accuracy": "Very Good"
+    },
+    {
+        "name": "large",
+        "quantization": ["fp32", "int8", "int4"],
+        "size": "1550 MB",
+        "speed": "Very Slow",
+        "accuracy": "Excellent"
+    }
+]
+
+SUPPORTED_LANGUAGES = ["auto", "en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh"]
+
+# Serialized GET /models body keyed on (whisper_model, whisper_quantization)
+_models_body: Optional[Tuple[Tuple[str, str], bytes]] = None
+
+# GET /settings always returns the defaults
+DEFAULT_VOICE_SETTINGS_JSON = VoiceSettings().model_dump_json().encode()
+
+
+def get_voice_service(request: Request) -> VoiceService:
+    """Dependency to get the app-scoped voice service instance"""
+    return request.app.state.voice_service
+
+
+def get_memory_service(request: Request) -> MemoryService:
+    """Dependency to get the app-scoped memory service instance"""
+    return request.app.state.memory_service
+
+
+async def _save_transcription_message(
+    memory_service: MemoryService,
+    session_id: str,
+    message: Message
+):
+    """Save an auto-sent transcription to chat memory (run as a background task)"""
+
+    try:
+        await memory_service.add_message(session_id, message)
+        logger.info("Voice transcription auto-sent to chat",
+                   session_id=session_id,
+                   message_id=message.id)
+    except Exception as e:
+        logger.warning("Failed to auto-send transcription to chat",
+                      session_id=session_id,
+                      error=str(e))
+
+
+AUDIO_CONTENT_TYPE_PREFIX = b"audio/"
 
-def get_voice_service() -> VoiceService:
-    """Dependency to get voice service instance"""
-    return VoiceService()
 
+def _audio_content_type(audio: UploadFile) -> Optional[str]:
+    """The upload's audio content type, or None if it isn't audio.
 
-def get_memory_service() -> MemoryService:
-    """Dependency to get memory service instance"""
-    return MemoryService()
+    Checks the raw part header bytes, so the header is decoded once and only
+    for audio uploads.
+    """
+
+    for name, value in audio.headers.raw:
+        if name == b"content-type":
+            return value.decode("latin-1") if value.startswith(AUDIO_CONTENT_TYPE_PREFIX) else None
+    return None
+
+
+def _voice_settings(language: Optional[str], task: str) -> VoiceSettings:
+    """Validated decoding options from the client's form fields"""
+
+    try:
+        return VoiceSettings(language=language, task=task)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+
+def _transcription_message(text: str, session_id: str, metadata: Dict[str, Any]) -> Optional[Message]:
+    """Validated chat message for an auto-sent transcript, or None if it is not a valid message"""
+
+    try:
+        return Message(content=text, role="user", session_id=session_id, metadata=metadata)
+    except ValidationError as e:
+        logger.warning("Failed to auto-send transcription to chat",
+                      session_id=session_id,
+                      error=str(e))
+        return None
 
 
 @router.post("/transcribe", response_model=VoiceResponse)
 async def transcribe_audio(
+    background_tasks: BackgroundTasks,
     audio: UploadFile = File(...),
     session_id: Optional[str] = Form(None),
     language: Optional[str] = Form("auto"),
-    task: str = Form("transcribe"),
+    task: Literal["transcribe", "translate"] = Form("transcribe"),
     auto_send: bool = Form(True),
     voice_service: VoiceService = Depends(get_voice_service),
     memory_service: MemoryService = Depends(get_memory_service)
@@ -51,75 +158,68 @@ async def transcribe_audio(
 
     try:
         # Validate file
-        if not audio.content_type or not audio.content_type.startswith('audio/'):
+        content_type = _audio_content_type(audio)
+        if content_type is None:
             raise HTTPException(
                 status_code=400,
                 detail="File must be an audio file"
             )
 
-        # Read audio data
-        audio_data = await audio.read()
+        # The multipart parser has already streamed the upload into a spooled temp
+        # file (on disk past 1 MB); pass that file on instead of reading it into memory
+        audio_data = audio.file
 
         # Create audio file metadata
-        audio_file = AudioFile(
+        audio_file = AudioFileDTO(
             filename=audio.filename or "uploaded_audio",
-            content_type=audio.content_type,
-            size_bytes=len(audio_data)
+            content_type=content_type,
+            size_bytes=audio.size if audio.size is not None else get_audio_size(audio_data)
         )
 
-        logger.info("Audio upload received",
-                   filename=audio_file.filename,
-                   size_bytes=audio_file.size_bytes,
-                   content_type=audio_file.content_type,
-                   session_id=session_id)
-
-        # Validate audio
-        if not await voice_service.validate_audio(audio_data, audio_file.content_type):
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid audio file or format not supported"
-            )
-
         # Create voice settings
-        voice_settings = VoiceSettings(
-            language=language,
-            task=task
-        )
+        voice_settings = _voice_settings(language, task)
+
+        # Repeat uploads of the same audio reuse the earlier transcription
+        digest = await voice_service.audio_digest(audio_data)
+        transcription = await voice_service.get_cached_transcription(digest, voice_settings)
+
+        if transcription is None:
+            # Decode and validate once; the decoded audio is reused for transcription
+            audio_segment = await voice_service.load_audio(audio_data, audio_file.content_type)
+            if audio_segment is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Invalid audio file or format not supported"
+                )
 
-        # Transcribe audio
-        transcription = await voice_service.transcribe_audio(
-            audio_data,
-            audio_file,
-            voice_settings
-        )
+            # Transcribe audio
+            transcription = await voice_service.transcribe_audio(
+                audio_data,
+                audio_file,
+                voice_settings,
+                audio_segment=audio_segment
+            )
+            await voice_service.cache_transcription(digest, transcription, voice_settings)
 
         # Handle auto-send to chat
         chat_message_id = None
         if auto_send and session_id and transcription.text:
-            try:
-                # Create chat message from transcription
-                message = Message(
-                    content=transcription.text,
-                    role="user",
-                    session_id=session_id,
-                    metadata={
-                        "source": "voice",
-                        "audio_id": audio_file.id,
-                        "confidence": transcription.confidence
-                    }
-                )
-
-                # Save to memory
-                await memory_service.add_message(session_id, message)
+            # Create chat message from transcription
+            message = _transcription_message(transcription.text, session_id, {
+                "source": "voice",
+                "audio_id": audio_file.id,
+                "confidence": transcription.confidence
+            })
+            if message is not None:
                 chat_message_id = message.id
 
-                logger.info("Voice transcription auto-sent to chat",
-                           session_id=session_id,
-                           message_id=chat_message_id)
-
-            except Exception as e:
-                logger.warning("Failed to auto-send transcription to chat",
-                              error=str(e))
+                # Save to memory after the response is sent
+                background_tasks.add_task(
+                    _save_transcription_message,
+                    memory_service,
+                    session_id,
+                    message
+                )
 
         # Create response
         response = VoiceResponse(
@@ -136,12 +236,19 @@ async def transcribe_audio(
 
         logger.info("Voice transcription completed",
                    audio_id=audio_file.id,
+                   filename=audio_file.filename,
+                   size_bytes=audio_file.size_bytes,
+                   content_type=audio_file.content_type,
+                   session_id=session_id,
                    text_length=len(transcription.text),
                    confidence=transcription.confidence,
                    auto_sent=bool(chat_message_id))
 
         return response
 
+    except HTTPException:
+        raise
+
     except VoiceServiceException as e:
         logger.error("Voice service error", error=str(e))
         raise HTTPException(status_code=503, detail=str(e))
@@ -155,6 +262,113 @@ async def transcribe_audio(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@router.post("/transcribe/stream")
+async def transcribe_audio_stream(
+    background_tasks: BackgroundTasks,
+    audio: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+    language: Optional[str] = Form("auto"),
+    task: Literal["transcribe", "translate"] = Form("transcribe"),
+    auto_send: bool = Form(True),
+    voice_service: VoiceService = Depends(get_voice_service),
+    memory_service: MemoryService = Depends(get_memory_service)
+) -> StreamingResponse:
+    """Transcribe uploaded audio, streaming segments as server-sent events.
+
+    Emits a `segment` event per recognized segment and a final `done` event
+    with the full text (or an `error` event if transcription fails).
+    """
+
+    if not get_settings().beta_streaming_responses:
+        raise HTTPException(status_code=404, detail="Streaming transcription is disabled")
+
+    content_type = _audio_content_type(audio)
+    if content_type is None:
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an audio file"
+        )
+
+    voice_settings = _voice_settings(language, task)
+
+    audio_file = AudioFileDTO(
+        filename=audio.filename or "uploaded_audio",
+        content_type=content_type,
+        size_bytes=audio.size if audio.size is not None else get_audio_size(audio.file)
+    )
+
+    # Decode up front so the stream doesn't depend on the upload staying open
+    audio_segment = await voice_service.load_audio(audio.file, audio_file.content_type)
+    if audio_segment is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid audio file or format not supported"
+        )
+
+    async def event_source() -> AsyncIterator[bytes]:
+        start_time = time.time()
+        texts = []
+
+        try:
+            async for segment in voice_service.transcribe_audio_stream(audio_segment, voice_settings):
+                texts.append(segment["text"])
+                yield _sse_event("segment", segment)
+        except Exception as e:
+            logger.error("Streaming transcription failed",
+                        audio_id=audio_file.id,
+                        error=str(e))
+            yield _sse_event("error", {"audio_id": audio_file.id, "message": "Transcription failed"})
+            return
+
+        text = " ".join(texts)
+        chat_message_id = None
+        if auto_send and session_id and text:
+            message = _transcription_message(text, session_id, {
+                "source": "voice",
+                "audio_id": audio_file.id
+            })
+            if message is not None:
+                chat_message_id = message.id
+
+                # Runs once the stream has been sent
+                background_tasks.add_task(
+                    _save_transcription_message,
+                    memory_service,
+                    session_id,
+                    message
+                )
+
+        processing_time = time.time() - start_time
+        logger.info("Streaming transcription completed",
+                   audio_id=audio_file.id,
+                   session_id=session_id,
+                   text_length=len(text),
+                   processing_time=processing_time,
+                   auto_sent=bool(chat_message_id))
+
+        yield _sse_event("done", {
+            "audio_id": audio_file.id,
+            "text": text,
+            "duration": len(audio_segment) / 1000.0,
+            "processing_time": processing_time,
+            "session_id": session_id,
+            "auto_sent_to_chat": bool(chat_message_id),
+            "chat_message_id": chat_message_id
+        })
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+        background=background_tasks
+    )
+
+
 @router.get("/status/{audio_id}", response_model=AudioProcessingStatus)
 async def get_processing_status(
     audio_id: str,
@@ -183,10 +397,9 @@ async def validate_audio_file(
     """Validate audio file without processing"""
 
     try:
-        # Read audio data
-        audio_data = await audio.read()
+        # Validate the spooled upload in place instead of reading it into memory
+        audio_data = audio.file
 
-        # Validate
         is_valid = await voice_service.validate_audio(
             audio_data,
             audio.content_type or "audio/wav"
@@ -196,7 +409,7 @@ async def validate_audio_file(
             "valid": is_valid,
             "filename": audio.filename,
             "content_type": audio.content_type,
-            "size_bytes": len(audio_data)
+            "size_bytes": audio.size if audio.size is not None else get_audio_size(audio_data)
         }
 
     except Exception as e:
@@ -205,10 +418,10 @@ async def validate_audio_file(
 
 
 @router.get("/settings", response_model=VoiceSettings)
-async def get_voice_settings() -> VoiceSettings:
+async def get_voice_settings() -> Response:
     """Get current voice processing settings"""
 
-    return VoiceSettings()
+    return Response(content=DEFAULT_VOICE_SETTINGS_JSON, media_type="application/json")
 
 
 @router.post("/settings", response_model=VoiceSettings)
@@ -225,49 +438,22 @@ async def update_voice_settings(
 
 
 @router.get("/models")
-async def list_available_models() -> dict:
+async def list_available_models() -> Response:
     """List available Whisper models"""
 
-    models = [
-        {
-            "name": "tiny",
-            "size": "39 MB",
-            "speed": "Very Fast",
-            "accuracy": "Low"
-        },
-        {
-            "name": "base",
-            "size": "74 MB",
-            "speed": "Fast",
-            "accuracy": "Medium"
-        },
-        {
-            "name": "small",
-            "size": "244 MB",
-            "speed": "Medium",
-            "accuracy": "Good"
-        },
-        {
-            "name": "medium",
-            "size": "769 MB",
-            "speed": "Slow",
-            "accuracy": "Very Good"
-        },
-        {
-            "name": "large",
-            "size": "1550 MB",
-            "speed": "Very Slow",
-            "accuracy": "Excellent"
-        }
-    ]
-
-    return {
-        "models": models,
-        "current_model": "base",  # From settings
-        "supported_languages": [
-            "auto", "en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh"
-        ]
-    }
+    global _models_body
+
+    settings = get_settings()
+    key = (settings.whisper_model, settings.whisper_quantization)
+    if _models_body is None or _models_body[0] != key:
+        _models_body = (key, orjson.dumps({
+            "models": WHISPER_MODELS,
+            "current_model": settings.whisper_model,
+            "current_quantization": settings.whisper_quantization,
+            "supported_languages": SUPPORTED_LANGUAGES
+        }))
+
+    return Response(content=_models_body[1], media_type="application/json")
 
 
 @router.get("/health")
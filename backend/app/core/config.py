@@ -4,10 +4,43 @@ Uses pydantic-settings for environment variable handling
 """
 
 from pydantic_settings import BaseSettings
-from pydantic import Field, field_validator
+from pydantic import Field, field_validator, model_validator
 from typing import List, Optional, Literal
-from functools import lru_cache
+from pathlib import Path
+import json
 import os
+import re
+import orjson
+import structlog
+
+logger = structlog.get_logger()
+
+# Secrets and derived properties that never go to settings.json
+SETTINGS_SAVE_EXCLUDE = frozenset({
+    'openai_api_key', 'gemini_api_key', 'anthropic_api_key', 'secret_key', 'redis_password',
+    'redis_connection_kwargs', 'openai_client_kwargs'
+})
+
+# Allowed values for validated settings; the error text is built once
+WHISPER_MODELS = frozenset({"tiny", "base", "small", "medium", "large"})
+WHISPER_MODEL_ERROR = "Invalid Whisper model. Must be one of: tiny, base, small, medium, large"
+LOG_LEVELS = frozenset({"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"})
+LOG_LEVEL_ERROR = "Invalid log level. Must be one of: DEBUG, INFO, WARNING, ERROR, CRITICAL"
+
+# Human-readable sizes such as "10MB"; a bare number is bytes
+FILE_SIZE_PATTERN = re.compile(r"^\s*(\d+)\s*([KMG]B)?\s*$", re.IGNORECASE)
+FILE_SIZE_UNITS = {None: 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_file_size(size_str: str) -> int:
+    """Parse file size string to bytes"""
+
+    match = FILE_SIZE_PATTERN.match(size_str)
+    if not match:
+        raise ValueError(f"Invalid file size: {size_str!r} (expected e.g. 500KB, 10MB, 1GB)")
+
+    unit = match[2].upper() if match[2] else None
+    return int(match[1]) * FILE_SIZE_UNITS[unit]
 
 
 class Settings(BaseSettings):
@@ -20,6 +53,10 @@ class Settings(BaseSettings):
     openai_api_key: str = Field("", env="OPENAI_API_KEY")
     openai_model: str = Field("gpt-3.5-turbo", env="OPENAI_MODEL")
     openai_base_url: str = Field("https://api.openai.com/v1", env="OPENAI_BASE_URL")
+    # HTTP/2 connection pool shared by all OpenAI requests
+    openai_max_connections: int = Field(256, env="OPENAI_MAX_CONNECTIONS")
+    openai_max_keepalive_connections: int = Field(64, env="OPENAI_MAX_KEEPALIVE_CONNECTIONS")
+    openai_timeout: float = Field(60.0, env="OPENAI_TIMEOUT")
 
     # Google Gemini Configuration
     gemini_api_key: str = Field("", env="GEMINI_API_KEY")
@@ -38,7 +75,9 @@ class Settings(BaseSettings):
 
     # Voice Configuration
     whisper_model: str = Field("base", env="WHISPER_MODEL")
-    whisper_preload: bool = Field(False, env="WHISPER_PRELOAD")
+    whisper_preload: bool = Field(True, env="WHISPER_PRELOAD")
+    whisper_quantization: Literal["fp32", "int8", "int4"] = Field("fp32", env="WHISPER_QUANTIZATION")
+    whisper_device: Literal["auto", "cpu", "cuda"] = Field("auto", env="WHISPER_DEVICE")
     audio_format: str = Field("wav", env="AUDIO_FORMAT")
     max_audio_duration: int = Field(60, env="MAX_AUDIO_DURATION")
     audio_sample_rate: int = Field(16000, env="AUDIO_SAMPLE_RATE")
@@ -58,18 +97,26 @@ class Settings(BaseSettings):
     # RAG (Retrieval-Augmented Generation) Configuration
     rag_enabled: bool = Field(True, env="RAG_ENABLED")
     rag_top_k: int = Field(3, env="RAG_TOP_K")  # Number of relevant documents to retrieve
+    rag_min_chars: int = Field(8, env="RAG_MIN_CHARS")  # Shorter messages ("hi", "ok") skip retrieval
     rag_similarity_threshold: float = Field(0.7, env="RAG_SIMILARITY_THRESHOLD")  # Minimum similarity score
     rag_chunk_size: int = Field(500, env="RAG_CHUNK_SIZE")  # Size of text chunks for vectorization
     rag_chunk_overlap: int = Field(50, env="RAG_CHUNK_OVERLAP")  # Overlap between chunks
     rag_collection_name: str = Field("chatbot_memory", env="RAG_COLLECTION_NAME")
     rag_embedding_model: str = Field("sentence-transformers/all-MiniLM-L6-v2", env="RAG_EMBEDDING_MODEL")
     rag_persist_directory: str = Field("./data/vector_db", env="RAG_PERSIST_DIRECTORY")
+    rag_cache_size: int = Field(1024, env="RAG_CACHE_SIZE")  # Cached retrievals keyed by query embedding; 0 disables
+    rag_cache_threshold: float = Field(0.05, env="RAG_CACHE_THRESHOLD")  # Max cosine distance for a cache hit
+    rag_cache_ttl: float = Field(300.0, env="RAG_CACHE_TTL")  # Seconds a cached retrieval stays valid (covers documents added by the worker)
+    rag_cache_lsh_tables: int = Field(8, env="RAG_CACHE_LSH_TABLES")  # Hash tables probed per lookup
+    rag_cache_lsh_bits: int = Field(8, env="RAG_CACHE_LSH_BITS")  # Hyperplanes per table
+    rag_cache_quantize: bool = Field(False, env="RAG_CACHE_QUANTIZE")  # int8 cache keys: 4x less memory per scan
 
     # Redis Settings
     redis_url: str = Field("redis://localhost:6379", env="REDIS_URL")
     redis_db: int = Field(0, env="REDIS_DB")
     redis_password: Optional[str] = Field(None, env="REDIS_PASSWORD")
     redis_ttl: int = Field(86400, env="REDIS_TTL")
+    redis_max_connections: int = Field(50, env="REDIS_MAX_CONNECTIONS")
 
     # Server Configuration
     host: str = Field("localhost", env="HOST")
@@ -99,6 +146,13 @@ class Settings(BaseSettings):
     rate_limit_requests: int = Field(100, env="RATE_LIMIT_REQUESTS")
     rate_limit_window: int = Field(60, env="RATE_LIMIT_WINDOW")
 
+    # Chat backpressure
+    chat_max_concurrency: int = Field(32, env="CHAT_MAX_CONCURRENCY")  # Concurrent AI calls from /chat/message
+    chat_max_queue_depth: int = Field(128, env="CHAT_MAX_QUEUE_DEPTH")  # In-flight requests before returning 429
+
+    # Default executor for blocking work (audio decoding, Whisper, file I/O)
+    thread_pool_size: int = Field((os.cpu_count() or 1) * 2, env="THREAD_POOL_SIZE")
+
     # Logging
     log_level: str = Field("INFO", env="LOG_LEVEL")
     log_format: Literal["json", "text"] = Field("json", env="LOG_FORMAT")
@@ -141,81 +195,65 @@ class Settings(BaseSettings):
     chroma_api_url: Optional[str] = Field(None, env="CHROMA_API_URL")
     chroma_collection_name: str = Field("chatbot_memory", env="CHROMA_COLLECTION_NAME")
 
-    @field_validator("cors_origins", mode="before")
-    @classmethod
-    def parse_cors_origins(cls, v):
-        if isinstance(v, str):
-            return [origin.strip() for origin in v.split(",")]
-        return v
-
-    @field_validator("cors_methods", mode="before")
-    @classmethod
-    def parse_cors_methods(cls, v):
-        if isinstance(v, str):
-            return [method.strip() for method in v.split(",")]
-        return v
-
-    @field_validator("cors_headers", mode="before")
+    @field_validator("cors_origins", "cors_methods", "cors_headers", "allowed_hosts", mode="before")
     @classmethod
-    def parse_cors_headers(cls, v):
+    def split_csv(cls, v):
+        """Split comma-separated values into a list"""
         if isinstance(v, str):
-            return [header.strip() for header in v.split(",")]
+            return [item.strip() for item in v.split(",")]
         return v
 
-    @field_validator("allowed_hosts", mode="before")
+    @field_validator("whisper_model")
     @classmethod
-    def parse_allowed_hosts(cls, v):
-        if isinstance(v, str):
-            return [host.strip() for host in v.split(",")]
+    def validate_whisper_model(cls, v):
+        if v not in WHISPER_MODELS:
+            raise ValueError(WHISPER_MODEL_ERROR)
         return v
 
-    @field_validator("whisper_model")
+    @field_validator("whisper_quantization")
     @classmethod
-    def validate_whisper_model(cls, v):
-        valid_models = ["tiny", "base", "small", "medium", "large"]
-        if v not in valid_models:
-            raise ValueError(f"Invalid Whisper model. Must be one of: {valid_models}")
+    def validate_whisper_quantization(cls, v, info):
+        if v == "int4" and info.data.get("whisper_model") == "tiny":
+            raise ValueError("int4 quantization is not supported for the tiny Whisper model; use int8")
         return v
 
     @field_validator("log_level")
     @classmethod
     def validate_log_level(cls, v):
-        valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-        if v.upper() not in valid_levels:
-            raise ValueError(f"Invalid log level. Must be one of: {valid_levels}")
-        return v.upper()
+        level = v.upper()
+        if level not in LOG_LEVELS:
+            raise ValueError(LOG_LEVEL_ERROR)
+        return level
 
-    @field_validator("secret_key")
+    @field_validator("log_file_max_size")
     @classmethod
-    def validate_secret_key(cls, v, info):
-        if not info.data.get("debug") and v == "change-this-in-production":
-            raise ValueError("SECRET_KEY must be changed from default in production environment!")
+    def validate_log_file_max_size(cls, v):
+        parse_file_size(v)
         return v
 
-    @field_validator("ai_provider")
-    @classmethod
-    def validate_ai_keys(cls, v, info):
-        if v == "openai" and not info.data.get("openai_api_key"):
+    @model_validator(mode="after")
+    def validate_production_settings(self):
+        """Cross-field checks, run once after all fields are parsed"""
+        if self.ai_provider == "openai" and not self.openai_api_key:
             raise ValueError("OPENAI_API_KEY must be set when AI_PROVIDER is 'openai'")
-        if v == "gemini" and not info.data.get("gemini_api_key"):
+        if self.ai_provider == "gemini" and not self.gemini_api_key:
             raise ValueError("GEMINI_API_KEY must be set when AI_PROVIDER is 'gemini'")
-        if v == "anthropic" and not info.data.get("anthropic_api_key"):
+        if self.ai_provider == "anthropic" and not self.anthropic_api_key:
             raise ValueError("ANTHROPIC_API_KEY must be set when AI_PROVIDER is 'anthropic'")
-        return v
 
-    @field_validator("allowed_hosts")
-    @classmethod
-    def validate_allowed_hosts_production(cls, v, info):
-        if not info.data.get("debug") and v == ["*"]:
-            raise ValueError("allowed_hosts cannot be ['*'] in production environment. Please specify allowed hosts.")
-        return v
+        if not self.debug:
+            if self.secret_key == "change-this-in-production":
+                raise ValueError("SECRET_KEY must be changed from default in production environment!")
+            if self.allowed_hosts == ["*"]:
+                raise ValueError("allowed_hosts cannot be ['*'] in production environment. Please specify allowed hosts.")
+            if self.cors_headers == ["*"]:
+                raise ValueError("cors_headers cannot be ['*'] in production environment. Please specify allowed headers.")
+        return self
 
-    @field_validator("cors_headers")
-    @classmethod
-    def validate_cors_headers_production(cls, v, info):
-        if not info.data.get("debug") and v == ["*"]:
-            raise ValueError("cors_headers cannot be ['*'] in production environment. Please specify allowed headers.")
-        return v
+    @property
+    def log_file_max_bytes(self) -> int:
+        """Log rotation size in bytes"""
+        return parse_file_size(self.log_file_max_size)
 
     @property
     def redis_connection_kwargs(self) -> dict:
@@ -255,17 +293,10 @@ class Settings(BaseSettings):
         path = Path(file_path)
         path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Exclude sensitive fields and properties that are not meant for direct saving
-        # Use model_dump to get a dictionary representation
-        settings_dict = self.model_dump(
-            exclude={
-                'openai_api_key', 'gemini_api_key', 'anthropic_api_key', 'secret_key', 'redis_password',
-                'redis_connection_kwargs', 'openai_client_kwargs'
-            }
-        )
-        
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(settings_dict, f, indent=2, ensure_ascii=False)
+        # Exclude sensitive fields; mode="json" leaves only JSON-native values for orjson
+        settings_dict = self.model_dump(mode="json", exclude=SETTINGS_SAVE_EXCLUDE)
+
+        path.write_bytes(orjson.dumps(settings_dict, option=orjson.OPT_INDENT_2))
         logger.info(f"Settings saved to {file_path}")
 
     @classmethod
@@ -294,9 +325,9 @@ class Settings(BaseSettings):
     }
 
 
-@lru_cache()
+settings = Settings()
+
+
 def get_settings() -> Settings:
-    """Get cached settings instance"""
-    settings = Settings()
-    settings.create_directories()
+    """Get the settings instance (a plain global, cheap enough for per-request deps)"""
     return settings
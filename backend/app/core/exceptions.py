@@ -4,7 +4,7 @@ Custom exceptions and error handling
 """
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import structlog
@@ -60,6 +60,21 @@ class AuthenticationException(ChatBotException):
         super().__init__(message, code, details, status_code)
 
 
+# Error names for the response body and logs, looked up once per class
+CHATBOT_EXCEPTION_NAMES = {
+    cls: cls.__name__
+    for cls in (
+        ChatBotException,
+        AIServiceException,
+        VoiceServiceException,
+        MemoryServiceException,
+        ValidationException,
+        RateLimitException,
+        AuthenticationException
+    )
+}
+
+
 def setup_exception_handlers(app: FastAPI):
     """Setup global exception handlers"""
 
@@ -67,18 +82,21 @@ def setup_exception_handlers(app: FastAPI):
     async def chatbot_exception_handler(request: Request, exc: ChatBotException):
         """Handle custom ChatBot exceptions"""
 
+        exc_type = type(exc)
+        error_name = CHATBOT_EXCEPTION_NAMES.get(exc_type) or exc_type.__name__
+
         logger.error("ChatBot exception",
-                    exception_type=type(exc).__name__,
+                    exception_type=error_name,
                     message=exc.message,
                     code=exc.code,
                     details=exc.details,
                     path=request.url.path,
                     method=request.method)
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.status_code,
             content={
-                "error": type(exc).__name__,
+                "error": error_name,
                 "message": exc.message,
                 "code": exc.code,
                 "details": exc.details
@@ -95,7 +113,7 @@ def setup_exception_handlers(app: FastAPI):
                       path=request.url.path,
                       method=request.method)
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.status_code,
             content={
                 "error": "HTTPException",
@@ -117,9 +135,9 @@ def setup_exception_handlers(app: FastAPI):
         formatted_errors = []
         for error in exc.errors():
             loc = ".".join(map(str, error["loc"]))
-            formatted_errors.append(f"{loc}: {error["msg"]}")
+            formatted_errors.append(f"{loc}: {error['msg']}")
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=422,
             content={
                 "error": "ValidationError",
@@ -139,7 +157,7 @@ def setup_exception_handlers(app: FastAPI):
                     method=request.method,
                     exc_info=True)
 
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "error": "InternalServerError",
@@ -149,61 +167,41 @@ def setup_exception_handlers(app: FastAPI):
         )
 
 
-def handle_ai_service_errors(func):
-    """Decorator to handle AI service errors"""
-
-    async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except Exception as e:
-            logger.error("AI service error",
-                        function=func.__name__,
-                        error=str(e))
-            raise AIServiceException(
-                message="AI service temporarily unavailable",
-                code="AI_SERVICE_ERROR",
-                details={"original_error": str(e)}
-            )
-
-    return wrapper
-
-
-def handle_voice_service_errors(func):
-    """Decorator to handle voice service errors"""
-
-    async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except Exception as e:
-            logger.error("Voice service error",
-                        function=func.__name__,
-                        error=str(e))
-            raise VoiceServiceException(
-                message="Voice processing failed",
-                code="VOICE_SERVICE_ERROR",
-                details={"original_error": str(e)}
-            )
-
-    return wrapper
-
-
-def handle_memory_service_errors(func):
-    """Decorator to handle memory service errors"""
-
-    async def wrapper(*args, **kwargs):
-        try:
-            return await func(*args, **kwargs)
-        except Exception as e:
-            logger.error("Memory service error",
-                        function=func.__name__,
-                        error=str(e))
-            raise MemoryServiceException(
-                message="Memory operation failed",
-                code="MEMORY_SERVICE_ERROR",
-                details={"original_error": str(e)}
-            )
-
-    return wrapper
+def _service_error_handler(exc_cls, log_event: str, message: str, code: str):
+    """Build a decorator that logs any error and re-raises it as `exc_cls`"""
+
+    def decorator(func):
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                logger.error(log_event,
+                            function=func.__name__,
+                            error=str(e))
+                raise exc_cls(
+                    message=message,
+                    code=code,
+                    details={"original_error": str(e)}
+                )
+
+        return wrapper
+
+    return decorator
+
+
+# Decorators to handle service errors
+handle_ai_service_errors = _service_error_handler(
+    AIServiceException, "AI service error",
+    "AI service temporarily unavailable", "AI_SERVICE_ERROR"
+)
+handle_voice_service_errors = _service_error_handler(
+    VoiceServiceException, "Voice service error",
+    "Voice processing failed", "VOICE_SERVICE_ERROR"
+)
+handle_memory_service_errors = _service_error_handler(
+    MemoryServiceException, "Memory service error",
+    "Memory operation failed", "MEMORY_SERVICE_ERROR"
+)
 
 
 class ErrorContext:
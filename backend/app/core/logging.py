@@ -5,14 +5,22 @@ Structured logging with JSON format
 
 import logging
 import logging.handlers
+import socket
 import sys
+import time
 from pathlib import Path
+import orjson
 import structlog
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from app.core.config import get_settings
 
 
+def _orjson_dumps(obj: Any, **kwargs) -> str:
+    """JSONRenderer serializer; structlog passes its fallback as `default`"""
+    return orjson.dumps(obj, **kwargs).decode()
+
+
 def setup_logging(log_level: str = "INFO"):
     """Setup structured logging configuration"""
 
@@ -29,10 +37,13 @@ def setup_logging(log_level: str = "INFO"):
     if settings.log_file_enabled:
         setup_file_logging(settings)
 
-    # Configure structlog
-    structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
+    renderer = (
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps) if settings.log_format == "json"
+        else structlog.dev.ConsoleRenderer()
+    )
+
+    if settings.debug:
+        processors = [
             structlog.stdlib.add_logger_name,
             structlog.stdlib.add_log_level,
             structlog.stdlib.PositionalArgumentsFormatter(),
@@ -40,12 +51,27 @@ def setup_logging(log_level: str = "INFO"):
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer() if settings.log_format == "json"
-            else structlog.dev.ConsoleRenderer()
-        ],
+            renderer
+        ]
+    else:
+        # Production chain: only exception tracebacks are rendered on top of
+        # the basic fields
+        processors = [
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.format_exc_info,
+            renderer
+        ]
+
+    # Configure structlog; the filtering wrapper turns calls below the level into
+    # no-ops before any event dict is built or processor runs, so neither chain
+    # needs stdlib's filter_by_level
+    structlog.configure(
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        wrapper_class=structlog.make_filtering_bound_logger(getattr(logging, log_level.upper())),
         cache_logger_on_first_use=True,
     )
 
@@ -57,13 +83,10 @@ def setup_file_logging(settings):
     log_path = Path(settings.log_file_path)
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Parse max file size
-    max_bytes = parse_file_size(settings.log_file_max_size)
-
     # Setup rotating file handler
     file_handler = logging.handlers.RotatingFileHandler(
         filename=settings.log_file_path,
-        maxBytes=max_bytes,
+        maxBytes=settings.log_file_max_bytes,
         backupCount=settings.log_file_backup_count,
         encoding='utf-8'
     )
@@ -83,24 +106,41 @@ def setup_file_logging(settings):
     root_logger.addHandler(file_handler)
 
 
-def parse_file_size(size_str: str) -> int:
-    """Parse file size string to bytes"""
+# LogRecord attributes that are not user-supplied extras
+LOG_RECORD_RESERVED = frozenset({
+    'name', 'msg', 'args', 'levelname', 'levelno',
+    'pathname', 'filename', 'module', 'lineno',
+    'funcName', 'created', 'msecs', 'relativeCreated',
+    'thread', 'threadName', 'processName', 'process',
+    'exc_info', 'exc_text', 'stack_info', 'getMessage',
+    'taskName', 'message', 'asctime'
+})
 
-    size_str = size_str.upper()
-
-    if size_str.endswith('KB'):
-        return int(size_str[:-2]) * 1024
-    elif size_str.endswith('MB'):
-        return int(size_str[:-2]) * 1024 * 1024
-    elif size_str.endswith('GB'):
-        return int(size_str[:-2]) * 1024 * 1024 * 1024
-    else:
-        return int(size_str)
+HOSTNAME = socket.gethostname()
 
 
 class JSONFormatter(logging.Formatter):
     """JSON log formatter"""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (second, timestamp text) reused by records within the same second;
+        # one tuple so concurrent handlers never see a mismatched pair
+        self._time_cache = (None, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: str = None) -> str:
+        """Same output as logging.Formatter, with strftime run once per second"""
+
+        if datefmt:
+            return super().formatTime(record, datefmt)
+
+        second = int(record.created)
+        cached_second, text = self._time_cache
+        if second != cached_second:
+            text = time.strftime(self.default_time_format, self.converter(second))
+            self._time_cache = (second, text)
+        return self.default_msec_format % (text, record.msecs)
+
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON"""
 
@@ -109,30 +149,24 @@ class JSONFormatter(logging.Formatter):
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
+            "file": record.pathname,
+            "line": record.lineno,
+            "function": record.funcName,
+            "host": HOSTNAME,
+            "pid": record.process
         }
 
-        # Add extra fields
-        if hasattr(record, 'pathname'):
-            log_entry["file"] = record.pathname
-            log_entry["line"] = record.lineno
-
-        if hasattr(record, 'funcName'):
-            log_entry["function"] = record.funcName
-
         # Add exception info
         if record.exc_info:
             log_entry["exception"] = self.formatException(record.exc_info)
 
-        # Add custom fields
-        for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno',
-                          'pathname', 'filename', 'module', 'lineno',
-                          'funcName', 'created', 'msecs', 'relativeCreated',
-                          'thread', 'threadName', 'processName', 'process',
-                          'exc_info', 'exc_text', 'stack_info', 'getMessage']:
-                log_entry[key] = value
+        # Add custom fields; the set difference runs in C and is usually empty
+        attrs = record.__dict__
+        extras = attrs.keys() - LOG_RECORD_RESERVED
+        if extras:
+            log_entry.update((key, attrs[key]) for key in extras)
 
-        return structlog.processors.JSONRenderer()(None, None, log_entry)
+        return orjson.dumps(log_entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
 
 
 def get_logger(name: str = None) -> structlog.BoundLogger:
@@ -143,27 +177,41 @@ def get_logger(name: str = None) -> structlog.BoundLogger:
 class LoggerMixin:
     """Mixin class to add logging to any class"""
 
+    @classmethod
+    def _get_logger(cls) -> structlog.BoundLogger:
+        """Logger cached on the class itself (not inherited by subclasses)"""
+        logger = cls.__dict__.get("_logger")
+        if logger is None:
+            logger = structlog.get_logger(cls.__name__)
+            cls._logger = logger
+        return logger
+
     @property
     def logger(self) -> structlog.BoundLogger:
         """Get logger for this class"""
-        return structlog.get_logger(self.__class__.__name__)
+        return type(self)._get_logger()
 
 
 def log_function_call(func):
     """Decorator to log function calls"""
 
-    def wrapper(*args, **kwargs):
-        logger = structlog.get_logger(func.__module__)
+    # Resolved once; the DEBUG events are skipped entirely unless enabled
+    std_logger = logging.getLogger(func.__module__)
+    logger = structlog.get_logger(func.__module__)
 
-        logger.debug("Function called",
-                    function=func.__name__,
-                    args=len(args),
-                    kwargs=list(kwargs.keys()))
+    def wrapper(*args, **kwargs):
+        debug = std_logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Function called",
+                        function=func.__name__,
+                        args=len(args),
+                        kwargs=list(kwargs.keys()))
 
         try:
             result = func(*args, **kwargs)
-            logger.debug("Function completed",
-                        function=func.__name__)
+            if debug:
+                logger.debug("Function completed",
+                            function=func.__name__)
             return result
         except Exception as e:
             logger.error("Function failed",
@@ -174,21 +222,26 @@ def log_function_call(func):
     return wrapper
 
 
-async def log_async_function_call(func):
+def log_async_function_call(func):
     """Decorator to log async function calls"""
 
-    async def wrapper(*args, **kwargs):
-        logger = structlog.get_logger(func.__module__)
+    # Resolved once; the DEBUG events are skipped entirely unless enabled
+    std_logger = logging.getLogger(func.__module__)
+    logger = structlog.get_logger(func.__module__)
 
-        logger.debug("Async function called",
-                    function=func.__name__,
-                    args=len(args),
-                    kwargs=list(kwargs.keys()))
+    async def wrapper(*args, **kwargs):
+        debug = std_logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Async function called",
+                        function=func.__name__,
+                        args=len(args),
+                        kwargs=list(kwargs.keys()))
 
         try:
             result = await func(*args, **kwargs)
-            logger.debug("Async function completed",
-                        function=func.__name__)
+            if debug:
+                logger.debug("Async function completed",
+                            function=func.__name__)
             return result
         except Exception as e:
             logger.error("Async function failed",
@@ -202,6 +255,8 @@ async def log_async_function_call(func):
 def setup_uvicorn_logging():
     """Setup logging for Uvicorn server"""
 
+    settings = get_settings()
+
     # Configure uvicorn loggers
     uvicorn_loggers = [
         "uvicorn",
@@ -214,6 +269,25 @@ def setup_uvicorn_logging():
         logger.handlers = []
         logger.propagate = True
 
+    # One log call per request is a measurable share of a cheap endpoint
+    logging.getLogger("uvicorn.access").disabled = not settings.debug
+
+
+def configure_uvicorn(access_log: Optional[bool] = None, proxy_headers: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for uvicorn.run(); access log defaults to debug mode only"""
+
+    settings = get_settings()
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "reload": settings.reload,
+        "log_level": settings.log_level.lower(),
+        "access_log": settings.debug if access_log is None else access_log,
+        "proxy_headers": proxy_headers,
+        # Logging is configured by setup_logging() when the app is imported
+        "log_config": None,
+    }
+
 
 def setup_third_party_logging():
     """Setup logging for third-party libraries"""
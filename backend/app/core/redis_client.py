@@ -0,0 +1,46 @@
+"""
+Shared Redis client for AI ChatBot
+One connection pool per process, reused by every service that talks to Redis
+"""
+
+from typing import Optional
+import aioredis
+import structlog
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger()
+
+_client: Optional[aioredis.Redis] = None
+
+
+def get_redis_client() -> aioredis.Redis:
+    """Get the process-wide Redis client (created on first use)"""
+
+    global _client
+    if _client is None:
+        settings = get_settings()
+        kwargs = settings.redis_connection_kwargs
+        _client = aioredis.from_url(
+            kwargs.pop("url"),
+            max_connections=settings.redis_max_connections,
+            **kwargs
+        )
+        logger.info("Redis connection pool created",
+                   max_connections=settings.redis_max_connections)
+    return _client
+
+
+async def close_redis_client():
+    """Close the shared client and disconnect its pool"""
+
+    global _client
+    if _client is None:
+        return
+
+    client, _client = _client, None
+    try:
+        await client.close()
+        await client.connection_pool.disconnect()
+    except Exception as e:
+        logger.warning("Failed to close Redis connection pool", error=str(e))
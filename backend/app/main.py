@@ -3,45 +3,86 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
 import structlog
 from typing import List
 
 from app.core.config import get_settings
-from app.core.logging import setup_logging
+from app.core.logging import setup_logging, setup_uvicorn_logging
 from app.api.routes import chat
 from app.api.routes import voice
 from app.api.routes import config
 from app.api.routes import health
 from app.utils.prompts import PromptManager
+from app.services.ai_service import AIService
+from app.services.memory_service import MemoryService
+from app.services.vector_memory_service import VectorMemoryService
+from app.services.research_service import ResearchService
+from app.services.voice_service import VoiceService
+from app.services.message_handler_service import MessageHandlerService
 from app.services.websocket_manager import WebSocketManager
 from app.core.exceptions import setup_exception_handlers
+from app.core.redis_client import close_redis_client
 
 settings = get_settings()
 setup_logging(settings.log_level)
+setup_uvicorn_logging()
 logger = structlog.get_logger()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting AI ChatBot Backend", version="1.0.0")
-    app.state.websocket_manager = WebSocketManager()
+    settings.create_directories()
+
+    # Sized executor for run_in_executor(None, ...) and asyncio.to_thread;
+    # the loop shuts it down on exit
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+        max_workers=settings.thread_pool_size,
+        thread_name_prefix="ragbot"
+    ))
+
+    # App-scoped service singletons, handed out by the route dependencies
+    app.state.prompt_manager = PromptManager()
+    app.state.ai_service = AIService()
+    app.state.memory_service = MemoryService()
+    app.state.vector_memory_service = VectorMemoryService()
+    app.state.research_service = ResearchService()
+    app.state.voice_service = VoiceService()
+    app.state.message_handler_service = MessageHandlerService(
+        ai_service=app.state.ai_service,
+        memory_service=app.state.memory_service,
+        vector_memory_service=app.state.vector_memory_service,
+        research_service=app.state.research_service
+    )
+
+    app.state.websocket_manager = WebSocketManager(
+        ai_service=app.state.ai_service,
+        voice_service=app.state.voice_service,
+        memory_service=app.state.memory_service,
+        message_handler_service=app.state.message_handler_service
+    )
     await app.state.websocket_manager.start()
+    metrics_task = asyncio.create_task(health.sample_metrics_loop())
+    settings_save_task = asyncio.create_task(config.persist_settings_loop())
     try:
         if settings.whisper_preload:
-            from app.services.voice_service import VoiceService
-            voice_service = VoiceService()
-            await voice_service.initialize()
-            app.state.voice_service = voice_service
+            await app.state.voice_service.initialize()
             logger.info("Whisper model preloaded")
     except Exception as e:
         logger.warning("Failed to preload Whisper model", error=str(e))
     yield
     logger.info("Shutting down AI ChatBot Backend")
-    if hasattr(app.state, 'voice_service'):
-        await app.state.voice_service.cleanup()
+    metrics_task.cancel()
+    settings_save_task.cancel()
+    await config.flush_settings()
+    await app.state.voice_service.cleanup()
     await app.state.websocket_manager.stop()
+    await app.state.ai_service.close()
+    await close_redis_client()
 
 app = FastAPI(
     title="AI ChatBot API",
@@ -49,6 +90,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -60,7 +102,7 @@ app.add_middleware(
     allow_headers=settings.cors_headers,
 )
 
-if not settings.debug:
+if not settings.debug and settings.allowed_hosts != ["*"]:
     app.add_middleware(
         TrustedHostMiddleware,
         allowed_hosts=settings.allowed_hosts
@@ -89,8 +131,11 @@ async def websocket_chat_endpoint(websocket: WebSocket):
     logger.info("WebSocket client connected", client_id=id(websocket))
     try:
         while True:
-            data = await websocket.receive_json()
-            await manager.handle_message(websocket, data)
+            # Raw receive: text and binary JSON frames both go straight to msgspec
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            await manager.handle_raw_message(websocket, message.get("text") or message.get("bytes"))
     except WebSocketDisconnect:
         logger.info("WebSocket client disconnected", client_id=id(websocket))
         manager.disconnect(websocket)
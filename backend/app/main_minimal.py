@@ -1,5 +1,3 @@
-print('MAIN_MINIMAL_LOADED')
-
 from fastapi import FastAPI
 from app.core.config import get_settings
 from app.core.logging import setup_logging
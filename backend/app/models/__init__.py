@@ -2,14 +2,49 @@
 Data models package for AI ChatBot
 """
 
-from pydantic import BaseModel
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Annotated, Iterator, Optional
+from annotated_types import Interval
+from pydantic import BaseModel, ConfigDict
 
 class BaseAppModel(BaseModel):
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    """Base for app models; pydantic v2 and orjson already emit ISO 8601 datetimes"""
+
+    # Validators are built on first use instead of at import
+    model_config = ConfigDict(defer_build=True)
+
+
+def new_id() -> str:
+    """Random 128-bit id as hex (cheaper than formatting a UUID object)"""
+    return os.urandom(16).hex()
+
+
+# Bounded float shared by chat and voice models
+Probability = Annotated[float, Interval(ge=0.0, le=1.0)]
+
+
+_pinned_now: ContextVar[Optional[datetime]] = ContextVar("pinned_now", default=None)
+
+
+def now_utc() -> datetime:
+    """Current UTC time, or the time pinned by an enclosing `pinned_now()` batch"""
+    pinned = _pinned_now.get()
+    return pinned if pinned is not None else datetime.utcnow()
+
+
+@contextmanager
+def pinned_now() -> Iterator[datetime]:
+    """Share one timestamp across models built together in a batch"""
+    now = datetime.utcnow()
+    token = _pinned_now.set(now)
+    try:
+        yield now
+    finally:
+        _pinned_now.reset(token)
+
 
 from .chat import (
     Message,
@@ -18,13 +53,16 @@ from .chat import (
     ChatResponse,
     ChatHistory,
     ConversationSummary,
+    ConversationList,
     ChatSettings,
     WebSocketMessage,
+    WebSocketFrame,
     ErrorResponse
 )
 
 from .voice import (
     AudioFile,
+    AudioFileDTO,
     VoiceRequest,
     TranscriptionResult,
     VoiceResponse,
@@ -37,6 +75,10 @@ from .voice import (
 
 __all__ = [
     "BaseAppModel",
+    "new_id",
+    "Probability",
+    "now_utc",
+    "pinned_now",
     # Chat models
     "Message",
     "Conversation",
@@ -44,12 +86,15 @@ __all__ = [
     "ChatResponse",
     "ChatHistory",
     "ConversationSummary",
+    "ConversationList",
     "ChatSettings",
     "WebSocketMessage",
+    "WebSocketFrame",
     "ErrorResponse",
 
     # Voice models
     "AudioFile",
+    "AudioFileDTO",
     "VoiceRequest",
     "TranscriptionResult",
     "VoiceResponse",
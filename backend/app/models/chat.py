@@ -3,19 +3,26 @@ Chat data models for AI ChatBot
 Pydantic models for request/response validation
 """
 
-from pydantic import Field, field_validator
-from typing import List, Optional, Dict, Any, Literal
+import msgspec
+from annotated_types import Interval
+from pydantic import ConfigDict, Field, field_validator
+from typing import Annotated, List, Optional, Dict, Any, Literal, Union
 from datetime import datetime
-from uuid import uuid4, UUID
-from app.models import BaseAppModel
+from app.models import BaseAppModel, Probability, new_id, now_utc
+
+
+# Shared bounds for chat generation settings
+Temperature = Annotated[float, Interval(ge=0.0, le=2.0)]
+Penalty = Annotated[float, Interval(ge=-2.0, le=2.0)]
+ContextWindow = Annotated[int, Interval(ge=1, le=100)]
 
 
 class Message(BaseAppModel):
     """Individual chat message"""
-    id: str = Field(default_factory=lambda: str(uuid4()))
+    id: str = Field(default_factory=new_id)
     content: str = Field(..., min_length=1, max_length=4000)
     role: Literal["user", "assistant", "system"] = Field(...)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
     session_id: Optional[str] = None
 
@@ -30,10 +37,10 @@ class Message(BaseAppModel):
 
 class Conversation(BaseAppModel):
     """Chat conversation container"""
-    session_id: str = Field(default_factory=lambda: str(uuid4()))
+    session_id: str = Field(default_factory=new_id)
     messages: List[Message] = Field(default_factory=list)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=now_utc)
+    updated_at: datetime = Field(default_factory=now_utc)
     metadata: Dict[str, Any] = Field(default_factory=dict)
     title: Optional[str] = None
 
@@ -41,11 +48,12 @@ class Conversation(BaseAppModel):
         """Add message to conversation"""
         message.session_id = self.session_id
         self.messages.append(message)
-        self.updated_at = datetime.utcnow()
+        self.updated_at = message.timestamp
 
     def get_context(self, max_messages: int = 10) -> List[Message]:
         """Get recent messages for context"""
-        return self.messages[-max_messages:] if self.messages else []
+        # A negative bound slices the tail directly; [-0:] would copy everything
+        return self.messages[-max_messages:] if max_messages > 0 else []
 
     @property
     def message_count(self) -> int:
@@ -57,7 +65,7 @@ class ChatRequest(BaseAppModel):
     """Chat message request"""
     message: str = Field(..., min_length=1, max_length=4000)
     session_id: Optional[str] = None
-    context_length: int = Field(50, ge=1, le=100) # Updated default and max
+    context_length: ContextWindow = 50 # Updated default and max
     stream: bool = Field(False)
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
@@ -72,10 +80,12 @@ class ChatRequest(BaseAppModel):
 
 class ChatResponse(BaseAppModel):
     """Chat message response"""
+    model_config = ConfigDict(frozen=True)
+
     response: str = Field(...)
     session_id: str = Field(...)
     message_id: str = Field(...)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
     metadata: Dict[str, Any] = Field(default_factory=dict)
     usage: Optional[Dict[str, Any]] = None
 
@@ -84,10 +94,11 @@ class ChatHistory(BaseAppModel):
     """Chat history response"""
     session_id: str = Field(...)
     messages: List[Message] = Field(...)
-    total_messages: int = Field(...)
-    page: int = Field(1, ge=1)
+    total_messages: Optional[int] = None
+    page: Optional[int] = Field(None, ge=1)
     page_size: int = Field(50, ge=1, le=100)
     has_more: bool = Field(False)
+    next_cursor: Optional[str] = None
 
 
 class ConversationSummary(BaseAppModel):
@@ -100,16 +111,23 @@ class ConversationSummary(BaseAppModel):
     last_message_preview: Optional[str] = None
 
 
+class ConversationList(BaseAppModel):
+    """Page of conversation summaries (keyset pagination)"""
+    conversations: List[ConversationSummary] = Field(...)
+    has_more: bool = Field(False)
+    next_cursor: Optional[str] = None
+
+
 class ChatSettings(BaseAppModel):
     """Chat configuration settings"""
     model: str = Field("gpt-3.5-turbo")
-    temperature: float = Field(0.7, ge=0.0, le=2.0)
-    max_tokens: int = Field(1000, ge=1, le=4000)
-    top_p: float = Field(1.0, ge=0.0, le=1.0)
-    frequency_penalty: float = Field(0.0, ge=-2.0, le=2.0)
-    presence_penalty: float = Field(0.0, ge=-2.0, le=2.0)
+    temperature: Temperature = 0.7
+    max_tokens: Annotated[int, Interval(ge=1, le=4000)] = 1000
+    top_p: Probability = 1.0
+    frequency_penalty: Penalty = 0.0
+    presence_penalty: Penalty = 0.0
     system_prompt: Optional[str] = None
-    context_window: int = Field(50, ge=1, le=100) # Updated default and max
+    context_window: ContextWindow = 50 # Updated default and max
 
 
 class ErrorResponse(BaseAppModel):
@@ -118,7 +136,7 @@ class ErrorResponse(BaseAppModel):
     message: str = Field(...)
     code: Optional[str] = None
     details: Optional[Dict[str, Any]] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
 
 
 # Specific WebSocket data models
@@ -143,16 +161,34 @@ class ErrorWebSocketData(BaseAppModel):
 
 class WebSocketMessage(BaseAppModel):
     """WebSocket message format"""
+    model_config = ConfigDict(frozen=True)
+
     type: Literal["chat_message", "typing", "error", "status", "new_message", "typing_indicator", "pong", "feedback"] = Field(...)
     data: Union[ChatWebSocketData, TypingWebSocketData, StatusWebSocketData, ErrorWebSocketData, Dict[str, Any]] = Field(...)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
     session_id: Optional[str] = None
 
 
+class WebSocketFrame(msgspec.Struct, omit_defaults=True):
+    """WebSocket frame on the wire, decoded and encoded with msgspec.
+
+    `WebSocketMessage` documents the same shape for the API schema; frames
+    skip pydantic because they are handled once per message.
+    """
+    type: str
+    data: Dict[str, Any] = msgspec.field(default_factory=dict)
+    session_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+WEBSOCKET_FRAME_DECODER = msgspec.json.Decoder(WebSocketFrame)
+WEBSOCKET_FRAME_ENCODER = msgspec.json.Encoder()
+
+
 class ErrorResponse(BaseAppModel):
     """Error response model"""
     error: str = Field(...)
     message: str = Field(...)
     code: Optional[str] = None
     details: Optional[Dict[str, Any]] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
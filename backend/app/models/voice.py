@@ -3,16 +3,29 @@ Voice processing data models for AI ChatBot
 Models for audio handling and speech recognition
 """
 
-from pydantic import Field, field_validator
-from typing import Optional, Dict, Any, Literal
+from dataclasses import dataclass, field
+from annotated_types import Interval
+from pydantic import ConfigDict, Field, field_validator
+from typing import Annotated, Optional, Dict, Any, Literal, Union
 from datetime import datetime
-from uuid import uuid4
-from app.models import BaseAppModel
+from app.models import BaseAppModel, Probability, new_id, now_utc
+
+
+ALLOWED_AUDIO_TYPES = frozenset({
+    "audio/wav", "audio/wave", "audio/x-wav",
+    "audio/mp3", "audio/mpeg",
+    "audio/mp4", "audio/m4a",
+    "audio/ogg", "audio/webm"
+})
+
+# Shared bounds for Whisper decoding settings
+WhisperTemperature = Annotated[float, Interval(ge=0.0, le=1.0)]
+Percent = Annotated[float, Interval(ge=0.0, le=100.0)]
 
 
 class AudioFile(BaseAppModel):
     """Audio file metadata"""
-    id: str = Field(default_factory=lambda: str(uuid4()))
+    id: str = Field(default_factory=new_id)
     filename: str = Field(...)
     content_type: str = Field(...)
     size_bytes: int = Field(..., gt=0)
@@ -20,19 +33,13 @@ class AudioFile(BaseAppModel):
     sample_rate: Optional[int] = None
     channels: Optional[int] = None
     format: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=now_utc)
 
     @field_validator("content_type")
     @classmethod
     def validate_content_type(cls, v):
         """Validate audio content type"""
-        allowed_types = [
-            "audio/wav", "audio/wave", "audio/x-wav",
-            "audio/mp3", "audio/mpeg",
-            "audio/mp4", "audio/m4a",
-            "audio/ogg", "audio/webm"
-        ]
-        if v not in allowed_types:
+        if v not in ALLOWED_AUDIO_TYPES:
             raise ValueError(f"Unsupported audio format: {v}")
         return v.strip()
 
@@ -46,119 +53,22 @@ class AudioFile(BaseAppModel):
         return v
 
 
-class VoiceRequest(BaseAppModel):
-    """Voice transcription request"""
-    audio_id: Optional[str] = None
-    session_id: Optional[str] = None
-    language: Optional[str] = Field("auto", description="Language code or 'auto'")
-    task: Literal["transcribe", "translate"] = Field("transcribe")
-    temperature: float = Field(0.0, ge=0.0, le=1.0)
-    auto_send: bool = Field(True, description="Auto-send transcribed text to chat")
-    metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
-
-
-class TranscriptionResult(BaseAppModel):
-    """Speech-to-text transcription result"""
-    id: str = Field(default_factory=lambda: str(uuid4()))
-    text: str = Field(...)
-    confidence: Optional[float] = Field(None, ge=0.0, le=1.0)
-    language: Optional[str] = None
-    duration: Optional[float] = None
-    segments: Optional[list] = None
-    processing_time: Optional[float] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-    @field_validator("text")
-    @classmethod
-    def validate_text(cls, v):
-        """Validate transcribed text"""
-        if not v or not v.strip():
-            raise ValueError("Transcription cannot be empty")
-        return v.strip()
-
-
-class VoiceResponse(BaseAppModel):
-    """Voice processing response"""
-    transcription: TranscriptionResult = Field(...)
-    audio_id: str = Field(...)
-    session_id: Optional[str] = None
-    auto_sent_to_chat: bool = Field(False)
-    chat_message_id: Optional[str] = None
-    metadata: Dict[str, Any] = Field(default_factory=dict)
-
-
-class VoiceSettings(BaseAppModel):
-    """Voice processing settings"""
-    model: Literal["tiny", "base", "small", "medium", "large"] = Field("base")
-    language: Optional[str] = Field("auto")
-    task: Literal["transcribe", "translate"] = Field("transcribe")
-    temperature: float = Field(0.0, ge=0.0, le=1.0)
-    best_of: int = Field(1, ge=1, le=5)
-    beam_size: int = Field(5, ge=1, le=10)
-    patience: Optional[float] = Field(None, ge=0.0, le=2.0)
-    length_penalty: Optional[float] = Field(None, ge=-1.0, le=1.0)
-    suppress_tokens: Optional[str] = Field("-1")
-    initial_prompt: Optional[str] = None
-    condition_on_previous_text: bool = Field(True)
-    fp16: bool = Field(True)
-    compression_ratio_threshold: float = Field(2.4, ge=0.0, le=10.0)
-    logprob_threshold: float = Field(-1.0, ge=-10.0, le=0.0)
-    no_speech_threshold: float = Field(0.6, ge=0.0, le=1.0)
-
-
-class AudioProcessingStatus(BaseAppModel):
-    """Audio processing status"""
-    audio_id: str = Field(...)
-    status: Literal["uploaded", "processing", "completed", "failed"] = Field(...)
-    progress: float = Field(0.0, ge=0.0, le=100.0)
-    message: Optional[str] = None
-    error: Optional[str] = None
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
-    processing_time: Optional[float] = None
-
-
-from pydantic import Field, field_validator
-from typing import Optional, Dict, Any, Literal, Union
-from datetime import datetime
-from uuid import uuid4
-from app.models import BaseAppModel
-
+@dataclass(slots=True)
+class AudioFileDTO:
+    """Audio file metadata passed between the voice route and service.
 
-class AudioFile(BaseAppModel):
-    """Audio file metadata"""
-    id: str = Field(default_factory=lambda: str(uuid4()))
-    filename: str = Field(...)
-    content_type: str = Field(...)
-    size_bytes: int = Field(..., gt=0)
+    Internal only: the upload is validated by `VoiceService.load_audio`, so
+    this skips pydantic validation on the request path.
+    """
+    filename: str
+    content_type: str
+    size_bytes: int
+    id: str = field(default_factory=new_id)
     duration_seconds: Optional[float] = None
     sample_rate: Optional[int] = None
     channels: Optional[int] = None
     format: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-
-    @field_validator("content_type")
-    @classmethod
-    def validate_content_type(cls, v):
-        """Validate audio content type"""
-        allowed_types = [
-            "audio/wav", "audio/wave", "audio/x-wav",
-            "audio/mp3", "audio/mpeg",
-            "audio/mp4", "audio/m4a",
-            "audio/ogg", "audio/webm"
-        ]
-        if v not in allowed_types:
-            raise ValueError(f"Unsupported audio format: {v}")
-        return v.strip()
-
-    @field_validator("size_bytes")
-    @classmethod
-    def validate_size_bytes(cls, v):
-        """Validate file size (max 25MB)"""
-        max_size = 25 * 1024 * 1024  # 25MB
-        if v > max_size:
-            raise ValueError(f"File too large: {v} bytes (max: {max_size})")
-        return v
+    created_at: datetime = field(default_factory=now_utc)
 
 
 class VoiceRequest(BaseAppModel):
@@ -167,21 +77,23 @@ class VoiceRequest(BaseAppModel):
     session_id: Optional[str] = None
     language: Optional[str] = Field("auto", description="Language code or 'auto'")
     task: Literal["transcribe", "translate"] = Field("transcribe")
-    temperature: float = Field(0.0, ge=0.0, le=1.0)
+    temperature: WhisperTemperature = 0.0
     auto_send: bool = Field(True, description="Auto-send transcribed text to chat")
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
 
 class TranscriptionResult(BaseAppModel):
     """Speech-to-text transcription result"""
-    id: str = Field(default_factory=lambda: str(uuid4()))
+    model_config = ConfigDict(frozen=True)
+
+    id: str = Field(default_factory=new_id)
     text: str = Field(...)
-    confidence: Optional[float] = Field(None, ge=0.0, le=1.0)
+    confidence: Optional[Probability] = None
     language: Optional[str] = None
     duration: Optional[float] = None
     segments: Optional[list] = None
     processing_time: Optional[float] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
 
     @field_validator("text")
     @classmethod
@@ -194,6 +106,8 @@ class TranscriptionResult(BaseAppModel):
 
 class VoiceResponse(BaseAppModel):
     """Voice processing response"""
+    model_config = ConfigDict(frozen=True)
+
     transcription: TranscriptionResult = Field(...)
     audio_id: str = Field(...)
     session_id: Optional[str] = None
@@ -205,27 +119,28 @@ class VoiceResponse(BaseAppModel):
 class VoiceSettings(BaseAppModel):
     """Voice processing settings"""
     model: Literal["tiny", "base", "small", "medium", "large"] = Field("base")
-    language: Optional[str] = Field("auto")
+    # "auto", a Whisper language code ("en") or name ("haitian creole")
+    language: Optional[str] = Field("auto", max_length=32, pattern=r"^[A-Za-z][A-Za-z -]*$")
     task: Literal["transcribe", "translate"] = Field("transcribe")
-    temperature: float = Field(0.0, ge=0.0, le=1.0)
-    best_of: int = Field(1, ge=1, le=5)
-    beam_size: int = Field(5, ge=1, le=10)
-    patience: Optional[float] = Field(None, ge=0.0, le=2.0)
-    length_penalty: Optional[float] = Field(None, ge=-1.0, le=1.0)
+    temperature: WhisperTemperature = 0.0
+    best_of: Annotated[int, Interval(ge=1, le=5)] = 1
+    beam_size: Annotated[int, Interval(ge=1, le=10)] = 5
+    patience: Optional[Annotated[float, Interval(ge=0.0, le=2.0)]] = None
+    length_penalty: Optional[Annotated[float, Interval(ge=-1.0, le=1.0)]] = None
     suppress_tokens: Optional[str] = Field("-1")
     initial_prompt: Optional[str] = None
     condition_on_previous_text: bool = Field(True)
     fp16: bool = Field(True)
-    compression_ratio_threshold: float = Field(2.4, ge=0.0, le=10.0)
-    logprob_threshold: float = Field(-1.0, ge=-10.0, le=0.0)
-    no_speech_threshold: float = Field(0.6, ge=0.0, le=1.0)
+    compression_ratio_threshold: Annotated[float, Interval(ge=0.0, le=10.0)] = 2.4
+    logprob_threshold: Annotated[float, Interval(ge=-10.0, le=0.0)] = -1.0
+    no_speech_threshold: Probability = 0.6
 
 
 class AudioProcessingStatus(BaseAppModel):
     """Audio processing status"""
     audio_id: str = Field(...)
     status: Literal["uploaded", "processing", "completed", "failed"] = Field(...)
-    progress: float = Field(0.0, ge=0.0, le=100.0)
+    progress: Percent = 0.0
     message: Optional[str] = None
     error: Optional[str] = None
     started_at: Optional[datetime] = None
@@ -235,12 +150,12 @@ class AudioProcessingStatus(BaseAppModel):
 
 class AudioChunk(BaseAppModel):
     """Real-time audio chunk for streaming"""
-    chunk_id: str = Field(default_factory=lambda: str(uuid4()))
+    chunk_id: str = Field(default_factory=new_id)
     audio_id: str = Field(...)
     sequence: int = Field(..., ge=0)
     data: bytes = Field(...)
     is_final: bool = Field(False)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=now_utc)
 
 
 class VoiceMetrics(BaseAppModel):
@@ -285,26 +200,4 @@ class VoiceWebSocketMessage(BaseAppModel):
     data: Union[AudioChunkWebSocketData, TranscriptionWebSocketData, VoiceStatusWebSocketData, VoiceErrorWebSocketData, Dict[str, Any]] = Field(...)
     audio_id: Optional[str] = None
     session_id: Optional[str] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-
-class AudioChunk(BaseAppModel):
-    """Real-time audio chunk for streaming"""
-    chunk_id: str = Field(default_factory=lambda: str(uuid4()))
-    audio_id: str = Field(...)
-    sequence: int = Field(..., ge=0)
-    data: bytes = Field(...)
-    is_final: bool = Field(False)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-
-class VoiceMetrics(BaseAppModel):
-    """Voice processing metrics"""
-    total_requests: int = Field(0)
-    successful_transcriptions: int = Field(0)
-    failed_transcriptions: int = Field(0)
-    average_processing_time: float = Field(0.0)
-    average_confidence: float = Field(0.0)
-    total_audio_duration: float = Field(0.0)
-    supported_languages: list = Field(default_factory=list)
-    model_performance: Dict[str, Any] = Field(default_factory=dict)
+    timestamp: datetime = Field(default_factory=now_utc)
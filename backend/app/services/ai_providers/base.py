@@ -3,16 +3,122 @@ Base AI Provider interface
 Abstract class for different AI providers
 """
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, AsyncGenerator, Awaitable, Callable, ClassVar, MutableMapping, Tuple
 from app.models.chat import Message, ChatSettings
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# History messages are re-wrapped on every turn of a conversation
+USER_QUERY_CACHE_SIZE = 4096
+USER_QUERY_CLOSE_TAG = "</user_query>"
+
+
+@lru_cache(maxsize=USER_QUERY_CACHE_SIZE)
+def wrap_user_query(text: str) -> str:
+    """Wrap user input in <user_query> and sanitize inner tags."""
+    if USER_QUERY_CLOSE_TAG in text:
+        text = text.replace(USER_QUERY_CLOSE_TAG, "</ user_query>")
+    return f"<user_query>{text}</user_query>"
+
+
+# validate_model() spends a real completion; results are shared by all instances
+# of a provider class and expire so failures and deprecations get re-checked
+MODEL_CACHE_SIZE = 128
+MODEL_CACHE_TTL = 3600
+
+# Liveness probes and UI polling overlap; both calls hit the provider API
+HEALTH_CHECK_TTL = 10.0
+MODEL_LIST_TTL = 300.0
+
+
+# Prompt + completion limits; a prompt over the limit is rejected only after a
+# full roundtrip, so history is trimmed to fit before sending
+MODEL_CONTEXT_LIMITS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "gemini-pro": 32760,
+    "gemini-1.0-pro": 32760,
+    "gemini-1.5-pro": 2097152,
+    "gemini-1.5-flash": 1048576,
+}
+DEFAULT_CONTEXT_LIMIT = 8192
+# Headroom for role markers and <user_query> wrapping the estimate does not see
+PROMPT_TOKEN_MARGIN = 256
+
+
+@lru_cache(maxsize=64)
+def context_limit(model: str) -> int:
+    """Context limit for a model name or its dated variant (longest known prefix)"""
+    if model in MODEL_CONTEXT_LIMITS:
+        return MODEL_CONTEXT_LIMITS[model]
+    prefixes = [name for name in MODEL_CONTEXT_LIMITS if model.startswith(name)]
+    return MODEL_CONTEXT_LIMITS[max(prefixes, key=len)] if prefixes else DEFAULT_CONTEXT_LIMIT
+
+
+# Context messages are re-counted on every turn of a conversation
+TOKEN_COUNT_CACHE_SIZE = 4096
+DEFAULT_TOKENIZER_MODEL = "gpt-3.5-turbo"
+
+
+# Model name -> tiktoken encoding (None if it cannot be loaded). Loading may
+# download and parse BPE files, so it only happens through ensure_encoder
+_encoders: Dict[str, Any] = {}
+
+
+def _load_encoder(model: str) -> None:
+    """Load the tiktoken encoding for a model (blocking)"""
+    if tiktoken is None:
+        _encoders[model] = None
+        return
+    try:
+        _encoders[model] = tiktoken.encoding_for_model(model)
+    except Exception:
+        # Unknown model name or tokenizer files unavailable
+        _encoders[model] = None
+
+
+async def ensure_encoder(model: str) -> None:
+    """Load a model's encoding in a worker thread on first use"""
+    if model not in _encoders:
+        await asyncio.to_thread(_load_encoder, model)
+
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def _encoded_length(encoder: Any, text: str) -> int:
+    return len(encoder.encode(text))
+
+
+def count_tokens(model: str, text: str) -> int:
+    """Token count for an OpenAI model; ~4 characters per token until its encoding is loaded"""
+    encoder = _encoders.get(model)
+    if encoder is None:
+        return len(text) // 4
+    return _encoded_length(encoder, text)
+
 
 class BaseAIProvider(ABC):
     """Abstract base class for AI providers"""
 
+    # Subclasses that use _validate_cached() define their own TTLCache
+    _model_cache: ClassVar[MutableMapping[str, bool]]
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self._validation_locks: Dict[str, asyncio.Lock] = {}
+        self._shared_results: Dict[str, Tuple[float, Any]] = {}
+        self._shared_locks: Dict[str, asyncio.Lock] = {}
 
     @abstractmethod
     async def generate_response(
@@ -22,7 +128,7 @@ class BaseAIProvider(ABC):
         settings: Optional[ChatSettings] = None,
         stream: bool = False
     ) -> str:
-        """Generate AI response for user message"""
+        """Generate the full AI response; chunks come from generate_streaming_response"""
         pass
 
     @abstractmethod
@@ -60,7 +166,76 @@ class BaseAIProvider(ABC):
         """Build message list for provider API"""
         pass
 
-    def estimate_tokens(self, text: str) -> int:
+    def _fit_context(
+        self,
+        context: List[Message],
+        settings: ChatSettings,
+        model: str,
+        system_prompt: Optional[str],
+        user_message: str
+    ) -> List[Message]:
+        """Newest context messages that fit both the context window and the model's token budget"""
+
+        window = settings.context_window
+        if len(context) > window:
+            context = context[-window:]
+
+        budget = (context_limit(model) - settings.max_tokens - PROMPT_TOKEN_MARGIN
+                  - self.estimate_tokens(user_message, model))
+        if system_prompt:
+            budget -= self.estimate_tokens(system_prompt, model)
+
+        used = 0
+        for kept, msg in enumerate(reversed(context)):
+            used += self.estimate_tokens(msg.content, model)
+            if used > budget:
+                return context[len(context) - kept:]
+        return context
+
+    async def _validate_cached(
+        self,
+        model_name: str,
+        check: Callable[[str], Awaitable[bool]]
+    ) -> bool:
+        """Run check() through the class-level _model_cache, one caller per model"""
+
+        cached = self._model_cache.get(model_name)
+        if cached is not None:
+            return cached
+
+        lock = self._validation_locks.setdefault(model_name, asyncio.Lock())
+        async with lock:
+            cached = self._model_cache.get(model_name)
+            if cached is None:
+                cached = await check(model_name)
+                self._model_cache[model_name] = cached
+            return cached
+
+    async def _shared_result(
+        self,
+        key: str,
+        ttl: float,
+        fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Share one fetch() between overlapping callers; successes are kept for ttl seconds"""
+
+        entry = self._shared_results.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+
+        lock = self._shared_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._shared_results.get(key)
+            if entry is not None and time.monotonic() - entry[0] < ttl:
+                return entry[1]
+            result = await fetch()
+            self._shared_results[key] = (time.monotonic(), result)
+            return result
+
+    async def close(self) -> None:
+        """Release provider resources (default: nothing to release)"""
+
+    def estimate_tokens(self, text: str, model: Optional[str] = None) -> int:
         """Estimate token count for text (default implementation)"""
         # Simple estimation: ~4 characters per token
         return len(text) // 4
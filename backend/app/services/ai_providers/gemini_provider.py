@@ -4,21 +4,35 @@ Google Gemini Provider implementation
 
 import time
 import asyncio
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, AsyncGenerator, ClassVar
 import structlog
+from cachetools import TTLCache
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
-from .base import BaseAIProvider
+from .base import BaseAIProvider, HEALTH_CHECK_TTL, MODEL_CACHE_SIZE, MODEL_CACHE_TTL, MODEL_LIST_TTL, wrap_user_query
 from app.models.chat import Message, ChatSettings
 from app.utils.prompts import PromptManager
 
 logger = structlog.get_logger()
 
 
+@lru_cache(maxsize=64)
+def _generation_config(temperature: float, top_p: float, max_tokens: int) -> genai.types.GenerationConfig:
+    """GenerationConfig shared by all requests with the same sampling settings"""
+    return genai.types.GenerationConfig(
+        temperature=temperature,
+        top_p=top_p,
+        max_output_tokens=max_tokens,
+    )
+
+
 class GeminiProvider(BaseAIProvider):
     """Google Gemini API provider"""
 
+    _model_cache: ClassVar[TTLCache] = TTLCache(maxsize=MODEL_CACHE_SIZE, ttl=MODEL_CACHE_TTL)
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
 
@@ -30,7 +44,6 @@ class GeminiProvider(BaseAIProvider):
         self.model = genai.GenerativeModel(self.model_name)
 
         self.prompt_manager = PromptManager()
-        self._model_cache = {}
 
         # Safety settings
         self.safety_settings = {
@@ -47,7 +60,7 @@ class GeminiProvider(BaseAIProvider):
         settings: Optional[ChatSettings] = None,
         stream: bool = False
     ) -> str:
-        """Generate AI response for user message"""
+        """Generate AI response for user message (`stream` is deprecated and ignored)"""
 
         start_time = time.time()
 
@@ -64,14 +77,8 @@ class GeminiProvider(BaseAIProvider):
                        message_length=len(message),
                        context_length=len(context))
 
-            if stream:
-                # For streaming, collect all chunks
-                response_text = ""
-                async for chunk in self.generate_streaming_response(message, context, settings):
-                    response_text += chunk
-                return response_text
-            else:
-                return await self._generate_single_response(conversation_text, chat_settings)
+            # One non-streaming request; chunks are only for generate_streaming_response
+            return await self._generate_single_response(conversation_text, chat_settings)
 
         except Exception as e:
             logger.error("Gemini generation failed", error=str(e))
@@ -93,28 +100,20 @@ class GeminiProvider(BaseAIProvider):
         conversation_text = self._build_conversation_text(message, context, chat_settings)
 
         # Configure generation
-        generation_config = genai.types.GenerationConfig(
-            temperature=chat_settings.temperature,
-            top_p=chat_settings.top_p,
-            max_output_tokens=chat_settings.max_tokens,
+        generation_config = _generation_config(
+            chat_settings.temperature, chat_settings.top_p, chat_settings.max_tokens
         )
 
         try:
-            # Run in thread pool since Gemini doesn't have native async streaming
-            loop = asyncio.get_event_loop()
-
-            def _generate_stream():
-                response = self.model.generate_content(
-                    conversation_text,
-                    generation_config=generation_config,
-                    safety_settings=self.safety_settings,
-                    stream=True
-                )
-                return response
-
-            stream_response = await loop.run_in_executor(None, _generate_stream)
+            # Native async streaming: chunks reach the loop as they arrive
+            stream_response = await self.model.generate_content_async(
+                conversation_text,
+                generation_config=generation_config,
+                safety_settings=self.safety_settings,
+                stream=True
+            )
 
-            for chunk in stream_response:
+            async for chunk in stream_response:
                 if chunk.text:
                     yield chunk.text
 
@@ -130,24 +129,15 @@ class GeminiProvider(BaseAIProvider):
         """Generate single AI response"""
 
         # Configure generation
-        generation_config = genai.types.GenerationConfig(
-            temperature=settings.temperature,
-            top_p=settings.top_p,
-            max_output_tokens=settings.max_tokens,
+        generation_config = _generation_config(
+            settings.temperature, settings.top_p, settings.max_tokens
         )
 
-        # Run in thread pool since Gemini doesn't have native async
-        loop = asyncio.get_event_loop()
-
-        def _generate():
-            response = self.model.generate_content(
-                conversation_text,
-                generation_config=generation_config,
-                safety_settings=self.safety_settings
-            )
-            return response
-
-        response = await loop.run_in_executor(None, _generate)
+        response = await self.model.generate_content_async(
+            conversation_text,
+            generation_config=generation_config,
+            safety_settings=self.safety_settings
+        )
 
         if not response.text:
             raise ValueError("Empty response from Gemini")
@@ -180,7 +170,7 @@ class GeminiProvider(BaseAIProvider):
             })
 
         # Add context messages
-        for msg in context[-settings.context_window:]:
+        for msg in self._fit_context(context, settings, self.model_name, system_prompt, user_message):
             if msg.role in ["user", "assistant"]:
                 # Map roles for Gemini
                 role = "user" if msg.role == "user" else "model"
@@ -197,11 +187,6 @@ class GeminiProvider(BaseAIProvider):
 
         return messages
 
-    def _wrap_user_query(self, text: str) -> str:
-        """Wrap user input in <user_query> and sanitize inner tags."""
-        sanitized = text.replace("</user_query>", "</ user_query>")
-        return f"<user_query>{sanitized}</user_query>"
-
     def _build_conversation_text(
         self,
         user_message: str,
@@ -209,80 +194,73 @@ class GeminiProvider(BaseAIProvider):
         settings: ChatSettings
     ) -> str:
         """Build conversation text for Gemini (с защитой от промпт-инъекций)"""
+        # Pieces are joined once at the end; no per-message intermediate strings
         conversation_parts = []
         system_prompt = settings.system_prompt or self.prompt_manager.get_system_prompt()
         if system_prompt:
-            conversation_parts.append(f"System: {system_prompt}\n")
-        for msg in context[-settings.context_window:]:
-            if msg.role in ["user", "assistant"]:
-                role_name = "Human" if msg.role == "user" else "Assistant"
-                content = msg.content
-                if msg.role == "user":
-                    content = self._wrap_user_query(content)
-                conversation_parts.append(f"{role_name}: {content}\n")
-        conversation_parts.append(f"Human: {self._wrap_user_query(user_message)}\n")
-        conversation_parts.append("Assistant: ")
+            conversation_parts.extend(("System: ", system_prompt, "\n"))
+        for msg in self._fit_context(context, settings, self.model_name, system_prompt, user_message):
+            if msg.role == "user":
+                conversation_parts.extend(("Human: ", wrap_user_query(msg.content), "\n"))
+            elif msg.role == "assistant":
+                conversation_parts.extend(("Assistant: ", msg.content, "\n"))
+        conversation_parts.extend(("Human: ", wrap_user_query(user_message), "\nAssistant: "))
         return "".join(conversation_parts)
 
     async def validate_model(self, model_name: str) -> bool:
         """Validate if model is available"""
+        return await self._validate_cached(model_name, self._check_model)
 
-        if model_name in self._model_cache:
-            return self._model_cache[model_name]
+    async def _check_model(self, model_name: str) -> bool:
+        """Probe the model with a one-token request"""
 
         try:
             # Try to create model instance
             test_model = genai.GenerativeModel(model_name)
 
             # Try a simple generation
-            loop = asyncio.get_event_loop()
-
-            def _test_generate():
-                return test_model.generate_content("Hello",
-                                                 generation_config=genai.types.GenerationConfig(max_output_tokens=1))
-
-            await loop.run_in_executor(None, _test_generate)
+            await test_model.generate_content_async("Hello",
+                                                    generation_config=genai.types.GenerationConfig(max_output_tokens=1))
 
-            self._model_cache[model_name] = True
             return True
 
         except Exception as e:
             logger.warning("Gemini model validation failed", model=model_name, error=str(e))
-            self._model_cache[model_name] = False
             return False
 
     async def get_available_models(self) -> List[str]:
         """Get list of available models"""
 
         try:
-            loop = asyncio.get_event_loop()
-
-            def _list_models():
-                models = genai.list_models()
-                return [model.name.split('/')[-1] for model in models
-                       if 'generateContent' in model.supported_generation_methods]
-
-            model_names = await loop.run_in_executor(None, _list_models)
-            return model_names
-
+            return await self._shared_result("models", MODEL_LIST_TTL, self._fetch_models)
         except Exception as e:
             logger.error("Failed to fetch Gemini models", error=str(e))
             return ["gemini-pro", "gemini-pro-vision"]  # Fallback defaults
 
+    async def _fetch_models(self) -> List[str]:
+        """List chat-capable models from the API"""
+
+        def _list_models():
+            models = genai.list_models()
+            return [model.name.split('/')[-1] for model in models
+                   if 'generateContent' in model.supported_generation_methods]
+
+        # list_models() has no async variant; it is TTL-cached, so a pooled thread is enough
+        return await asyncio.to_thread(_list_models)
+
     async def health_check(self) -> Dict[str, Any]:
         """Check Gemini service health"""
+        return await self._shared_result("health", HEALTH_CHECK_TTL, self._check_health)
+
+    async def _check_health(self) -> Dict[str, Any]:
+        """Send a short test request"""
 
         try:
             start_time = time.time()
 
             # Simple test request
-            loop = asyncio.get_event_loop()
-
-            def _test_health():
-                return self.model.generate_content("Hello",
-                                                 generation_config=genai.types.GenerationConfig(max_output_tokens=5))
-
-            response = await loop.run_in_executor(None, _test_health)
+            await self.model.generate_content_async("Hello",
+                                                    generation_config=genai.types.GenerationConfig(max_output_tokens=5))
 
             response_time = time.time() - start_time
 
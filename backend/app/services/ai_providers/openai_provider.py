@@ -3,11 +3,13 @@ OpenAI Provider implementation
 """
 
 import time
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from typing import List, Dict, Any, Optional, AsyncGenerator, ClassVar
+import httpx
 import structlog
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
-from .base import BaseAIProvider
+from .base import BaseAIProvider, HEALTH_CHECK_TTL, MODEL_CACHE_SIZE, MODEL_CACHE_TTL, MODEL_LIST_TTL, DEFAULT_TOKENIZER_MODEL, count_tokens, ensure_encoder, wrap_user_query
 from app.models.chat import Message, ChatSettings
 from app.utils.prompts import PromptManager
 
@@ -17,14 +19,25 @@ logger = structlog.get_logger()
 class OpenAIProvider(BaseAIProvider):
     """OpenAI API provider"""
 
+    _model_cache: ClassVar[TTLCache] = TTLCache(maxsize=MODEL_CACHE_SIZE, ttl=MODEL_CACHE_TTL)
+
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
+        # Long-lived pool: keep-alive and HTTP/2 reuse TLS sessions across requests
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.get("max_connections", 256),
+                max_keepalive_connections=config.get("max_keepalive_connections", 64)
+            ),
+            timeout=httpx.Timeout(config.get("timeout", 60.0), connect=10.0),
+            http2=True
+        )
         self.client = AsyncOpenAI(
             api_key=config.get("api_key"),
-            base_url=config.get("base_url", "https://api.openai.com/v1")
+            base_url=config.get("base_url", "https://api.openai.com/v1"),
+            http_client=self._http
         )
         self.prompt_manager = PromptManager()
-        self._model_cache = {}
 
     async def generate_response(
         self,
@@ -33,13 +46,14 @@ class OpenAIProvider(BaseAIProvider):
         settings: Optional[ChatSettings] = None,
         stream: bool = False
     ) -> str:
-        """Generate AI response for user message"""
+        """Generate AI response for user message (`stream` is deprecated and ignored)"""
 
         start_time = time.time()
 
         try:
             # Use provided settings or defaults
             chat_settings = settings or ChatSettings()
+            await ensure_encoder(chat_settings.model)
 
             # Build messages for OpenAI
             messages = self.build_messages(message, context, chat_settings)
@@ -50,14 +64,8 @@ class OpenAIProvider(BaseAIProvider):
                        message_length=len(message),
                        context_length=len(context))
 
-            if stream:
-                # For streaming, collect all chunks
-                response_text = ""
-                async for chunk in self.generate_streaming_response(message, context, settings):
-                    response_text += chunk
-                return response_text
-            else:
-                return await self._generate_single_response(messages, chat_settings)
+            # One non-streaming request; chunks are only for generate_streaming_response
+            return await self._generate_single_response(messages, chat_settings)
 
         except Exception as e:
             logger.error("OpenAI generation failed", error=str(e))
@@ -76,6 +84,7 @@ class OpenAIProvider(BaseAIProvider):
         """Generate streaming AI response"""
 
         chat_settings = settings or ChatSettings()
+        await ensure_encoder(chat_settings.model)
         messages = self.build_messages(message, context, chat_settings)
 
         stream = await self.client.chat.completions.create(
@@ -115,20 +124,17 @@ class OpenAIProvider(BaseAIProvider):
         if not content:
             raise ValueError("Empty response from OpenAI")
 
-        # Log usage
+        # Log usage; cached_tokens is the prompt prefix served from the provider cache
         if response.usage:
+            details = getattr(response.usage, "prompt_tokens_details", None)
             logger.info("OpenAI usage",
                        prompt_tokens=response.usage.prompt_tokens,
+                       cached_tokens=getattr(details, "cached_tokens", None) or 0,
                        completion_tokens=response.usage.completion_tokens,
                        total_tokens=response.usage.total_tokens)
 
         return content.strip()
 
-    def _wrap_user_query(self, text: str) -> str:
-        """Wrap user input in <user_query> and sanitize inner tags."""
-        sanitized = text.replace("</user_query>", "</ user_query>")
-        return f"<user_query>{sanitized}</user_query>"
-
     def build_messages(
         self,
         user_message: str,
@@ -136,6 +142,8 @@ class OpenAIProvider(BaseAIProvider):
         settings: ChatSettings
     ) -> List[Dict[str, str]]:
         """Build message list for OpenAI API (с защитой от промпт-инъекций)"""
+        # System prompt first and history unchanged between turns: the provider's
+        # prompt cache only matches byte-identical prefixes
         messages = []
         system_prompt = settings.system_prompt or self.prompt_manager.get_system_prompt()
         if system_prompt:
@@ -143,26 +151,29 @@ class OpenAIProvider(BaseAIProvider):
                 "role": "system",
                 "content": system_prompt
             })
-        for msg in context[-settings.context_window:]:
-            if msg.role in ["user", "assistant"]:
-                content = msg.content
-                if msg.role == "user":
-                    content = self._wrap_user_query(content)
+        for msg in self._fit_context(context, settings, settings.model, system_prompt, user_message):
+            if msg.role == "user":
                 messages.append({
-                    "role": msg.role,
-                    "content": content
+                    "role": "user",
+                    "content": wrap_user_query(msg.content)
+                })
+            elif msg.role == "assistant":
+                messages.append({
+                    "role": "assistant",
+                    "content": msg.content
                 })
         messages.append({
             "role": "user",
-            "content": self._wrap_user_query(user_message)
+            "content": wrap_user_query(user_message)
         })
         return messages
 
     async def validate_model(self, model_name: str) -> bool:
         """Validate if model is available"""
+        return await self._validate_cached(model_name, self._check_model)
 
-        if model_name in self._model_cache:
-            return self._model_cache[model_name]
+    async def _check_model(self, model_name: str) -> bool:
+        """Probe the model with a one-token request"""
 
         try:
             # Try to make a simple request to validate model
@@ -171,32 +182,39 @@ class OpenAIProvider(BaseAIProvider):
                 messages=[{"role": "user", "content": "test"}],
                 max_tokens=1
             )
-            self._model_cache[model_name] = True
             return True
 
         except Exception as e:
             logger.warning("OpenAI model validation failed", model=model_name, error=str(e))
-            self._model_cache[model_name] = False
             return False
 
     async def get_available_models(self) -> List[str]:
         """Get list of available models"""
 
         try:
-            models = await self.client.models.list()
-            return [model.id for model in models.data if "gpt" in model.id]
+            return await self._shared_result("models", MODEL_LIST_TTL, self._fetch_models)
         except Exception as e:
             logger.error("Failed to fetch OpenAI models", error=str(e))
             return ["gpt-3.5-turbo", "gpt-4"]  # Fallback defaults
 
+    async def _fetch_models(self) -> List[str]:
+        """List chat-capable models from the API"""
+
+        models = await self.client.models.list()
+        return [model.id for model in models.data if "gpt" in model.id]
+
     async def health_check(self) -> Dict[str, Any]:
         """Check OpenAI service health"""
+        return await self._shared_result("health", HEALTH_CHECK_TTL, self._check_health)
+
+    async def _check_health(self) -> Dict[str, Any]:
+        """Send a short test request"""
 
         try:
             start_time = time.time()
 
             # Simple test request
-            response = await self.client.chat.completions.create(
+            await self.client.chat.completions.create(
                 model=self.config.get("model", "gpt-3.5-turbo"),
                 messages=[{"role": "user", "content": "Hello"}],
                 max_tokens=5
@@ -219,3 +237,11 @@ class OpenAIProvider(BaseAIProvider):
                 "error": str(e),
                 "api_available": False
             }
+
+    def estimate_tokens(self, text: str, model: Optional[str] = None) -> int:
+        """Count tokens with the model's tiktoken encoding"""
+        return count_tokens(model or self.config.get("model") or DEFAULT_TOKENIZER_MODEL, text)
+
+    async def close(self) -> None:
+        """Close the HTTP connection pool"""
+        await self._http.aclose()
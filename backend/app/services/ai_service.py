@@ -6,7 +6,8 @@ Handles chat completions and AI responses from different providers
 import asyncio
 import json
 import time
-from typing import List, Dict, Any, Optional, AsyncGenerator, Type
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple, Type
 import structlog
 
 from app.core.config import get_settings
@@ -15,9 +16,19 @@ from app.utils.prompts import PromptManager
 from app.services.ai_providers.openai_provider import OpenAIProvider
 from app.services.ai_providers.gemini_provider import GeminiProvider
 from app.services.vector_memory_service import VectorMemoryService # Import new service
+from app.utils.semantic_cache import LSHSemanticCache
 
 logger = structlog.get_logger()
 
+# Settings read as `<provider>_<key>` into each provider's config dict
+PROVIDER_CONFIG_KEYS = (
+    "api_key", "model", "base_url",
+    "max_connections", "max_keepalive_connections", "timeout"
+)
+
+# Header of the retrieved-documents block appended to the system message
+RAG_PREFIX = "\n\nRelevant information from memory:\n"
+
 class AIService:
     """Universal AI service with multiple provider support"""
 
@@ -26,6 +37,8 @@ class AIService:
         "openai": OpenAIProvider,
         "gemini": GeminiProvider,
     }
+    # Registered names for error messages; refreshed by register_provider
+    _provider_names: Tuple[str, ...] = tuple(_providers)
 
     @classmethod
     def register_provider(cls, name: str, provider_class: Type):
@@ -33,14 +46,37 @@ class AIService:
         if not issubclass(provider_class, BaseAIProvider):
             raise TypeError("Provider must be a subclass of BaseAIProvider")
         cls._providers[name] = provider_class
+        cls._provider_names = tuple(cls._providers)
         logger.info(f"AI Provider '{name}' registered.")
 
     def __init__(self):
         self.settings = get_settings()
         self.prompt_manager = PromptManager()
         self.vector_memory_service = VectorMemoryService()
+        # Near-duplicate questions reuse earlier retrievals instead of a vector search
+        self.rag_cache = LSHSemanticCache(
+            self.settings.rag_cache_size,
+            self.settings.rag_cache_threshold,
+            tables=self.settings.rag_cache_lsh_tables,
+            bits=self.settings.rag_cache_lsh_bits,
+            quantize=self.settings.rag_cache_quantize,
+            ttl=self.settings.rag_cache_ttl
+        )
+        self._rag_cache_generation = self.vector_memory_service.generation
         self._initialized_providers: Dict[str, Any] = {} # Store initialized provider instances
         self.current_provider = self.settings.ai_provider # Set initial current provider
+        self._provider_configs = {name: self._provider_config(name) for name in self._providers}
+        # Per-provider entries for get_provider_info, keyed by (name, class) so a
+        # re-registered provider is described afresh; failures are not cached
+        self._provider_info_cache: Dict[Tuple[str, Type], Dict[str, Any]] = {}
+
+    def _provider_config(self, provider_name: str) -> Dict[str, Any]:
+        """Settings named `<provider>_<key>` as the provider's config dict"""
+        config = {}
+        for key in PROVIDER_CONFIG_KEYS:
+            if hasattr(self.settings, f"{provider_name}_{key}"):
+                config[key] = getattr(self.settings, f"{provider_name}_{key}")
+        return config
 
     def get_provider(self, provider_name: Optional[str] = None):
         """Get AI provider instance (lazy initialization)"""
@@ -48,15 +84,14 @@ class AIService:
         provider_name = provider_name or self.current_provider
 
         if provider_name not in self._providers:
-            raise ValueError(f"Provider '{provider_name}' not registered. Available: {list(self._providers.keys())}")
+            raise ValueError(f"Provider '{provider_name}' not registered. Available: {list(self._provider_names)}")
 
         if provider_name not in self._initialized_providers:
             provider_class = self._providers[provider_name]
-            config = {}
-            if hasattr(self.settings, f"{provider_name}_api_key"):
-                config["api_key"] = getattr(self.settings, f"{provider_name}_api_key")
-            if hasattr(self.settings, f"{provider_name}_model"):
-                config["model"] = getattr(self.settings, f"{provider_name}_model")
+            config = self._provider_configs.get(provider_name)
+            if config is None:
+                # Registered after this service was created
+                config = self._provider_config(provider_name)
             try:
                 provider_instance = provider_class(config)
                 self._initialized_providers[provider_name] = provider_instance
@@ -78,18 +113,17 @@ class AIService:
         """Generate AI response for user message"""
 
         start_time = time.time()
+        provider_name = provider or self.current_provider
 
         try:
             # Get provider
-            ai_provider = self.get_provider(provider)
-            provider_name = provider or self.current_provider
+            ai_provider = self.get_provider(provider_name)
 
             # Use provided settings or defaults
             chat_settings = settings or ChatSettings()
 
             modified_context, rag_enabled = await self._get_rag_context_and_modify_messages(message, context)
 
-
             # Log request
             logger.info("AI request started",
                        provider=provider_name,
@@ -98,7 +132,7 @@ class AIService:
                        context_length=len(modified_context),
                        session_id=context[-1].session_id if context else None, # Assuming last message in context has session_id
                        user_message_preview=message[:50],
-                       rag_enabled=bool(rag_context))
+                       rag_enabled=rag_enabled)
 
             # Generate response using provider
             response = await ai_provider.generate_response(
@@ -109,14 +143,14 @@ class AIService:
 
         except Exception as e:
             logger.error("AI generation failed",
-                        provider=provider or self.current_provider,
+                        provider=provider_name,
                         error=str(e))
             return self._get_fallback_response()
 
         finally:
             processing_time = time.time() - start_time
             logger.info("AI request completed",
-                       provider=provider or self.current_provider,
+                       provider=provider_name,
                        processing_time=processing_time)
 
     async def generate_streaming_response(
@@ -128,10 +162,11 @@ class AIService:
     ) -> AsyncGenerator[str, None]:
         """Generate streaming AI response"""
 
+        provider_name = provider or self.current_provider
+
         try:
             # Get provider
-            ai_provider = self.get_provider(provider)
-            provider_name = provider or self.current_provider
+            ai_provider = self.get_provider(provider_name)
 
             # Use provided settings or defaults
             chat_settings = settings or ChatSettings()
@@ -152,27 +187,138 @@ class AIService:
 
         except Exception as e:
             logger.error("AI streaming generation failed",
-                        provider=provider or self.current_provider,
+                        provider=provider_name,
                         error=str(e))
             yield self._get_fallback_response()
 
+    async def generate_batch(
+        self,
+        messages: List[str],
+        contexts: List[List[Message]],
+        settings: Optional[ChatSettings] = None,
+        provider: Optional[str] = None
+    ) -> List[str]:
+        """Generate responses for independent turns; RAG retrieval is one vector search for all"""
+
+        provider_name = provider or self.current_provider
+
+        try:
+            ai_provider = self.get_provider(provider_name)
+            chat_settings = settings or ChatSettings()
+            modified_contexts = await self._get_rag_context_and_modify_messages_batch(messages, contexts)
+        except Exception as e:
+            logger.error("AI batch generation failed",
+                        provider=provider_name,
+                        error=str(e))
+            return [self._get_fallback_response() for _ in messages]
+
+        logger.info("AI batch request started",
+                   provider=provider_name,
+                   model=chat_settings.model,
+                   batch_size=len(messages))
+
+        responses = await asyncio.gather(
+            *(ai_provider.generate_response(message, context, chat_settings)
+              for message, context in zip(messages, modified_contexts)),
+            return_exceptions=True
+        )
+        return [
+            self._get_fallback_response() if isinstance(response, Exception) else response
+            for response in responses
+        ]
+
+    def _wants_rag(self, message: str) -> bool:
+        """Retrieval is skipped when disabled and for greetings-length messages"""
+        return self.settings.rag_enabled and len(message.strip()) >= self.settings.rag_min_chars
+
     async def _get_rag_context_and_modify_messages(self, message: str, context: List[Message]) -> tuple[List[Message], bool]:
         """Helper to retrieve RAG context and modify messages."""
-        retrieved_docs = await self.vector_memory_service.query(message, top_k=self.settings.rag_top_k)
+        if not self._wants_rag(message):
+            return context, False
+        retrieved_docs = await self._retrieve_documents(message)
+        return self._apply_rag_context(message, context, retrieved_docs)
+
+    async def _get_rag_context_and_modify_messages_batch(
+        self,
+        messages: List[str],
+        contexts: List[List[Message]]
+    ) -> List[List[Message]]:
+        """Batch form of _get_rag_context_and_modify_messages"""
+        modified_contexts = list(contexts)
+        eligible = [i for i, message in enumerate(messages) if self._wants_rag(message)]
+        if eligible:
+            docs_per_message = await self._retrieve_documents_batch([messages[i] for i in eligible])
+            for i, retrieved_docs in zip(eligible, docs_per_message):
+                modified_contexts[i] = self._apply_rag_context(messages[i], contexts[i], retrieved_docs)[0]
+        return modified_contexts
+
+    def _apply_rag_context(
+        self,
+        message: str,
+        context: List[Message],
+        retrieved_docs: List[Dict[str, Any]]
+    ) -> tuple[List[Message], bool]:
+        """Context with retrieved documents added to the system message"""
         rag_context = ""
         rag_enabled = False
         if retrieved_docs:
-            rag_context = "\n\nRelevant information from memory:\n" + "\n".join([doc["document"] for doc in retrieved_docs])
+            rag_context = RAG_PREFIX + "\n".join(map(itemgetter("document"), retrieved_docs))
             logger.info("RAG context retrieved", query=message[:50], num_docs=len(retrieved_docs))
             rag_enabled = True
 
-        modified_context = list(context)
-        if rag_context:
-            if modified_context and modified_context[0].role == "system":
-                modified_context[0].content += rag_context
-            else:
-                modified_context.insert(0, Message(content=rag_context, role="system", session_id="rag_context"))
-        return modified_context, rag_enabled
+        if not rag_context:
+            return context, rag_enabled
+        # New lists and messages only: the caller's history must not accumulate
+        # RAG text across turns
+        if context and context[0].role == "system":
+            system_message = context[0].model_copy(update={"content": context[0].content + rag_context})
+            return [system_message, *context[1:]], rag_enabled
+        return [Message(content=rag_context, role="system", session_id="rag_context"), *context], rag_enabled
+
+    def _sync_rag_cache(self) -> None:
+        """Drop cached retrievals once documents were added to vector memory"""
+
+        generation = self.vector_memory_service.generation
+        if generation != self._rag_cache_generation:
+            self.rag_cache.clear()
+            self._rag_cache_generation = generation
+
+    async def _retrieve_documents(self, message: str) -> List[Dict[str, Any]]:
+        """Vector search for message, answered from rag_cache for near-duplicate queries"""
+
+        top_k = self.settings.rag_top_k
+        if self.rag_cache.capacity <= 0:
+            return await self.vector_memory_service.query(message, top_k=top_k)
+
+        embedding = await self.vector_memory_service.embed(message)
+        self._sync_rag_cache()
+        retrieved_docs = self.rag_cache.lookup(embedding)
+        if retrieved_docs is None:
+            retrieved_docs = await self.vector_memory_service.query(
+                message, top_k=top_k, query_embedding=embedding
+            )
+            self.rag_cache.insert(embedding, retrieved_docs)
+        return retrieved_docs
+
+    async def _retrieve_documents_batch(self, messages: List[str]) -> List[List[Dict[str, Any]]]:
+        """Batch form of _retrieve_documents: cache misses share one vector search"""
+
+        top_k = self.settings.rag_top_k
+        if self.rag_cache.capacity <= 0:
+            return await self.vector_memory_service.query_batch(messages, top_k=top_k)
+
+        embeddings = await self.vector_memory_service.embed_batch(messages)
+        self._sync_rag_cache()
+        results = [self.rag_cache.lookup(embedding) for embedding in embeddings]
+        misses = [i for i, docs in enumerate(results) if docs is None]
+        if misses:
+            fetched = await self.vector_memory_service.query_batch(
+                [messages[i] for i in misses], top_k=top_k, query_embeddings=embeddings[misses]
+            )
+            for i, retrieved_docs in zip(misses, fetched):
+                results[i] = retrieved_docs
+                self.rag_cache.insert(embeddings[i], retrieved_docs)
+        return results
 
     def _get_fallback_response(self) -> str:
         """Get fallback response when AI fails"""
@@ -208,19 +354,21 @@ class AIService:
     async def get_all_available_models(self) -> Dict[str, List[str]]:
         """Get available models for all providers"""
 
-        all_models = {}
+        # Providers are queried concurrently; total latency is the slowest one
+        names = list(self._providers.keys())
+        results = await asyncio.gather(*(self._provider_models(name) for name in names))
+        return dict(zip(names, results))
 
-        for provider_name in self._providers.keys():
-            try:
-                provider_instance = self.get_provider(provider_name)
-                models = await provider_instance.get_available_models()
-                all_models[provider_name] = models
-            except Exception as e:
-                logger.warning("Failed to fetch models for provider",
-                               provider=provider_name, error=str(e))
-                all_models[provider_name] = []
+    async def _provider_models(self, provider_name: str) -> List[str]:
+        """Models of one provider, or [] if it cannot be queried"""
 
-        return all_models
+        try:
+            provider_instance = self.get_provider(provider_name)
+            return await provider_instance.get_available_models()
+        except Exception as e:
+            logger.warning("Failed to fetch models for provider",
+                           provider=provider_name, error=str(e))
+            return []
 
     async def estimate_tokens(self, text: str, provider: Optional[str] = None) -> int:
         """Estimate token count for text"""
@@ -241,30 +389,28 @@ class AIService:
             "providers": {}
         }
 
-        all_healthy = True
+        names = list(self._providers.keys())
+        results = await asyncio.gather(*(self._provider_health(name) for name in names))
+        health_status["providers"] = dict(zip(names, results))
 
-        for provider_name in self._providers.keys():
-            try:
-                provider_instance = self.get_provider(provider_name)
-                provider_health = await provider_instance.health_check()
-                health_status["providers"][provider_name] = provider_health
-
-                if provider_health.get("status") != "healthy":
-                    all_healthy = False
-
-            except Exception as e:
-                health_status["providers"][provider_name] = {
-                    "status": "unhealthy",
-                    "error": str(e),
-                    "api_available": False
-                }
-                all_healthy = False
-
-        if not all_healthy:
+        if any(result.get("status") != "healthy" for result in results):
             health_status["status"] = "degraded"
 
         return health_status
 
+    async def _provider_health(self, provider_name: str) -> Dict[str, Any]:
+        """Health of one provider; failures are reported as unhealthy"""
+
+        try:
+            provider_instance = self.get_provider(provider_name)
+            return await provider_instance.health_check()
+        except Exception as e:
+            return {
+                "status": "unhealthy",
+                "error": str(e),
+                "api_available": False
+            }
+
     def switch_provider(self, provider_name: str) -> bool:
         """Switch to different AI provider"""
 
@@ -287,23 +433,45 @@ class AIService:
         logger.info("Switched AI provider", provider=provider_name)
         return True
 
-    def get_provider_info(self) -> Dict[str, Any]:
+    async def get_provider_info(self) -> Dict[str, Any]:
         """Get information about current provider and available providers"""
 
-        provider_configs = {}
-        for name in self._providers.keys():
-            try:
-                provider_instance = self.get_provider(name)
-                provider_configs[name] = {
-                    "name": provider_instance.get_provider_name(),
-                    "model": provider_instance.config.get("model", "unknown")
-                }
-            except Exception as e:
-                logger.warning(f"Failed to get info for provider {name}", error=str(e))
-                provider_configs[name] = {"name": name, "model": "unavailable", "error": str(e)}
+        names = self._provider_names
+        infos = await asyncio.gather(*(self._provider_info_one(name) for name in names))
 
         return {
             "current_provider": self.current_provider,
-            "available_providers": list(self._providers.keys()),
-            "provider_configs": provider_configs
+            "available_providers": list(names),
+            "provider_configs": dict(zip(names, infos))
         }
+
+    async def _provider_info_one(self, name: str) -> Dict[str, Any]:
+        """Name and model of one provider, initializing it on first use"""
+
+        key = (name, self._providers[name])
+        info = self._provider_info_cache.get(key)
+        if info is not None:
+            return info
+
+        try:
+            provider_instance = self.get_provider(name)
+            info = {
+                "name": provider_instance.get_provider_name(),
+                "model": provider_instance.config.get("model", "unknown")
+            }
+        except Exception as e:
+            logger.warning(f"Failed to get info for provider {name}", error=str(e))
+            return {"name": name, "model": "unavailable", "error": str(e)}
+
+        self._provider_info_cache[key] = info
+        return info
+
+    async def close(self):
+        """Release resources held by initialized providers"""
+
+        for name, provider_instance in self._initialized_providers.items():
+            try:
+                await provider_instance.close()
+            except Exception as e:
+                logger.warning(f"Failed to close provider {name}", error=str(e))
+        self._initialized_providers.clear()
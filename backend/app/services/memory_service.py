@@ -9,16 +9,24 @@ import json
 import os
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Iterator, Tuple
 import structlog
 import aiofiles
+import orjson
+from cachetools import TTLCache
 from pathlib import Path
 
 from app.core.config import get_settings
+from app.core.redis_client import get_redis_client
+from app.models import pinned_now
 from app.models.chat import Conversation, Message, ConversationSummary
 
 logger = structlog.get_logger()
 
+# Per-session message counts are cached briefly; writes through this service evict them
+MESSAGE_COUNT_CACHE_SIZE = 10_000
+MESSAGE_COUNT_CACHE_TTL = 5  # seconds
+
 
 class MemoryService:
     """Conversation memory management service"""
@@ -26,6 +34,9 @@ class MemoryService:
     def __init__(self):
         self.settings = get_settings()
         self.storage_backend = None
+        self._message_counts = TTLCache(
+            maxsize=MESSAGE_COUNT_CACHE_SIZE, ttl=MESSAGE_COUNT_CACHE_TTL
+        )
 
         if self.settings.memory_type == "redis":
             self._init_redis_backend()
@@ -51,6 +62,7 @@ class MemoryService:
 
         try:
             await self.storage_backend.save_conversation(conversation)
+            self._message_counts.pop(conversation.session_id, None)
             logger.info("Conversation saved",
                        session_id=conversation.session_id,
                        message_count=conversation.message_count)
@@ -84,6 +96,7 @@ class MemoryService:
         try:
             if isinstance(self.storage_backend, RedisStorageBackend):
                 await self.storage_backend.add_message(session_id, message)
+                self._message_counts.pop(session_id, None)
                 logger.info("Message added (atomic Redis)", session_id=session_id)
                 return True
             # JSON fallback: This approach reloads and rewrites the entire conversation file.
@@ -93,12 +106,30 @@ class MemoryService:
                 conversation = Conversation(session_id=session_id)
             conversation.add_message(message)
             if len(conversation.messages) > self.settings.max_history_messages:
-                conversation.messages = conversation.messages[-self.settings.max_history_messages:]
+                del conversation.messages[:-self.settings.max_history_messages]
             return await self.save_conversation(conversation)
         except Exception as e:
             logger.error("Failed to add message", session_id=session_id, error=str(e))
             return False
 
+    async def get_message_count(self, session_id: str) -> int:
+        """Get the number of messages in a conversation (briefly cached)"""
+
+        count = self._message_counts.get(session_id)
+        if count is not None:
+            return count
+
+        try:
+            count = await self.storage_backend.get_message_count(session_id)
+        except Exception as e:
+            logger.error("Failed to count messages",
+                         session_id=session_id,
+                         error=str(e))
+            return 0
+
+        self._message_counts[session_id] = count
+        return count
+
     async def get_conversation_history(
         self,
         session_id: str,
@@ -117,6 +148,35 @@ class MemoryService:
 
         return messages[start_idx:end_idx]
 
+    async def get_conversation_history_after(
+        self,
+        session_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Message]:
+        """Get up to `limit` messages older than the `cursor` message (keyset pagination).
+
+        Messages are returned in chronological order. Without a cursor the newest
+        messages are returned; an unknown cursor yields an empty page.
+        """
+
+        conversation = await self.load_conversation(session_id)
+        if not conversation:
+            return []
+
+        messages = conversation.messages
+        end_idx = len(messages)
+        if cursor:
+            # Scan from the newest end: cursors usually point at recent pages
+            for idx in range(len(messages) - 1, -1, -1):
+                if messages[idx].id == cursor:
+                    end_idx = idx
+                    break
+            else:
+                return []
+
+        return messages[max(0, end_idx - limit):end_idx]
+
     async def list_conversations(
         self,
         limit: int = 50,
@@ -130,11 +190,29 @@ class MemoryService:
             logger.error("Failed to list conversations", error=str(e))
             return []
 
+    async def list_conversations_after(
+        self,
+        before: Optional[Tuple[float, str]] = None,
+        limit: int = 50
+    ) -> List[ConversationSummary]:
+        """List conversations older than `before` (keyset pagination).
+
+        Conversations are ordered by (updated_at, session_id), newest first;
+        `before` is the (updated_at timestamp, session_id) of the last one seen.
+        """
+
+        try:
+            return await self.storage_backend.list_conversations_after(before, limit)
+        except Exception as e:
+            logger.error("Failed to list conversations", error=str(e))
+            return []
+
     async def delete_conversation(self, session_id: str) -> bool:
         """Delete conversation"""
 
         try:
             await self.storage_backend.delete_conversation(session_id)
+            self._message_counts.pop(session_id, None)
             logger.info("Conversation deleted", session_id=session_id)
             return True
 
@@ -186,40 +264,78 @@ class MemoryService:
         else:
             raise ValueError(f"Unsupported export format: {format}")
 
+    async def iter_export_conversation(
+        self,
+        session_id: str,
+        format: str = "json"
+    ) -> Optional[AsyncIterator[bytes]]:
+        """Export conversation in specified format as a stream of byte chunks"""
+
+        if format not in ("json", "txt", "markdown"):
+            raise ValueError(f"Unsupported export format: {format}")
+
+        conversation = await self.load_conversation(session_id)
+        if not conversation:
+            return None
+
+        if format == "json":
+            return self._iter_export_as_json(conversation)
+        lines = self._text_lines(conversation) if format == "txt" else self._markdown_lines(conversation)
+        return self._iter_lines(lines)
+
+    async def _iter_export_as_json(self, conversation: Conversation) -> AsyncIterator[bytes]:
+        """Stream conversation as JSON, one message at a time"""
+
+        header = conversation.model_dump(exclude={"messages"})
+        # Reopen the serialized header object to append the messages array
+        yield orjson.dumps(header, option=orjson.OPT_NON_STR_KEYS)[:-1] + b',"messages":['
+        for i, message in enumerate(conversation.messages):
+            chunk = orjson.dumps(message.model_dump(), option=orjson.OPT_NON_STR_KEYS)
+            yield b"," + chunk if i else chunk
+        yield b"]}"
+
+    async def _iter_lines(self, lines: Iterator[str]) -> AsyncIterator[bytes]:
+        """Stream newline-separated lines as UTF-8 chunks"""
+
+        for i, line in enumerate(lines):
+            yield (f"\n{line}" if i else line).encode("utf-8")
+
     def _export_as_text(self, conversation: Conversation) -> str:
         """Export conversation as plain text"""
 
-        lines = [
-            f"Conversation: {conversation.session_id}",
-            f"Created: {conversation.created_at}",
-            f"Messages: {conversation.message_count}",
-            "-" * 50
-        ]
+        return "\n".join(self._text_lines(conversation))
+
+    def _text_lines(self, conversation: Conversation) -> Iterator[str]:
+        """Plain text export lines"""
+
+        yield f"Conversation: {conversation.session_id}"
+        yield f"Created: {conversation.created_at}"
+        yield f"Messages: {conversation.message_count}"
+        yield "-" * 50
 
         for message in conversation.messages:
             timestamp = message.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            lines.append(f"[{timestamp}] {message.role.upper()}: {message.content}")
-
-        return "\n".join(lines)
+            yield f"[{timestamp}] {message.role.upper()}: {message.content}"
 
     def _export_as_markdown(self, conversation: Conversation) -> str:
         """Export conversation as markdown"""
 
-        lines = [
-            f"# Conversation {conversation.session_id}",
-            f"**Created:** {conversation.created_at}",
-            f"**Messages:** {conversation.message_count}",
-            ""
-        ]
+        return "\n".join(self._markdown_lines(conversation))
+
+    def _markdown_lines(self, conversation: Conversation) -> Iterator[str]:
+        """Markdown export lines"""
+
+        yield f"# Conversation {conversation.session_id}"
+        yield f"**Created:** {conversation.created_at}"
+        yield f"**Messages:** {conversation.message_count}"
+        yield ""
 
         for message in conversation.messages:
             timestamp = message.timestamp.strftime("%Y-%m-%d %H:%M:%S")
             role_emoji = "🧑" if message.role == "user" else "🤖"
-            lines.append(f"## {role_emoji} {message.role.title()} - {timestamp}")
-            lines.append(f"{message.content}")
-            lines.append("")
-
-        return "\n".join(lines)
+            yield f"## {role_emoji} {message.role.title()} - {timestamp}"
+            yield f"{message.content}"
+            yield ""
 
     async def health_check(self) -> dict:
         """Check health of the current storage backend (JSON/Redis)"""
@@ -228,7 +344,6 @@ class MemoryService:
         return {"status": "unknown", "storage_type": str(type(self.storage_backend))}
 
 
-import aioredis
 from typing import List, Optional
 from datetime import datetime
 import json
@@ -238,7 +353,7 @@ class RedisStorageBackend:
 
     def __init__(self, settings):
         self.settings = settings
-        self.redis = aioredis.from_url(self.settings.redis_url, decode_responses=True)
+        self.redis = get_redis_client()
         self.max_history = self.settings.max_history_messages
         self.ttl = getattr(self.settings, 'redis_ttl', 86400)
 
@@ -334,6 +449,9 @@ class RedisStorageBackend:
             logger.error("Redis load_conversation failed", error=str(e))
             return None
 
+    async def get_message_count(self, session_id: str) -> int:
+        return await self.redis.llen(f"conversation:{session_id}:messages")
+
     async def list_conversations(self, limit: int, offset: int) -> List[ConversationSummary]:
         try:
             # Use ZREVRANGE to get session_ids from the sorted set (newest first)
@@ -341,19 +459,20 @@ class RedisStorageBackend:
             session_ids = await self.redis.zrevrange("conversations_by_updated_at", offset, offset + limit - 1)
             
             summaries = []
-            for session_id in session_ids:
-                key_meta = f"conversation:{session_id}:meta"
-                meta = await self.redis.hgetall(key_meta)
-                if meta:
-                    summary = ConversationSummary(
-                        session_id=session_id,
-                        title=meta.get("title", ""),
-                        message_count=int(meta.get("message_count", "0")),
-                        created_at=datetime.fromisoformat(meta.get("created_at")) if meta.get("created_at") else datetime.utcnow(),
-                        updated_at=datetime.fromisoformat(meta.get("updated_at")) if meta.get("updated_at") else datetime.utcnow(),
-                        last_message_preview=meta.get("last_message_preview")
-                    )
-                    summaries.append(summary)
+            with pinned_now() as now:
+                for session_id in session_ids:
+                    key_meta = f"conversation:{session_id}:meta"
+                    meta = await self.redis.hgetall(key_meta)
+                    if meta:
+                        summary = ConversationSummary(
+                            session_id=session_id,
+                            title=meta.get("title", ""),
+                            message_count=int(meta.get("message_count", "0")),
+                            created_at=datetime.fromisoformat(meta.get("created_at")) if meta.get("created_at") else now,
+                            updated_at=datetime.fromisoformat(meta.get("updated_at")) if meta.get("updated_at") else now,
+                            last_message_preview=meta.get("last_message_preview")
+                        )
+                        summaries.append(summary)
             return summaries
         except Exception as e:
             logger = structlog.get_logger()
@@ -361,6 +480,46 @@ class RedisStorageBackend:
             json_backend = JSONStorageBackend(self.settings)
             return await json_backend.list_conversations(limit, offset)
 
+    async def list_conversations_after(
+        self,
+        before: Optional[Tuple[float, str]],
+        limit: int
+    ) -> List[ConversationSummary]:
+        key_sorted_set = "conversations_by_updated_at"
+        try:
+            if before is None:
+                session_ids = await self.redis.zrevrange(key_sorted_set, 0, limit - 1)
+            else:
+                score, cursor_id = before
+                # Same score: ZREVRANGEBYSCORE orders members in reverse, so keep the ones below the cursor
+                ties = await self.redis.zrevrangebyscore(key_sorted_set, score, score)
+                session_ids = [sid for sid in ties if sid < cursor_id][:limit]
+                if len(session_ids) < limit:
+                    session_ids += await self.redis.zrevrangebyscore(
+                        key_sorted_set, f"({score}", "-inf",
+                        start=0, num=limit - len(session_ids)
+                    )
+
+            summaries = []
+            with pinned_now() as now:
+                for session_id in session_ids:
+                    meta = await self.redis.hgetall(f"conversation:{session_id}:meta")
+                    if meta:
+                        summaries.append(ConversationSummary(
+                            session_id=session_id,
+                            title=meta.get("title", ""),
+                            message_count=int(meta.get("message_count", "0")),
+                            created_at=datetime.fromisoformat(meta.get("created_at")) if meta.get("created_at") else now,
+                            updated_at=datetime.fromisoformat(meta.get("updated_at")) if meta.get("updated_at") else now,
+                            last_message_preview=meta.get("last_message_preview")
+                        ))
+            return summaries
+        except Exception as e:
+            logger = structlog.get_logger()
+            logger.error("Redis list_conversations_after failed, falling back to JSON", error=str(e))
+            json_backend = JSONStorageBackend(self.settings)
+            return await json_backend.list_conversations_after(before, limit)
+
     async def delete_conversation(self, session_id: str):
         key_messages = f"conversation:{session_id}:messages"
         key_meta = f"conversation:{session_id}:meta"
@@ -414,10 +573,18 @@ class JSONStorageBackend:
     def _get_file(self, session_id: str) -> Path:
         return self.data_dir / f"{session_id}.json"
 
+    @staticmethod
+    def _timestamp_ns(timestamp: float) -> int:
+        # updated_at has microsecond precision; round there so cursors compare exactly
+        return round(timestamp * 1_000_000) * 1000
+
     async def save_conversation(self, conversation):
         file = self._get_file(conversation.session_id)
         async with aiofiles.open(file, "w") as f:
             await f.write(conversation.model_dump_json())
+        # The file mtime mirrors updated_at so listings can order files without parsing them
+        mtime_ns = self._timestamp_ns(conversation.updated_at.timestamp())
+        os.utime(file, ns=(mtime_ns, mtime_ns))
 
     async def load_conversation(self, session_id: str):
         file = self._get_file(session_id)
@@ -428,6 +595,11 @@ class JSONStorageBackend:
         from app.models.chat import Conversation
         return Conversation.parse_raw(data)
 
+    async def get_message_count(self, session_id: str) -> int:
+        # No separate index for JSON files; the count needs the parsed conversation
+        conversation = await self.load_conversation(session_id)
+        return conversation.message_count if conversation else 0
+
     async def list_conversations(self, limit: int, offset: int):
         from app.models.chat import ConversationSummary
         files = sorted(self.data_dir.glob("*.json"), reverse=True)[offset:offset+limit]
@@ -447,6 +619,29 @@ class JSONStorageBackend:
             ))
         return summaries
 
+    async def list_conversations_after(self, before, limit: int):
+        # Order by (mtime, session id) from stat() and parse only the files on the page
+        candidates = [(file.stat().st_mtime_ns, file.stem, file) for file in self.data_dir.glob("*.json")]
+        if before is not None:
+            cursor = (self._timestamp_ns(before[0]), before[1])
+            candidates = [candidate for candidate in candidates if candidate[:2] < cursor]
+        candidates.sort(key=lambda candidate: candidate[:2], reverse=True)
+
+        summaries = []
+        for _, _, file in candidates[:limit]:
+            async with aiofiles.open(file, "r") as f:
+                data = await f.read()
+            conv = Conversation.parse_raw(data)
+            summaries.append(ConversationSummary(
+                session_id=conv.session_id,
+                title=conv.title or "",
+                message_count=conv.message_count,
+                created_at=conv.created_at,
+                updated_at=conv.updated_at,
+                last_message_preview=conv.messages[-1].content[:100] if conv.messages else None
+            ))
+        return summaries
+
     async def delete_conversation(self, session_id: str):
         file = self._get_file(session_id)
         if file.exists():
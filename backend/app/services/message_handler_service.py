@@ -1,11 +1,11 @@
 import structlog
-import uuid
 import asyncio
 from datetime import datetime
 from typing import Optional
 from app.services.ai_service import AIService
 from app.services.memory_service import MemoryService
 from app.services.vector_memory_service import VectorMemoryService
+from app.models import new_id
 from app.models.chat import Message
 from app.core.exceptions import AIServiceException, MemoryServiceException, ChatBotException
 from app.services.research_service import ResearchService
@@ -15,22 +15,22 @@ logger = structlog.get_logger()
 class MessageHandlerService:
     def __init__(
         self,
-        ai_service: AIService = AIService(),
-        memory_service: MemoryService = MemoryService(),
-        vector_memory_service: VectorMemoryService = VectorMemoryService(),
-        research_service: ResearchService = ResearchService()
-    ): # Default to creating new instances for backward compatibility/simplicity if not injected
-        self.ai_service = ai_service
-        self.memory_service = memory_service
-        self.vector_memory_service = vector_memory_service
-        self.research_service = research_service
+        ai_service: Optional[AIService] = None,
+        memory_service: Optional[MemoryService] = None,
+        vector_memory_service: Optional[VectorMemoryService] = None,
+        research_service: Optional[ResearchService] = None
+    ): # Create instances lazily only when not injected (app-scoped ones come from app.state)
+        self.ai_service = ai_service or AIService()
+        self.memory_service = memory_service or MemoryService()
+        self.vector_memory_service = vector_memory_service or VectorMemoryService()
+        self.research_service = research_service or ResearchService()
 
     async def process_message(self, session_id: Optional[str], message: Message) -> dict:
         if not message.content.strip():
             raise ChatBotException(message="Empty message", code="EMPTY_MESSAGE")
 
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = new_id()
         message.session_id = session_id
 
         try:
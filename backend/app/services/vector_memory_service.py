@@ -1,4 +1,6 @@
+import asyncio
 import structlog
+import numpy as np
 from typing import List, Dict, Any, Optional
 from chromadb import Client, Settings
 from chromadb.utils import embedding_functions
@@ -21,6 +23,8 @@ class VectorMemoryService:
             self.settings = get_settings()
             self.client = self._initialize_chroma_client()
             self.collection = self._get_or_create_collection()
+            # Bumped on every add, so callers caching query results can tell they are stale
+            self.generation = 0
             self._initialized = True
 
     def _initialize_chroma_client(self) -> Client:
@@ -39,12 +43,12 @@ class VectorMemoryService:
 
     def _get_or_create_collection(self):
         """Get or create ChromaDB collection using collection_name from settings."""
-        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
             model_name="all-MiniLM-L6-v2" # Or a configurable model
         )
         return self.client.get_or_create_collection(
             name=self.settings.chroma_collection_name,
-            embedding_function=embedding_function
+            embedding_function=self.embedding_function
         )
 
     async def add_document(self, text: str, metadata: Optional[Dict[str, Any]] = None, doc_id: Optional[str] = None):
@@ -55,32 +59,94 @@ class VectorMemoryService:
                 metadatas=[metadata or {}],
                 ids=[doc_id or str(uuid.uuid4())]
             )
+            self.generation += 1
             logger.info("Document added to ChromaDB", text_preview=text[:50], metadata=metadata)
         except Exception as e:
             logger.error("Failed to add document to ChromaDB", error=str(e))
             raise
 
-    async def query(self, query_text: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Query the vector database for relevant documents."""
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed text with the collection's embedding function."""
+        # The model forward pass is CPU-bound; keep it off the event loop
+        embeddings = await asyncio.to_thread(self.embedding_function, [text])
+        return np.asarray(embeddings[0], dtype=np.float32)
+
+    async def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed several texts in one call; one row per text."""
+        embeddings = await asyncio.to_thread(self.embedding_function, list(texts))
+        return np.asarray(embeddings, dtype=np.float32)
+
+    @staticmethod
+    def _format_results(results: Dict[str, Any], row: int) -> List[Dict[str, Any]]:
+        """Documents of one query row of a ChromaDB result."""
+        documents = results["documents"][row]
+        metadatas = results["metadatas"][row]
+        distances = results["distances"][row] if results["distances"] else None
+        return [
+            {
+                "document": documents[i],
+                "metadata": metadatas[i],
+                "distance": distances[i] if distances is not None else None
+            }
+            for i in range(len(documents))
+        ]
+
+    async def query(
+        self,
+        query_text: str,
+        top_k: int = 3,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
+        """Query the vector database for relevant documents (reusing query_embedding if given)."""
         try:
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=top_k
-            )
+            if query_embedding is None:
+                results = self.collection.query(
+                    query_texts=[query_text],
+                    n_results=top_k
+                )
+            else:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding.tolist()],
+                    n_results=top_k
+                )
             formatted_results = []
             if results and results["documents"]:
-                for i in range(len(results["documents"][0])):
-                    formatted_results.append({
-                        "document": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "distance": results["distances"][0][i] if results["distances"] else None
-                    })
+                formatted_results = self._format_results(results, 0)
             logger.info("ChromaDB query successful", query=query_text, num_results=len(formatted_results))
             return formatted_results
         except Exception as e:
             logger.error("Failed to query ChromaDB", error=str(e))
             raise
 
+    async def query_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        query_embeddings: Optional[np.ndarray] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several queries as one ChromaDB request; results are in query order."""
+        if not queries:
+            return []
+        try:
+            if query_embeddings is None:
+                results = self.collection.query(
+                    query_texts=list(queries),
+                    n_results=top_k
+                )
+            else:
+                results = self.collection.query(
+                    query_embeddings=query_embeddings.tolist(),
+                    n_results=top_k
+                )
+            if not results or not results["documents"]:
+                return [[] for _ in queries]
+            formatted_results = [self._format_results(results, row) for row in range(len(queries))]
+            logger.info("ChromaDB batch query successful", num_queries=len(queries))
+            return formatted_results
+        except Exception as e:
+            logger.error("Failed to query ChromaDB", error=str(e))
+            raise
+
     async def health_check(self) -> dict:
         try:
             # Проверяем доступность ChromaDB через list_collections
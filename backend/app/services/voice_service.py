@@ -4,21 +4,24 @@ Handles speech-to-text transcription
 """
 
 import asyncio
-import tempfile
+import hashlib
 import time
-import os
 import json
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, AsyncIterator, BinaryIO, Union
 import structlog
+from cachetools import LRUCache
+from pydantic import ValidationError
+import numpy as np
 import whisper
 import torch
 from pydub import AudioSegment
 import io
-import aioredis
 
 from app.core.config import get_settings
+from app.core.redis_client import get_redis_client
 from app.models.voice import (
-    AudioFile,
+    AudioFileDTO,
     TranscriptionResult,
     VoiceSettings,
     AudioProcessingStatus
@@ -26,6 +29,71 @@ from app.models.voice import (
 
 logger = structlog.get_logger()
 
+# Raw bytes, or a seekable file object such as an UploadFile's spooled temp file
+AudioInput = Union[bytes, BinaryIO]
+
+MAX_AUDIO_BYTES = 25 * 1024 * 1024  # 25MB
+
+# Shared, read-only defaults for requests that don't pass their own settings
+DEFAULT_VOICE_SETTINGS = VoiceSettings()
+
+# Transcriptions of identical uploads, keyed on content digest + model + options
+TRANSCRIPTION_CACHE_SIZE = 512
+TRANSCRIPTION_CACHE_TTL = 86400  # Redis copy, 1 day
+AUDIO_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Streaming transcription decodes in Whisper-sized windows, one segment batch each
+STREAM_WINDOW_SECONDS = 30
+
+# Content type -> container format understood by pydub/ffmpeg
+AUDIO_FORMATS = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/mp3": "mp3",
+    "audio/mpeg": "mp3",
+    "audio/mp4": "mp4",
+    "audio/m4a": "m4a",
+    "audio/ogg": "ogg",
+    "audio/webm": "webm"
+}
+
+
+def get_audio_size(audio: AudioInput) -> int:
+    """Size of the audio in bytes, without reading a file object into memory"""
+
+    if isinstance(audio, (bytes, bytearray)):
+        return len(audio)
+
+    position = audio.tell()
+    size = audio.seek(0, io.SEEK_END)
+    audio.seek(position)
+    return size
+
+
+def hash_audio(audio: AudioInput) -> str:
+    """SHA-256 hex digest of the audio, reading file objects in chunks (blocking)"""
+
+    if isinstance(audio, (bytes, bytearray)):
+        return hashlib.sha256(audio).hexdigest()
+
+    digest = hashlib.sha256()
+    audio.seek(0)
+    while chunk := audio.read(AUDIO_HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    audio.seek(0)
+    return digest.hexdigest()
+
+
+def _open_audio(audio: AudioInput) -> BinaryIO:
+    """File object positioned at the start of the audio"""
+
+    if isinstance(audio, (bytes, bytearray)):
+        return io.BytesIO(audio)
+
+    audio.seek(0)
+    return audio
+
 
 class VoiceService:
     """Whisper speech-to-text service"""
@@ -33,9 +101,10 @@ class VoiceService:
     def __init__(self):
         self.settings = get_settings()
         self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.redis = aioredis.from_url(self.settings.redis_url, decode_responses=True)
+        self.device = self._resolve_device()
+        self.redis = get_redis_client()
         self.status_ttl = 3600 # 1 hour TTL for processing status keys
+        self._transcription_cache: LRUCache = LRUCache(maxsize=TRANSCRIPTION_CACHE_SIZE)
 
     async def initialize(self):
         """Initialize Whisper model"""
@@ -43,16 +112,12 @@ class VoiceService:
         try:
             logger.info("Loading Whisper model",
                        model=self.settings.whisper_model,
-                       device=self.device)
+                       device=self.device,
+                       quantization=self.settings.whisper_quantization)
 
             # Load model in thread pool to avoid blocking
             loop = asyncio.get_event_loop()
-            self.model = await loop.run_in_executor(
-                None,
-                whisper.load_model,
-                self.settings.whisper_model,
-                self.device
-            )
+            self.model = await loop.run_in_executor(None, self._load_model)
 
             logger.info("Whisper model loaded successfully")
 
@@ -60,13 +125,67 @@ class VoiceService:
             logger.error("Failed to load Whisper model", error=str(e))
             raise
 
+    def _resolve_device(self) -> str:
+        """Device from settings, or CUDA when available"""
+
+        if self.settings.whisper_device != "auto":
+            return self.settings.whisper_device
+        return "cuda" if torch.cuda.is_available() else "cpu"
+
+    def _load_model(self):
+        """Load and optionally quantize the Whisper model (blocking)"""
+
+        model = whisper.load_model(self.settings.whisper_model, self.device)
+
+        quantization = self.settings.whisper_quantization
+        if quantization == "fp32":
+            return model
+
+        if self.device != "cpu":
+            logger.warning("Whisper quantization is CPU-only, keeping fp32 weights",
+                          device=self.device,
+                          quantization=quantization)
+            return model
+
+        if quantization == "int4":
+            return self._quantize_int4(model)
+
+        # Dynamic int8 covers the Linear layers, which dominate Whisper's compute
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def _quantize_int4(self, model):
+        """Replace Linear layers with HQQ 4-bit layers (falls back to int8)"""
+
+        try:
+            from hqq.core.quantize import BaseQuantizeConfig, HQQLinear
+        except ImportError:
+            logger.warning("hqq is not installed, falling back to int8 quantization")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        quant_config = BaseQuantizeConfig(nbits=4, group_size=64)
+        for module in list(model.modules()):
+            for name, child in list(module.named_children()):
+                if isinstance(child, torch.nn.Linear):
+                    setattr(module, name, HQQLinear(
+                        child,
+                        quant_config,
+                        compute_dtype=torch.float32,
+                        device=self.device
+                    ))
+        return model
+
     async def transcribe_audio(
         self,
-        audio_data: bytes,
-        audio_file: AudioFile,
-        settings: Optional[VoiceSettings] = None
+        audio_data: AudioInput,
+        audio_file: AudioFileDTO,
+        settings: Optional[VoiceSettings] = None,
+        audio_segment: Optional[AudioSegment] = None
     ) -> TranscriptionResult:
-        """Transcribe audio to text"""
+        """Transcribe audio to text.
+
+        Pass the `audio_segment` returned by `load_audio` to reuse that decode
+        instead of decoding `audio_data` again.
+        """
 
         if not self.model:
             await self.initialize()
@@ -76,32 +195,27 @@ class VoiceService:
 
         try:
             # Update processing status
-            self._update_status(audio_id, "processing", 0)
+            await self._update_status(audio_id, "processing", 0)
 
             # Use provided settings or defaults
-            voice_settings = settings or VoiceSettings()
+            voice_settings = settings or DEFAULT_VOICE_SETTINGS
 
-            # Process audio file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                # Convert audio to WAV format
+            if audio_segment is None:
                 audio_segment = await self._convert_audio(audio_data, audio_file)
-                audio_segment.export(temp_file.name, format="wav")
-
-                self._update_status(audio_id, "processing", 25)
 
-                # Transcribe with Whisper
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None,
-                    self._transcribe_with_whisper,
-                    temp_file.name,
-                    voice_settings
-                )
+            await self._update_status(audio_id, "processing", 25)
 
-                self._update_status(audio_id, "processing", 75)
+            # Resample and transcribe in one worker job; Whisper takes the PCM
+            # array directly, so there is no temp WAV file or second ffmpeg decode
+            loop = asyncio.get_event_loop()
+            result = await loop.run_in_executor(
+                None,
+                self._transcribe_with_whisper,
+                audio_segment,
+                voice_settings
+            )
 
-                # Clean up temp file
-                os.unlink(temp_file.name)
+            await self._update_status(audio_id, "processing", 75)
 
             processing_time = time.time() - start_time
 
@@ -110,12 +224,12 @@ class VoiceService:
                 text=result["text"].strip(),
                 confidence=self._calculate_confidence(result),
                 language=result.get("language"),
-                duration=audio_file.duration_seconds,
+                duration=audio_file.duration_seconds or len(audio_segment) / 1000.0,
                 segments=result.get("segments"),
                 processing_time=processing_time
             )
 
-            self._update_status(audio_id, "completed", 100)
+            await self._update_status(audio_id, "completed", 100)
 
             logger.info("Transcription completed",
                        audio_id=audio_id,
@@ -126,15 +240,64 @@ class VoiceService:
             return transcription
 
         except Exception as e:
-            self._update_status(audio_id, "failed", 0, error=str(e))
+            await self._update_status(audio_id, "failed", 0, error=str(e))
             logger.error("Transcription failed",
                         audio_id=audio_id,
                         error=str(e))
             raise
 
+    async def transcribe_audio_stream(
+        self,
+        audio_segment: AudioSegment,
+        settings: Optional[VoiceSettings] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Transcribe window by window, yielding segments as each window finishes.
+
+        Segment times are relative to the start of the whole recording.
+        """
+
+        if not self.model:
+            await self.initialize()
+
+        voice_settings = settings or DEFAULT_VOICE_SETTINGS
+        window_ms = STREAM_WINDOW_SECONDS * 1000
+        loop = asyncio.get_event_loop()
+
+        for offset_ms in range(0, len(audio_segment), window_ms):
+            result = await loop.run_in_executor(
+                None,
+                self._transcribe_with_whisper,
+                audio_segment[offset_ms:offset_ms + window_ms],
+                voice_settings
+            )
+
+            offset = offset_ms / 1000.0
+            for segment in result.get("segments") or []:
+                text = segment["text"].strip()
+                if not text:
+                    continue
+                yield {
+                    "text": text,
+                    "start": segment["start"] + offset,
+                    "end": segment["end"] + offset,
+                    "avg_logprob": segment.get("avg_logprob")
+                }
+
+    def _to_whisper_input(self, audio_segment: AudioSegment) -> np.ndarray:
+        """Mono 16 kHz float32 PCM in [-1, 1], the array form Whisper accepts"""
+
+        audio_segment = (
+            audio_segment
+            .set_frame_rate(whisper.audio.SAMPLE_RATE)
+            .set_channels(1)
+            .set_sample_width(2)
+        )
+        samples = np.frombuffer(audio_segment.raw_data, dtype=np.int16)
+        return samples.astype(np.float32) / 32768.0
+
     def _transcribe_with_whisper(
         self,
-        audio_path: str,
+        audio_segment: AudioSegment,
         settings: VoiceSettings
     ) -> Dict[str, Any]:
         """Perform Whisper transcription (blocking)"""
@@ -159,34 +322,21 @@ class VoiceService:
         # Remove None values
         options = {k: v for k, v in options.items() if v is not None}
 
-        return self.model.transcribe(audio_path, **options)
+        return self.model.transcribe(self._to_whisper_input(audio_segment), **options)
 
     async def _convert_audio(
         self,
-        audio_data: bytes,
-        audio_file: AudioFile
+        audio_data: AudioInput,
+        audio_file: AudioFileDTO
     ) -> AudioSegment:
         """Convert audio to standard format"""
 
         try:
-            # Detect format from content type
-            format_map = {
-                "audio/wav": "wav",
-                "audio/wave": "wav",
-                "audio/x-wav": "wav",
-                "audio/mp3": "mp3",
-                "audio/mpeg": "mp3",
-                "audio/mp4": "mp4",
-                "audio/m4a": "m4a",
-                "audio/ogg": "ogg",
-                "audio/webm": "webm"
-            }
-
-            audio_format = format_map.get(audio_file.content_type, "wav")
+            audio_format = AUDIO_FORMATS.get(audio_file.content_type, "wav")
 
             # Load audio with pydub
             audio_segment = AudioSegment.from_file(
-                io.BytesIO(audio_data),
+                _open_audio(audio_data),
                 format=audio_format
             )
 
@@ -251,8 +401,10 @@ class VoiceService:
         current_status.progress = progress
         current_status.error = error
         if status in ["completed", "failed"]:
-            current_status.completed_at = time.time()
-            current_status.processing_time = current_status.completed_at - current_status.started_at
+            current_status.completed_at = datetime.now(timezone.utc)
+            current_status.processing_time = (
+                current_status.completed_at - current_status.started_at
+            ).total_seconds()
 
         await self.redis.setex(key, self.status_ttl, current_status.json())
 
@@ -264,41 +416,109 @@ class VoiceService:
             return AudioProcessingStatus.parse_raw(status_data)
         return None
 
-    async def validate_audio(self, audio_data: bytes, content_type: str) -> bool:
-        """Validate audio file"""
+    async def audio_digest(self, audio_data: AudioInput) -> str:
+        """Content digest of the audio, used as the transcription cache key"""
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, hash_audio, audio_data)
+
+    def _transcription_key(self, digest: str, settings: Optional[VoiceSettings]) -> str:
+        """Cache key for a transcription of `digest` with the given options"""
+
+        voice_settings = settings or DEFAULT_VOICE_SETTINGS
+        return (f"voice_transcript:{digest}:{self.settings.whisper_model}:"
+                f"{self.settings.whisper_quantization}:{voice_settings.language}:{voice_settings.task}")
+
+    async def get_cached_transcription(
+        self,
+        digest: str,
+        settings: Optional[VoiceSettings] = None
+    ) -> Optional[TranscriptionResult]:
+        """Previous transcription of the same audio, from memory or Redis"""
+
+        key = self._transcription_key(digest, settings)
+        transcription = self._transcription_cache.get(key)
+        if transcription is not None:
+            return transcription
 
         try:
-            # Check file size
-            if len(audio_data) > 25 * 1024 * 1024:  # 25MB
-                return False
-
-            # Try to load with pydub
-            format_map = {
-                "audio/wav": "wav",
-                "audio/mp3": "mp3",
-                "audio/mp4": "mp4",
-                "audio/m4a": "m4a",
-                "audio/ogg": "ogg"
-            }
+            cached = await self.redis.get(key)
+        except Exception as e:
+            logger.warning("Failed to read cached transcription", error=str(e))
+            return None
+
+        if not cached:
+            return None
+
+        try:
+            transcription = TranscriptionResult.model_validate_json(cached)
+        except ValidationError as e:
+            # Corrupt or written by an older schema: treat as a miss and drop it
+            logger.warning("Discarding unreadable cached transcription", key=key, error=str(e))
+            try:
+                await self.redis.delete(key)
+            except Exception as e:
+                logger.warning("Failed to delete cached transcription", error=str(e))
+            return None
+
+        self._transcription_cache[key] = transcription
+        return transcription
+
+    async def cache_transcription(
+        self,
+        digest: str,
+        transcription: TranscriptionResult,
+        settings: Optional[VoiceSettings] = None
+    ):
+        """Remember a transcription for repeat uploads of the same audio"""
 
-            audio_format = format_map.get(content_type)
-            if not audio_format:
-                return False
+        key = self._transcription_key(digest, settings)
+        self._transcription_cache[key] = transcription
+
+        try:
+            await self.redis.setex(key, TRANSCRIPTION_CACHE_TTL, transcription.model_dump_json())
+        except Exception as e:
+            logger.warning("Failed to cache transcription", error=str(e))
+
+    def _decode_audio(self, audio_data: AudioInput, content_type: str) -> Optional[AudioSegment]:
+        """Decode and validate audio (blocking); None if it is invalid"""
+
+        # Check file size
+        if get_audio_size(audio_data) > MAX_AUDIO_BYTES:
+            return None
 
+        audio_format = AUDIO_FORMATS.get(content_type)
+        if not audio_format:
+            return None
+
+        try:
             audio_segment = AudioSegment.from_file(
-                io.BytesIO(audio_data),
+                _open_audio(audio_data),
                 format=audio_format
             )
+        except Exception:
+            return None
 
-            # Check duration
-            duration = len(audio_segment) / 1000.0  # Convert to seconds
-            if duration > self.settings.max_audio_duration:
-                return False
+        # Check duration
+        duration = len(audio_segment) / 1000.0  # Convert to seconds
+        if duration > self.settings.max_audio_duration:
+            return None
 
-            return True
+        return audio_segment
 
-        except Exception:
-            return False
+    async def load_audio(self, audio_data: AudioInput, content_type: str) -> Optional[AudioSegment]:
+        """Decode and validate audio in one pass; None if it is invalid.
+
+        The result can be handed to `transcribe_audio` to skip a second decode.
+        """
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._decode_audio, audio_data, content_type)
+
+    async def validate_audio(self, audio_data: AudioInput, content_type: str) -> bool:
+        """Validate audio file (bytes or a seekable file object)"""
+
+        return await self.load_audio(audio_data, content_type) is not None
 
     async def health_check(self) -> Dict[str, Any]:
         """Check voice service health"""
@@ -315,6 +535,7 @@ class VoiceService:
                 "status": "healthy",
                 "model": self.settings.whisper_model,
                 "device": self.device,
+                "quantization": self.settings.whisper_quantization,
                 "model_loaded": True
             }
 
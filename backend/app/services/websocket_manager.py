@@ -3,16 +3,17 @@ WebSocket Manager for real-time communication
 Handles chat and voice WebSocket connections
 """
 
-import json
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
+import msgspec
+import orjson
 import structlog
 from fastapi import WebSocket, WebSocketDisconnect
-from uuid import uuid4
 from broadcaster import Broadcast
 
-from app.models.chat import WebSocketMessage, Message
-from app.models.voice import VoiceWebSocketMessage, AudioFile
+from app.models import new_id, now_utc
+from app.models.chat import Message, WebSocketFrame, WEBSOCKET_FRAME_DECODER, WEBSOCKET_FRAME_ENCODER
+from app.models.voice import AudioFileDTO
 from app.services.ai_service import AIService
 from app.services.voice_service import VoiceService
 from app.services.memory_service import MemoryService
@@ -33,19 +34,24 @@ class WebSocketManager:
 
     def __init__(
         self,
-        ai_service: AIService = AIService(),
-        voice_service: VoiceService = VoiceService(),
-        memory_service: MemoryService = MemoryService(),
-        message_handler_service: MessageHandlerService = MessageHandlerService()
+        ai_service: Optional[AIService] = None,
+        voice_service: Optional[VoiceService] = None,
+        memory_service: Optional[MemoryService] = None,
+        message_handler_service: Optional[MessageHandlerService] = None
     ):
         self.active_connections: Dict[str, WebSocket] = {}
         self.connection_sessions: Dict[str, str] = {}  # connection_id -> session_id
-        self.ai_service = ai_service
-        self.voice_service = voice_service
-        self.memory_service = memory_service
-        self.message_handler_service = message_handler_service
+        self.ai_service = ai_service or AIService()
+        self.voice_service = voice_service or VoiceService()
+        self.memory_service = memory_service or MemoryService()
+        self.message_handler_service = message_handler_service or MessageHandlerService(
+            ai_service=self.ai_service,
+            memory_service=self.memory_service
+        )
         self.broadcast = Broadcast("redis://localhost:6379")
         self._subscriber_task = None
+        # Reused by _encode_frame; safe because encode and decode never await in between
+        self._frame_buffer = bytearray()
 
     async def start(self):
         await self.broadcast.connect()
@@ -64,7 +70,7 @@ class WebSocketManager:
     async def _handle_pubsub_event(self, message: str):
         # message: JSON string {"session_id":..., "data":...}
         try:
-            msg = json.loads(message)
+            msg = orjson.loads(message)
             session_id = msg.get("session_id")
             data = msg.get("data")
             # Broadcast to all local clients in this session
@@ -78,7 +84,7 @@ class WebSocketManager:
         """Accept WebSocket connection and return connection ID"""
 
         await websocket.accept()
-        connection_id = str(uuid4())
+        connection_id = new_id()
         self.active_connections[connection_id] = websocket
 
         logger.info("WebSocket connected", connection_id=connection_id)
@@ -118,12 +124,13 @@ class WebSocketManager:
             return
         websocket = self.active_connections[connection_id]
         try:
-            message = WebSocketMessage(
+            message = WebSocketFrame(
                 type=data["type"],
                 data=data["data"],
-                session_id=self.connection_sessions.get(connection_id)
+                session_id=self.connection_sessions.get(connection_id),
+                timestamp=now_utc()
             )
-            await websocket.send_text(message.model_dump_json())
+            await websocket.send_text(self._encode_frame(message))
         except Exception as e:
             logger.error("Failed to send WebSocket message", connection_id=connection_id, error=str(e))
             self.disconnect(websocket)
@@ -134,12 +141,29 @@ class WebSocketManager:
             # Если нет session_id — отправить всем (например, system broadcast)
             for conn_id in list(self.active_connections.keys()):
                 await self.send_message(conn_id, data)
-            await self.broadcast.publish(channel=BROADCAST_CHANNEL, message=json.dumps({"session_id": None, "data": data}))
+            await self.broadcast.publish(channel=BROADCAST_CHANNEL, message=orjson.dumps({"session_id": None, "data": data}).decode())
         else:
             # Публикуем в Redis, все инстансы доставят своим клиентам
-            await self.broadcast.publish(channel=BROADCAST_CHANNEL, message=json.dumps({"session_id": session_id, "data": data}))
+            await self.broadcast.publish(channel=BROADCAST_CHANNEL, message=orjson.dumps({"session_id": session_id, "data": data}).decode())
+
+    def _encode_frame(self, frame: WebSocketFrame) -> str:
+        """Encode an outbound frame into the shared buffer"""
+        WEBSOCKET_FRAME_ENCODER.encode_into(frame, self._frame_buffer)
+        return self._frame_buffer.decode()
+
+    async def handle_raw_message(self, websocket: WebSocket, raw: Union[str, bytes]):
+        """Decode an incoming WebSocket frame and handle it"""
+
+        try:
+            message = WEBSOCKET_FRAME_DECODER.decode(raw)
+        except msgspec.DecodeError as e:
+            logger.warning("Invalid WebSocket message", error=str(e))
+            await self.send_error(websocket, f"Invalid message: {e}")
+            return
+
+        await self.handle_message(websocket, message)
 
-    async def handle_message(self, websocket: WebSocket, data: Dict[str, Any]):
+    async def handle_message(self, websocket: WebSocket, message: WebSocketFrame):
         """Handle incoming WebSocket message"""
 
         connection_id = self._get_connection_id(websocket)
@@ -148,9 +172,9 @@ class WebSocketManager:
             return
 
         try:
-            message_type = data.get("type")
-            message_data = data.get("data", {})
-            session_id = data.get("session_id")
+            message_type = message.type
+            message_data = message.data
+            session_id = message.session_id
 
             # Update session mapping
             if session_id:
@@ -269,14 +293,15 @@ class WebSocketManager:
 
         try:
             # Create audio file metadata
-            audio_file = AudioFile(
+            audio_file = AudioFileDTO(
                 filename=f"voice_{connection_id}.wav",
                 content_type="audio/wav",
                 size_bytes=len(audio_data)
             )
 
-            # Validate audio
-            if not await self.voice_service.validate_audio(audio_data, audio_file.content_type):
+            # Decode and validate once; the decoded audio is reused for transcription
+            audio_segment = await self.voice_service.load_audio(audio_data, audio_file.content_type)
+            if audio_segment is None:
                 await self.send_message(connection_id, {
                     "type": "error",
                     "data": {"message": "Invalid audio data"}
@@ -295,7 +320,8 @@ class WebSocketManager:
             # Transcribe audio
             transcription = await self.voice_service.transcribe_audio(
                 audio_data,
-                audio_file
+                audio_file,
+                audio_segment=audio_segment
             )
 
             # Send transcription result
@@ -330,11 +356,12 @@ class WebSocketManager:
         """Send error message to WebSocket"""
 
         try:
-            error_msg = WebSocketMessage(
+            error_msg = WebSocketFrame(
                 type="error",
-                data={"message": message}
+                data={"message": message},
+                timestamp=now_utc()
             )
-            await websocket.send_text(error_msg.model_dump_json())
+            await websocket.send_text(self._encode_frame(error_msg))
 
         except Exception as e:
             logger.error("Failed to send error message", error=str(e))
@@ -0,0 +1,80 @@
+"""
+Nearest-key search for the embedding caches
+Small caches and int8-quantized keys use compiled loops when numba is installed; BLAS handles the rest
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+# Below this many rows the BLAS call overhead outweighs the scan itself
+SMALL_SCAN_ROWS = 512
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _argmax_dot(keys, q):
+        # Serial on purpose: a prange over rows would race on best/idx
+        best = -np.inf
+        idx = -1
+        for i in range(keys.shape[0]):
+            s = np.float32(0.0)
+            for j in range(keys.shape[1]):
+                s += keys[i, j] * q[j]
+            if s > best:
+                best = s
+                idx = i
+        return idx, best
+
+    @njit(fastmath=True, cache=True)
+    def _argmax_dot_int8(keys, scales, q):
+        best = -np.inf
+        idx = -1
+        for i in range(keys.shape[0]):
+            s = np.float32(0.0)
+            for j in range(keys.shape[1]):
+                s += np.float32(keys[i, j]) * q[j]
+            s *= scales[i]
+            if s > best:
+                best = s
+                idx = i
+        return idx, best
+else:
+    _argmax_dot = None
+    _argmax_dot_int8 = None
+
+
+def quantize_int8(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Symmetric per-vector int8 codes and the scale that maps them back"""
+    max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = max_abs / 127 if max_abs else 1.0
+    return np.clip(np.rint(vector / scale), -127, 127).astype(np.int8), scale
+
+
+def argmax_cosine(keys: np.ndarray, q: np.ndarray, scales: Optional[np.ndarray] = None) -> Tuple[int, float]:
+    """Row of unit-length keys closest to unit-length q, and its cosine similarity
+
+    With scales, keys are int8 codes from quantize_int8 and row i stands for keys[i] * scales[i].
+    """
+
+    if scales is not None:
+        if _argmax_dot_int8 is not None:
+            # A quarter of the float32 bytes per scan; no BLAS path is faster at any size
+            idx, best = _argmax_dot_int8(keys, scales, q)
+            return int(idx), float(best)
+        similarities = (keys.astype(np.float32) @ q) * scales
+        idx = int(similarities.argmax())
+        return idx, float(similarities[idx])
+
+    if _argmax_dot is not None and keys.shape[0] < SMALL_SCAN_ROWS and keys.dtype == np.float32:
+        idx, best = _argmax_dot(keys, q)
+        return int(idx), float(best)
+
+    similarities = keys @ q
+    idx = int(similarities.argmax())
+    return idx, float(similarities[idx])
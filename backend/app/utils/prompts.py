@@ -19,21 +19,31 @@ class PromptManager:
 
     def __init__(self):
         self.settings = get_settings()
+        self.prompts_file = Path(self.settings.config_path) / "prompts.json"
         self.prompts = {}
+        self._prompts_mtime_ns: Optional[int] = None
         self._load_prompts()
 
+    def _get_prompts_mtime_ns(self) -> Optional[int]:
+        """Return the prompts file mtime, or None if it does not exist"""
+
+        try:
+            return self.prompts_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
     def _load_prompts(self):
         """Load prompts from configuration file"""
 
         try:
-            prompts_file = Path(self.settings.config_path) / "prompts.json"
+            self._prompts_mtime_ns = self._get_prompts_mtime_ns()
 
-            if prompts_file.exists():
-                with open(prompts_file, 'r', encoding='utf-8') as f:
+            if self._prompts_mtime_ns is not None:
+                with open(self.prompts_file, 'r', encoding='utf-8') as f:
                     self.prompts = json.load(f)
-                logger.info("Prompts loaded successfully", file=str(prompts_file))
+                logger.info("Prompts loaded successfully", file=str(self.prompts_file))
             else:
-                logger.warning("Prompts file not found, using defaults", file=str(prompts_file))
+                logger.warning("Prompts file not found, using defaults", file=str(self.prompts_file))
                 self._load_default_prompts()
 
         except Exception as e:
@@ -181,9 +191,30 @@ class PromptManager:
         logger.info("Reloading prompts")
         self._load_prompts()
 
+    def refresh(self) -> bool:
+        """Reload prompts only if the file changed since the last load"""
+
+        if self._get_prompts_mtime_ns() == self._prompts_mtime_ns:
+            return False
+
+        self.reload_prompts()
+        return True
+
+    def apply(self, prompts: Dict[str, Any]):
+        """Use an already parsed prompt configuration without re-reading the file"""
+
+        self.prompts = prompts
+        self._prompts_mtime_ns = self._get_prompts_mtime_ns()
+        logger.info("Prompts applied")
+
     def validate_prompt_config(self) -> Dict[str, Any]:
         """Validate prompt configuration"""
 
+        return self.validate_payload(self.prompts)
+
+    def validate_payload(self, prompts: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a prompt configuration dict (e.g. an incoming update)"""
+
         validation_result = {
             "valid": True,
             "errors": [],
@@ -193,12 +224,12 @@ class PromptManager:
         # Check required sections
         required_sections = ["system_prompts", "response_templates"]
         for section in required_sections:
-            if section not in self.prompts:
+            if section not in prompts:
                 validation_result["errors"].append(f"Missing required section: {section}")
                 validation_result["valid"] = False
 
         # Check system prompts
-        system_prompts = self.prompts.get("system_prompts", {})
+        system_prompts = prompts.get("system_prompts", {})
         if "default" not in system_prompts:
             validation_result["errors"].append("Missing default system prompt")
             validation_result["valid"] = False
@@ -207,7 +238,7 @@ class PromptManager:
             validation_result["valid"] = False
 
         # Check response templates
-        response_templates = self.prompts.get("response_templates", {})
+        response_templates = prompts.get("response_templates", {})
         required_templates = ["welcome_messages", "error_messages", "clarification_requests"]
         for template in required_templates:
             if template not in response_templates:
@@ -0,0 +1,189 @@
+"""
+Approximate caches keyed by embeddings
+A lookup hits when a cached key is close enough to the query vector
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from app.utils.cache_search import argmax_cosine, quantize_int8
+
+
+def normalize(vector: Any) -> np.ndarray:
+    """Unit-length float32 copy of an embedding, so cosine similarity is a dot product"""
+    q = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(q)
+    return q / norm if norm else q
+
+
+class ProximityCache:
+    """LRU cache that hits on the nearest key within `threshold` cosine distance
+
+    Entries older than `ttl` seconds (if given) are dropped when a lookup lands on them.
+    """
+
+    def __init__(self, capacity: int, threshold: float, quantize: bool = False, ttl: Optional[float] = None):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.quantize = quantize
+        self.ttl = ttl
+        # One contiguous (capacity, dim) block, allocated on first insert; a
+        # lookup is a single matrix-vector product over the filled rows.
+        # Quantized caches keep int8 codes plus one float32 scale per row
+        self._keys: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._values: List[Any] = []
+        self._inserted_at: List[float] = []
+        # Slot ids, least recently used first
+        self._recency: "OrderedDict[int, None]" = OrderedDict()
+        # Expired slots; their key rows are zeroed so no lookup can match them
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._values) - len(self._free)
+
+    def _candidates(self, key: np.ndarray) -> Optional[np.ndarray]:
+        """Slots worth scoring for key; None scores every filled slot"""
+        return None
+
+    def _index(self, slot: int, key: np.ndarray) -> None:
+        """Hook called after key is stored in slot"""
+
+    def _unindex(self, slot: int) -> None:
+        """Hook called before slot is overwritten"""
+
+    def lookup(self, vector: Any) -> Optional[Any]:
+        """Value of the closest cached key, or None if nothing is within threshold"""
+
+        if not self._values:
+            return None
+
+        key = normalize(vector)
+        slots = self._candidates(key)
+        if slots is None:
+            count = len(self._values)
+            scales = self._scales[:count] if self.quantize else None
+            slot, similarity = argmax_cosine(self._keys[:count], key, scales)
+        elif len(slots):
+            scales = self._scales[slots] if self.quantize else None
+            best, similarity = argmax_cosine(self._keys[slots], key, scales)
+            slot = int(slots[best])
+        else:
+            return None
+
+        if 1.0 - similarity > self.threshold:
+            return None
+
+        if self.ttl is not None and time.monotonic() - self._inserted_at[slot] > self.ttl:
+            self._expire(slot)
+            return None
+
+        self._recency.move_to_end(slot)
+        return self._values[slot]
+
+    def insert(self, vector: Any, value: Any) -> None:
+        """Store value under vector, evicting the least recently used entry when full"""
+
+        if self.capacity <= 0:
+            return
+
+        key = normalize(vector)
+        if self._keys is None:
+            dtype = np.int8 if self.quantize else np.float32
+            self._keys = np.empty((self.capacity, key.shape[0]), dtype=dtype)
+            if self.quantize:
+                self._scales = np.empty(self.capacity, dtype=np.float32)
+
+        if self._free:
+            slot = self._free.pop()
+        elif len(self._values) < self.capacity:
+            slot = len(self._values)
+            self._values.append(None)
+            self._inserted_at.append(0.0)
+        else:
+            slot, _ = self._recency.popitem(last=False)
+            self._unindex(slot)
+
+        self._values[slot] = value
+        self._inserted_at[slot] = time.monotonic()
+
+        if self.quantize:
+            self._keys[slot], self._scales[slot] = quantize_int8(key)
+        else:
+            self._keys[slot] = key
+        self._recency[slot] = None
+        self._index(slot, key)
+
+    def _expire(self, slot: int) -> None:
+        """Free slot for the next insert"""
+        del self._recency[slot]
+        self._unindex(slot)
+        self._values[slot] = None
+        self._keys[slot] = 0
+        self._free.append(slot)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._values.clear()
+        self._inserted_at.clear()
+        self._recency.clear()
+        self._free.clear()
+
+
+class LSHSemanticCache(ProximityCache):
+    """ProximityCache that scores only keys sharing a random-hyperplane bucket with the query"""
+
+    def __init__(
+        self,
+        capacity: int,
+        threshold: float,
+        tables: int = 8,
+        bits: int = 8,
+        quantize: bool = False,
+        ttl: Optional[float] = None,
+        seed: Optional[int] = 0
+    ):
+        super().__init__(capacity, threshold, quantize, ttl)
+        self.tables = tables
+        self.bits = bits
+        self._rng = np.random.default_rng(seed)
+        # (tables * bits, dim) hyperplanes, drawn once the embedding size is known
+        self._planes: Optional[np.ndarray] = None
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(tables)]
+        self._signatures: Dict[int, List[bytes]] = {}
+
+    def _signature(self, key: np.ndarray) -> List[bytes]:
+        """One bucket id per table: the packed signs of key against its hyperplanes"""
+
+        if self._planes is None:
+            self._planes = self._rng.standard_normal((self.tables * self.bits, key.shape[0]), dtype=np.float32)
+        signs = (self._planes @ key > 0).reshape(self.tables, self.bits)
+        return [row.tobytes() for row in np.packbits(signs, axis=1)]
+
+    def _candidates(self, key: np.ndarray) -> np.ndarray:
+        candidates: Set[int] = set()
+        for buckets, signature in zip(self._buckets, self._signature(key)):
+            candidates.update(buckets.get(signature, ()))
+        return np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+
+    def _index(self, slot: int, key: np.ndarray) -> None:
+        signature = self._signature(key)
+        self._signatures[slot] = signature
+        for buckets, bucket_id in zip(self._buckets, signature):
+            buckets.setdefault(bucket_id, set()).add(slot)
+
+    def _unindex(self, slot: int) -> None:
+        for buckets, bucket_id in zip(self._buckets, self._signatures.pop(slot)):
+            bucket = buckets[bucket_id]
+            bucket.discard(slot)
+            if not bucket:
+                del buckets[bucket_id]
+
+    def clear(self) -> None:
+        super().clear()
+        self._signatures.clear()
+        for buckets in self._buckets:
+            buckets.clear()
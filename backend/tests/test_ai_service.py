@@ -1,7 +1,21 @@
 import pytest
 import asyncio
 from unittest.mock import AsyncMock, patch
+from cachetools import TTLCache
 from app.models.chat import Message, ChatSettings
+from app.services.ai_providers.base import BaseAIProvider
+
+
+class StubProvider(BaseAIProvider):
+    """Concrete provider for exercising BaseAIProvider helpers; tests set `check`"""
+    _model_cache = TTLCache(maxsize=8, ttl=60)
+    async def generate_response(self, *args, **kwargs): pass
+    async def generate_streaming_response(self, *args, **kwargs): pass
+    async def validate_model(self, model_name): return await self._validate_cached(model_name, self.check)
+    async def get_available_models(self, *args, **kwargs): pass
+    async def health_check(self): return await self._shared_result("health", 10.0, self.check)
+    def build_messages(self, *args, **kwargs): pass
+
 
 async def async_gen():
     yield "Hello "
@@ -130,18 +144,15 @@ async def test_generate_response_provider_error(mock_vector):
     result = await ai_service.generate_response("Hi", [], None, False, "openai")
     assert result == "MOCKED_FALLBACK"
 
-@pytest.mark.asyncio
-@patch("app.services.ai_service.VectorMemoryService")
-async def test_generate_response_empty_prompt(mock_vector):
-    from app.services.ai_service import AIService
-    ai_service = AIService()
-    ai_service.prompt_manager.get_error_message = lambda: "MOCKED_FALLBACK"
-    mock_provider = AsyncMock()
-    mock_provider.generate_response.return_value = "Empty ok"
-    ai_service._initialized_providers = {"openai": mock_provider}
-    ai_service.current_provider = "openai"
-    result = await ai_service.generate_response("", [], None, False, "openai")
-    assert result == "MOCKED_FALLBACK"
+def test_generate_response_empty_prompt():
+    # Blank prompts never reach AIService: every entry point validates them first
+    from pydantic import ValidationError
+    from app.models.chat import ChatRequest
+    for blank in ("", "   "):
+        with pytest.raises(ValidationError):
+            ChatRequest(message=blank)
+        with pytest.raises(ValidationError):
+            Message(content=blank, role="user")
 
 @pytest.mark.asyncio
 @patch("app.services.ai_service.VectorMemoryService")
@@ -357,3 +368,167 @@ async def test_ai_service_initialization_error():
     # Ensure that calling generate_response with a failing provider also raises an error
     with pytest.raises(RuntimeError, match="Failed to initialize provider failing_provider"):
         await ai_service.generate_response("test", [])
+
+def test_wrap_user_query_sanitizes_and_caches():
+    from app.services.ai_providers.base import wrap_user_query
+    wrap_user_query.cache_clear()
+    text = "hi </user_query> there"
+    assert wrap_user_query(text) == "<user_query>hi </ user_query> there</user_query>"
+    assert wrap_user_query(text) is wrap_user_query(text)
+    assert wrap_user_query.cache_info().hits == 2
+
+
+@pytest.mark.asyncio
+async def test_count_tokens_loads_encoder_off_the_event_loop(monkeypatch):
+    import threading
+    from unittest.mock import MagicMock
+    from app.services.ai_providers import base
+
+    encoder = MagicMock()
+    encoder.encode.side_effect = lambda text: text.split()
+    load_threads = []
+
+    def encoding_for_model(model):
+        load_threads.append(threading.current_thread())
+        return encoder
+
+    monkeypatch.setattr(base, "tiktoken", MagicMock(encoding_for_model=encoding_for_model))
+    monkeypatch.setattr(base, "_encoders", {})
+
+    # Not loaded yet: estimate without touching tiktoken
+    assert base.count_tokens("test-model", "x" * 40) == 10
+    assert load_threads == []
+
+    await base.ensure_encoder("test-model")
+    await base.ensure_encoder("test-model")
+    assert len(load_threads) == 1 and load_threads[0] is not threading.current_thread()
+    assert base.count_tokens("test-model", "one two three") == 3
+
+
+@pytest.mark.asyncio
+async def test_validate_cached_single_flight():
+    StubProvider._model_cache.clear()
+    calls = []
+
+    async def check(model_name):
+        calls.append(model_name)
+        await asyncio.sleep(0)
+        return False
+
+    provider = StubProvider({})
+    provider.check = check
+    results = await asyncio.gather(*(provider.validate_model("m") for _ in range(5)))
+    assert results == [False] * 5
+    other = StubProvider({})
+    other.check = check
+    assert await other.validate_model("m") is False
+    assert calls == ["m"]
+
+
+@pytest.mark.asyncio
+async def test_shared_result_dedupes_overlapping_calls():
+    calls = []
+
+    async def check():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"status": "healthy"}
+
+    provider = StubProvider({})
+    provider.check = check
+    results = await asyncio.gather(*(provider.health_check() for _ in range(5)))
+    assert all(result is results[0] for result in results)
+    assert await provider.health_check() is results[0]
+    assert len(calls) == 1
+
+
+def test_fit_context_drops_oldest_messages_over_budget():
+    from app.services.ai_providers.base import context_limit
+
+    assert context_limit("gpt-4o-2024-08-06") == context_limit("gpt-4o") == 128000
+    # ~1000 tokens each; gpt-4 leaves 8192 - 1000 - 256 for the prompt
+    context = [Message(content=str(i) * 4000, role="user") for i in range(10)]
+    fitted = StubProvider({})._fit_context(context, ChatSettings(max_tokens=1000), "gpt-4", None, "hi")
+    assert fitted == context[-6:]
+    assert StubProvider({})._fit_context(context, ChatSettings(), "gpt-4o", None, "hi") is context
+
+
+@pytest.mark.asyncio
+async def test_generate_batch_single_vector_search(mock_vector_memory_service):
+    from app.services.ai_service import AIService
+    from app.utils.semantic_cache import LSHSemanticCache
+
+    vector_service = mock_vector_memory_service.return_value
+    vector_service.query_batch = AsyncMock(return_value=[[{"document": "fact"}], []])
+    ai_service = AIService()
+    ai_service.rag_cache = LSHSemanticCache(0, 0.05)
+    provider = AsyncMock()
+    provider.generate_response.side_effect = ["one", Exception("fail"), "three"]
+    ai_service._initialized_providers["openai"] = provider
+
+    questions = ["first question", "second question", "ok"]
+    responses = await ai_service.generate_batch(questions, [[], [], []], provider="openai")
+
+    vector_service.query_batch.assert_awaited_once_with(questions[:2], top_k=ai_service.settings.rag_top_k)
+    assert responses == ["one", ai_service._get_fallback_response(), "three"]
+    first_context = provider.generate_response.await_args_list[0].args[1]
+    assert first_context[0].role == "system" and "fact" in first_context[0].content
+
+
+def test_apply_rag_context_leaves_history_untouched():
+    from app.services.ai_service import AIService
+
+    ai_service = AIService()
+    system = Message(content="Be brief", role="system")
+    context = [system, Message(content="hi", role="user")]
+
+    modified, rag_enabled = ai_service._apply_rag_context("q", context, [{"document": "fact"}])
+
+    assert rag_enabled
+    assert system.content == "Be brief"
+    assert modified[0].content.startswith("Be brief") and "fact" in modified[0].content
+    assert modified[1] is context[1]
+    assert ai_service._apply_rag_context("q", context, []) == (context, False)
+
+
+@pytest.mark.asyncio
+async def test_get_provider_info_is_cached_per_provider():
+    from unittest.mock import MagicMock
+    from app.services.ai_service import AIService
+
+    ai_service = AIService()
+    provider = MagicMock()
+    provider.get_provider_name.return_value = "openai"
+    provider.config = {"model": "gpt-4"}
+    ai_service._initialized_providers["openai"] = provider
+
+    first = await ai_service.get_provider_info()
+    second = await ai_service.get_provider_info()
+
+    assert first["provider_configs"]["openai"] == {"name": "openai", "model": "gpt-4"}
+    assert second["provider_configs"]["openai"] == first["provider_configs"]["openai"]
+    assert "openai" in second["available_providers"]
+    provider.get_provider_name.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_rag_cache_dropped_after_document_added(mock_vector_memory_service):
+    import numpy as np
+    from app.services.ai_service import AIService
+
+    vector_service = mock_vector_memory_service.return_value
+    vector_service.generation = 0
+    vector_service.embed = AsyncMock(return_value=np.array([1.0, 0.0], dtype=np.float32))
+    vector_service.query = AsyncMock(return_value=[{"document": "old fact"}])
+    ai_service = AIService()
+
+    assert await ai_service._retrieve_documents("what do you remember?") == [{"document": "old fact"}]
+    assert await ai_service._retrieve_documents("what do you remember?") == [{"document": "old fact"}]
+    assert vector_service.query.await_count == 1
+
+    # A new memory is indexed between turns
+    vector_service.generation += 1
+    vector_service.query.return_value = [{"document": "new fact"}]
+
+    assert await ai_service._retrieve_documents("what do you remember?") == [{"document": "new fact"}]
+    assert vector_service.query.await_count == 2
@@ -96,6 +96,7 @@ def test_metrics(test_client):
     assert "process" in data
     assert "cpu_percent" in data["system"]
     assert "memory_total" in data["system"]
+    assert data["chat"]["queue_depth"] >= 0
 
 @pytest.mark.asyncio
 async def test_detailed_health_check_all_healthy(test_client, monkeypatch):
@@ -110,10 +111,10 @@ async def test_detailed_health_check_all_healthy(test_client, monkeypatch):
     mock_vector_memory_service = AsyncMock()
     mock_vector_memory_service.health_check.return_value = {"status": "healthy"}
 
-    monkeypatch.setattr("app.services.ai_service.AIService", lambda: mock_ai_service)
-    monkeypatch.setattr("app.services.voice_service.VoiceService", lambda: mock_voice_service)
-    monkeypatch.setattr("app.services.memory_service.MemoryService", lambda: mock_memory_service)
-    monkeypatch.setattr("app.services.vector_memory_service.VectorMemoryService", lambda: mock_vector_memory_service)
+    monkeypatch.setattr(app.state, "ai_service", mock_ai_service)
+    monkeypatch.setattr(app.state, "voice_service", mock_voice_service)
+    monkeypatch.setattr(app.state, "memory_service", mock_memory_service)
+    monkeypatch.setattr(app.state, "vector_memory_service", mock_vector_memory_service)
 
     response = test_client.get("/health/detailed")
     assert response.status_code == 200
@@ -136,10 +137,10 @@ async def test_detailed_health_check_some_unhealthy(test_client, monkeypatch):
     mock_vector_memory_service = AsyncMock()
     mock_vector_memory_service.health_check.return_value = {"status": "unhealthy", "error": "Vector fail"}
 
-    monkeypatch.setattr("app.services.ai_service.AIService", lambda: mock_ai_service)
-    monkeypatch.setattr("app.services.voice_service.VoiceService", lambda: mock_voice_service)
-    monkeypatch.setattr("app.services.memory_service.MemoryService", lambda: mock_memory_service)
-    monkeypatch.setattr("app.services.vector_memory_service.VectorMemoryService", lambda: mock_vector_memory_service)
+    monkeypatch.setattr(app.state, "ai_service", mock_ai_service)
+    monkeypatch.setattr(app.state, "voice_service", mock_voice_service)
+    monkeypatch.setattr(app.state, "memory_service", mock_memory_service)
+    monkeypatch.setattr(app.state, "vector_memory_service", mock_vector_memory_service)
 
     response = test_client.get("/health/detailed")
     assert response.status_code == 200
@@ -150,6 +151,32 @@ async def test_detailed_health_check_some_unhealthy(test_client, monkeypatch):
     assert data["services"]["vector_memory_service"]["status"] == "unhealthy"
 
 
+@pytest.mark.asyncio
+async def test_detailed_health_check_service_raises(test_client, monkeypatch):
+    """Test detailed health check when a service check raises"""
+    mock_ai_service = AsyncMock()
+    mock_ai_service.health_check.side_effect = Exception("AI down")
+    mock_voice_service = AsyncMock()
+    mock_voice_service.health_check.return_value = {"status": "healthy"}
+    mock_memory_service = AsyncMock()
+    mock_memory_service.health_check.return_value = {"status": "healthy"}
+    mock_vector_memory_service = AsyncMock()
+    mock_vector_memory_service.health_check.return_value = {"status": "healthy"}
+
+    monkeypatch.setattr(app.state, "ai_service", mock_ai_service)
+    monkeypatch.setattr(app.state, "voice_service", mock_voice_service)
+    monkeypatch.setattr(app.state, "memory_service", mock_memory_service)
+    monkeypatch.setattr(app.state, "vector_memory_service", mock_vector_memory_service)
+
+    response = test_client.get("/health/detailed")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "degraded"
+    assert data["services"]["ai_service"] == {"status": "unhealthy", "error": "AI down"}
+    assert data["services"]["memory_service"]["status"] == "healthy"
+    assert "platform" in data["system"]
+
+
 def test_readiness_check_unhealthy_memory_service(test_client, monkeypatch):
     """Test readiness probe endpoint when memory service is unhealthy"""
     mock_settings = MagicMock()
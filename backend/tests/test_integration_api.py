@@ -8,7 +8,9 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock, MagicMock
 from app.main import app
 from app.models.chat import Message, Conversation
+from app.services.message_handler_service import MessageHandlerService
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 @pytest.fixture(scope="module")
 def test_client():
@@ -25,32 +27,50 @@ def mock_services_for_integration_tests(monkeypatch):
     mock_ai_service.switch_provider.return_value = True
     mock_ai_service.get_available_models.return_value = ["gpt-3.5-turbo", "gpt-4"]
     mock_ai_service.get_all_available_models.return_value = {"openai": ["gpt-3.5-turbo"], "gemini": ["gemini-pro"]}
-    monkeypatch.setattr("app.services.ai_service.AIService", lambda: mock_ai_service)
+    monkeypatch.setattr(app.state, "ai_service", mock_ai_service)
 
     # Mock MemoryService
     mock_memory_service = AsyncMock()
     mock_memory_service.add_message.return_value = True
     mock_memory_service.save_conversation.return_value = True
     mock_memory_service.load_conversation.return_value = None # Default to no conversation
+    mock_memory_service.get_message_count.return_value = 0
     mock_memory_service.list_conversations.return_value = []
+    mock_memory_service.list_conversations_after.return_value = []
     mock_memory_service.delete_conversation.return_value = True
     mock_memory_service.cleanup_old_conversations.return_value = 0
     mock_memory_service.export_conversation.return_value = "exported data"
-    monkeypatch.setattr("app.services.memory_service.MemoryService", lambda: mock_memory_service)
+    monkeypatch.setattr(app.state, "memory_service", mock_memory_service)
 
     # Mock VectorMemoryService
     mock_vector_memory_service = AsyncMock()
     mock_vector_memory_service.query.return_value = []
-    monkeypatch.setattr("app.services.vector_memory_service.VectorMemoryService", lambda: mock_vector_memory_service)
+    monkeypatch.setattr(app.state, "vector_memory_service", mock_vector_memory_service)
 
     # Mock ResearchService
     mock_research_service = AsyncMock()
-    monkeypatch.setattr("app.services.research_service.ResearchService", lambda: mock_research_service)
+    monkeypatch.setattr(app.state, "research_service", mock_research_service)
 
     # Mock PromptManager
     mock_prompt_manager = MagicMock()
     mock_prompt_manager.get_error_message.return_value = "MOCKED_FALLBACK_ERROR"
-    monkeypatch.setattr("app.utils.prompts.PromptManager", lambda: mock_prompt_manager)
+    monkeypatch.setattr(app.state, "prompt_manager", mock_prompt_manager)
+
+    mock_handler_service = MessageHandlerService(
+        ai_service=mock_ai_service,
+        memory_service=mock_memory_service,
+        vector_memory_service=mock_vector_memory_service,
+        research_service=mock_research_service
+    )
+    monkeypatch.setattr(app.state, "message_handler_service", mock_handler_service)
+
+    return SimpleNamespace(
+        ai_service=mock_ai_service,
+        memory_service=mock_memory_service,
+        vector_memory_service=mock_vector_memory_service,
+        research_service=mock_research_service,
+        prompt_manager=mock_prompt_manager
+    )
 
 
 @pytest.mark.integration
@@ -78,15 +98,25 @@ def test_chat_message_flow(test_client, mock_services_for_integration_tests):
         Message(content="Mocked AI response", role="assistant", session_id=payload["session_id"])
     )
 
+@pytest.mark.integration
+def test_chat_message_rejected_when_overloaded(test_client, mock_services_for_integration_tests, monkeypatch):
+    from app.api.routes import chat
+    monkeypatch.setattr(chat, "_chat_queue_depth", chat.settings.chat_max_queue_depth)
+
+    response = test_client.post("/api/chat/message", json={"message": "Привет, бот!"})
+    assert response.status_code == 429
+    mock_services_for_integration_tests.ai_service.generate_response.assert_not_called()
+
 @pytest.mark.integration
 def test_get_chat_history(test_client, mock_services_for_integration_tests):
     session_id = "history_test_session"
     mock_conversation = Conversation(session_id=session_id)
     mock_conversation.add_message(Message(content="User msg 1", role="user", session_id=session_id))
     mock_conversation.add_message(Message(content="AI msg 1", role="assistant", session_id=session_id))
-    mock_services_for_integration_tests.memory_service.load_conversation.return_value = mock_conversation
+    mock_services_for_integration_tests.memory_service.get_conversation_history.return_value = mock_conversation.messages
+    mock_services_for_integration_tests.memory_service.get_message_count.return_value = 2
 
-    response = test_client.get(f"/api/chat/history/{session_id}")
+    response = test_client.get(f"/api/chat/history/{session_id}?page=1")
     assert response.status_code == 200
     data = response.json()
     assert data["session_id"] == session_id
@@ -95,6 +125,25 @@ def test_get_chat_history(test_client, mock_services_for_integration_tests):
     assert data["messages"][1]["content"] == "AI msg 1"
     assert data["total_messages"] == 2
 
+@pytest.mark.integration
+def test_get_chat_history_cursor(test_client, mock_services_for_integration_tests):
+    session_id = "history_cursor_session"
+    messages = [
+        Message(id=str(i), content=f"msg {i}", role="user", session_id=session_id)
+        for i in range(3)
+    ]
+    mock_services_for_integration_tests.memory_service.get_conversation_history_after.return_value = messages
+
+    response = test_client.get(f"/api/chat/history/{session_id}?limit=2&cursor=3")
+    assert response.status_code == 200
+    data = response.json()
+    assert [m["content"] for m in data["messages"]] == ["msg 1", "msg 2"]
+    assert data["has_more"] is True
+    assert data["next_cursor"] == "1"
+    mock_services_for_integration_tests.memory_service.get_conversation_history_after.assert_called_once_with(
+        session_id, cursor="3", limit=3
+    )
+
 @pytest.mark.integration
 def test_list_conversations(test_client, mock_services_for_integration_tests):
     mock_summaries = [
@@ -115,14 +164,27 @@ def test_list_conversations(test_client, mock_services_for_integration_tests):
             "last_message_preview": "Last message of conv2"
         }
     ]
-    mock_services_for_integration_tests.memory_service.list_conversations.return_value = mock_summaries
+    mock_services_for_integration_tests.memory_service.list_conversations_after.return_value = mock_summaries
 
-    response = test_client.get("/api/chat/conversations")
+    response = test_client.get("/api/chat/conversations?limit=1")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 2
-    assert data[0]["session_id"] == "conv1"
-    assert data[1]["session_id"] == "conv2"
+    assert len(data["conversations"]) == 1
+    assert data["conversations"][0]["session_id"] == "conv1"
+    assert data["has_more"] is True
+    mock_services_for_integration_tests.memory_service.list_conversations_after.assert_called_once_with(
+        before=None, limit=2
+    )
+
+    response = test_client.get(f"/api/chat/conversations?cursor={data['next_cursor']}")
+    assert response.status_code == 200
+    before = mock_services_for_integration_tests.memory_service.list_conversations_after.call_args.kwargs["before"]
+    assert before[1] == "conv1"
+
+@pytest.mark.integration
+def test_list_conversations_invalid_cursor(test_client, mock_services_for_integration_tests):
+    response = test_client.get("/api/chat/conversations?cursor=not-a-cursor")
+    assert response.status_code == 400
 
 @pytest.mark.integration
 def test_delete_conversation(test_client, mock_services_for_integration_tests):
@@ -135,14 +197,26 @@ def test_delete_conversation(test_client, mock_services_for_integration_tests):
 @pytest.mark.integration
 def test_export_conversation(test_client, mock_services_for_integration_tests):
     session_id = "export_test_session"
-    mock_services_for_integration_tests.memory_service.export_conversation.return_value = "mocked export content"
+
+    async def exported_chunks():
+        yield b"mocked "
+        yield b"export content"
+
+    mock_services_for_integration_tests.memory_service.iter_export_conversation.return_value = exported_chunks()
 
     response = test_client.get(f"/api/chat/conversation/{session_id}/export?format=txt")
     assert response.status_code == 200
     assert response.text == "mocked export content"
-    assert response.headers["content-type"] == "text/plain"
+    assert response.headers["content-type"].startswith("text/plain")
     assert "filename=conversation_export_test_session.txt" in response.headers["content-disposition"]
-    mock_services_for_integration_tests.memory_service.export_conversation.assert_called_once_with(session_id, "txt")
+    mock_services_for_integration_tests.memory_service.iter_export_conversation.assert_called_once_with(session_id, "txt")
+
+@pytest.mark.integration
+def test_export_conversation_not_found(test_client, mock_services_for_integration_tests):
+    mock_services_for_integration_tests.memory_service.iter_export_conversation.return_value = None
+
+    response = test_client.get("/api/chat/conversation/missing_session/export?format=json")
+    assert response.status_code == 404
 
 @pytest.mark.integration
 def test_cleanup_old_conversations(test_client, mock_services_for_integration_tests):
@@ -183,3 +257,17 @@ def test_get_available_models_specific_provider(test_client, mock_services_for_i
     data = response.json()
     assert data["provider"] == "openai"
     assert "gpt-3.5-turbo" in data["models"]
+
+@pytest.mark.integration
+def test_update_prompts_rejects_invalid_payload(test_client, mock_services_for_integration_tests):
+    prompt_manager = mock_services_for_integration_tests.prompt_manager
+    prompt_manager.validate_payload.return_value = {
+        "valid": False,
+        "errors": ["Missing default system prompt"],
+        "warnings": []
+    }
+
+    response = test_client.post("/api/config/prompts", json={"system_prompts": {}})
+    assert response.status_code == 400
+    prompt_manager.validate_payload.assert_called_once_with({"system_prompts": {}})
+    prompt_manager.apply.assert_not_called()
@@ -41,7 +41,7 @@ def mock_services_for_ws_integration_tests(monkeypatch):
 
     # Mock VoiceService
     mock_voice_service = AsyncMock()
-    mock_voice_service.validate_audio.return_value = True
+    mock_voice_service.load_audio.return_value = MagicMock()
     mock_voice_service.transcribe_audio.return_value = MagicMock(text="Mocked transcription", confidence=0.9)
     monkeypatch.setattr("app.services.voice_service.VoiceService", lambda: mock_voice_service)
 
@@ -89,7 +89,6 @@ async def test_websocket_chat_flow(test_client, mock_services_for_ws_integration
 
 @pytest.mark.integration
 async def test_websocket_voice_flow(test_client, mock_services_for_ws_integration_tests):
-    from app.models.voice import AudioFile
     with test_client.websocket_connect("/ws/voice") as ws:
         # Receive welcome message
         welcome_message = ws.receive_json()
@@ -110,7 +109,7 @@ async def test_websocket_voice_flow(test_client, mock_services_for_ws_integratio
         assert transcription_result["data"]["text"] == "Mocked transcription"
 
         # Verify voice service was called
-        mock_services_for_ws_integration_tests.voice_service.validate_audio.assert_called_once()
+        mock_services_for_ws_integration_tests.voice_service.load_audio.assert_called_once()
         mock_services_for_ws_integration_tests.voice_service.transcribe_audio.assert_called_once()
 
 @pytest.mark.integration
@@ -3,6 +3,7 @@ import asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
 from app.services.memory_service import MemoryService, JSONStorageBackend, RedisStorageBackend
 from app.models.chat import Conversation, Message
+from datetime import datetime
 
 class AsyncMockPipeline:
     async def delete(self, *a, **kw): return self
@@ -44,7 +45,7 @@ async def test_json_storage_save_and_load(tmp_path):
     assert loaded.messages[0].content == "Hello"
 
 @pytest.mark.asyncio
-@patch("app.services.memory_service.aioredis.from_url")
+@patch("app.services.memory_service.get_redis_client")
 async def test_redis_add_message(mock_redis_from_url):
     mock_redis = AsyncMock()
     mock_redis_from_url.return_value = mock_redis
@@ -74,7 +75,7 @@ async def test_redis_add_message(mock_redis_from_url):
     mock_pipeline.execute.assert_awaited_once()
 
 @pytest.mark.asyncio
-@patch("app.services.memory_service.aioredis.from_url")
+@patch("app.services.memory_service.get_redis_client")
 async def test_redis_list_conversations(mock_redis_from_url):
     mock_redis = AsyncMock()
     mock_redis_from_url.return_value = mock_redis
@@ -119,7 +120,7 @@ async def test_redis_list_conversations(mock_redis_from_url):
     assert summaries[1].title == "Conv 2"
 
 @pytest.mark.asyncio
-@patch("app.services.memory_service.aioredis.from_url")
+@patch("app.services.memory_service.get_redis_client")
 async def test_redis_cleanup_old_conversations(mock_redis_from_url):
     mock_redis = AsyncMock()
     mock_redis_from_url.return_value = mock_redis
@@ -246,3 +247,88 @@ async def test_get_conversation_history_empty(tmp_path):
     memory_service._init_json_backend()
     result = await memory_service.get_conversation_history("no_such_session")
     assert result == []
+
+@pytest.mark.asyncio
+async def test_get_conversation_history_after_cursor(tmp_path):
+    settings = AsyncMock()
+    settings.memory_type = "json"
+    settings.memory_path = str(tmp_path)
+    settings.max_history_messages = 100
+    memory_service = MemoryService()
+    memory_service.settings = settings
+    memory_service._init_json_backend()
+    session_id = "cursor_test"
+    for i in range(5):
+        msg = Message(id=str(i), content=f"msg{i}", role="user", timestamp="2025-06-21T00:00:00Z", session_id=session_id)
+        await memory_service.add_message(session_id, msg)
+
+    newest = await memory_service.get_conversation_history_after(session_id, limit=2)
+    assert [m.id for m in newest] == ["3", "4"]
+
+    older = await memory_service.get_conversation_history_after(session_id, cursor="3", limit=2)
+    assert [m.id for m in older] == ["1", "2"]
+
+    unknown = await memory_service.get_conversation_history_after(session_id, cursor="missing", limit=2)
+    assert unknown == []
+
+@pytest.mark.asyncio
+async def test_iter_export_conversation_matches_export(tmp_path):
+    settings = AsyncMock()
+    settings.memory_type = "json"
+    settings.memory_path = str(tmp_path)
+    settings.max_history_messages = 100
+    memory_service = MemoryService()
+    memory_service.settings = settings
+    memory_service._init_json_backend()
+    session_id = "iter_exp_test"
+    for i in range(3):
+        msg = Message(id=str(i), content=f"exp{i}", role="user", timestamp="2025-06-21T00:00:00Z", session_id=session_id)
+        await memory_service.add_message(session_id, msg)
+
+    for format in ["txt", "markdown"]:
+        chunks = [chunk async for chunk in await memory_service.iter_export_conversation(session_id, format)]
+        assert b"".join(chunks).decode() == await memory_service.export_conversation(session_id, format)
+
+    chunks = [chunk async for chunk in await memory_service.iter_export_conversation(session_id, "json")]
+    exported = Conversation.model_validate_json(b"".join(chunks))
+    assert exported.session_id == session_id
+    assert [m.content for m in exported.messages] == ["exp0", "exp1", "exp2"]
+
+    assert await memory_service.iter_export_conversation("no_such_session", "json") is None
+
+@pytest.mark.asyncio
+async def test_get_message_count_cached_and_invalidated(tmp_path):
+    settings = AsyncMock()
+    settings.memory_type = "json"
+    settings.memory_path = str(tmp_path)
+    settings.max_history_messages = 100
+    memory_service = MemoryService()
+    memory_service.settings = settings
+    memory_service._init_json_backend()
+    session_id = "count_test"
+    assert await memory_service.get_message_count(session_id) == 0
+
+    msg = Message(id="1", content="hi", role="user", timestamp="2025-06-21T00:00:00Z", session_id=session_id)
+    await memory_service.add_message(session_id, msg)
+    assert await memory_service.get_message_count(session_id) == 1
+
+    with patch.object(memory_service.storage_backend, "get_message_count", AsyncMock(return_value=42)) as backend_count:
+        assert await memory_service.get_message_count(session_id) == 1
+        backend_count.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_list_conversations_after_keyset(tmp_path):
+    memory_service = MemoryService()
+    memory_service._init_json_backend()
+    memory_service.storage_backend.data_dir = tmp_path
+    for i in range(5):
+        conversation = Conversation(session_id=f"keyset_{i}")
+        conversation.updated_at = datetime(2025, 6, 21, 0, 0, i)
+        await memory_service.save_conversation(conversation)
+
+    first = await memory_service.list_conversations_after(limit=2)
+    assert [c.session_id for c in first] == ["keyset_4", "keyset_3"]
+
+    last = first[-1]
+    rest = await memory_service.list_conversations_after(before=(last.updated_at.timestamp(), last.session_id), limit=10)
+    assert [c.session_id for c in rest] == ["keyset_2", "keyset_1", "keyset_0"]
@@ -0,0 +1,109 @@
+import numpy as np
+from app.utils.semantic_cache import LSHSemanticCache, ProximityCache
+
+
+def test_proximity_cache_hits_near_duplicates():
+    cache = ProximityCache(capacity=4, threshold=0.05)
+    cache.insert([1.0, 0.0, 0.0], "docs-x")
+    cache.insert([0.0, 1.0, 0.0], "docs-y")
+
+    assert cache.lookup([2.0, 0.1, 0.0]) == "docs-x"
+    assert cache.lookup([0.0, 0.0, 1.0]) is None
+
+
+def test_proximity_cache_evicts_least_recently_used():
+    cache = ProximityCache(capacity=2, threshold=0.01)
+    cache.insert(np.array([1.0, 0.0]), "a")
+    cache.insert(np.array([0.0, 1.0]), "b")
+    assert cache.lookup([1.0, 0.0]) == "a"
+
+    cache.insert(np.array([-1.0, 0.0]), "c")
+    assert len(cache) == 2
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.lookup([1.0, 0.0]) == "a"
+    assert cache.lookup([-1.0, 0.0]) == "c"
+
+
+def test_proximity_cache_disabled():
+    cache = ProximityCache(capacity=0, threshold=0.05)
+    cache.insert([1.0, 0.0], "a")
+    assert cache.lookup([1.0, 0.0]) is None
+
+
+def test_lsh_cache_hits_near_duplicates_and_unindexes_evicted():
+    rng = np.random.default_rng(0)
+    cache = LSHSemanticCache(capacity=8, threshold=0.05, tables=8, bits=6)
+    keys = rng.standard_normal((9, 32))
+    for i, key in enumerate(keys[:8]):
+        cache.insert(key, i)
+
+    assert cache.lookup(keys[3] + 0.01 * rng.standard_normal(32)) == 3
+    assert cache.lookup(rng.standard_normal(32)) is None
+
+    # Slot of the least recently used key (0) is reused for key 8
+    for i in range(1, 8):
+        cache.lookup(keys[i])
+    cache.insert(keys[8], 8)
+    assert cache.lookup(keys[0]) is None
+    assert cache.lookup(keys[8]) == 8
+    assert sum(len(bucket) for table in cache._buckets for bucket in table.values()) == 8 * 8
+
+
+def test_argmax_cosine_matches_blas_scan():
+    from app.utils.cache_search import argmax_cosine
+
+    rng = np.random.default_rng(2)
+    keys = rng.standard_normal((40, 16)).astype(np.float32)
+    keys /= np.linalg.norm(keys, axis=1, keepdims=True)
+    q = keys[7] + np.float32(0.01)
+    q /= np.linalg.norm(q)
+
+    idx, similarity = argmax_cosine(keys, q)
+
+    assert idx == int((keys @ q).argmax()) == 7
+    assert abs(similarity - float(keys[7] @ q)) < 1e-5
+
+
+def test_quantized_cache_matches_float_cache():
+    rng = np.random.default_rng(3)
+    keys = rng.standard_normal((16, 64))
+    exact = ProximityCache(capacity=16, threshold=0.05)
+    quantized = LSHSemanticCache(capacity=16, threshold=0.05, tables=4, bits=4, quantize=True)
+    for i, key in enumerate(keys):
+        exact.insert(key, i)
+        quantized.insert(key, i)
+
+    assert quantized._keys.dtype == np.int8
+    for i, key in enumerate(keys):
+        query = key + 0.01 * rng.standard_normal(64)
+        assert quantized.lookup(query) == exact.lookup(query) == i
+    assert quantized.lookup(rng.standard_normal(64)) is None
+
+
+def test_proximity_cache_expires_entries_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.utils.semantic_cache.time.monotonic", lambda: now[0])
+    cache = ProximityCache(capacity=2, threshold=0.05, ttl=10.0)
+    cache.insert([1.0, 0.0], "old")
+    cache.insert([0.0, 1.0], "other")
+
+    now[0] = 105.0
+    assert cache.lookup([1.0, 0.0]) == "old"
+
+    now[0] = 111.0
+    assert cache.lookup([1.0, 0.0]) is None
+    assert len(cache) == 1
+
+    # The expired slot is reused, so "other" is not evicted
+    cache.insert([1.0, 0.0], "new")
+    assert cache.lookup([1.0, 0.0]) == "new"
+    assert len(cache) == 2
+
+
+def test_lsh_cache_hyperplanes_come_from_its_seed():
+    key = np.random.default_rng(4).standard_normal(16)
+    first, second = LSHSemanticCache(4, 0.05, seed=7), LSHSemanticCache(4, 0.05, seed=7)
+    first.insert(key, "a")
+    np.random.seed(123)
+    second.insert(key, "a")
+    assert np.array_equal(first._planes, second._planes)
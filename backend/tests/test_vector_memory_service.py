@@ -75,8 +75,10 @@ async def test_get_or_create_collection(vector_service):
 @pytest.mark.asyncio
 async def test_add_document(vector_service):
     vector_service.collection.add = MagicMock()
+    generation = vector_service.generation
     await vector_service.add_document("test text", {"meta": "data"}, doc_id="doc1")
     vector_service.collection.add.assert_called_once()
+    assert vector_service.generation == generation + 1
     args, kwargs = vector_service.collection.add.call_args
     assert "test text" in kwargs["documents"]
     assert kwargs["metadatas"][0]["meta"] == "data"
@@ -95,8 +97,10 @@ async def test_add_document_auto_id_no_metadata(vector_service):
 @pytest.mark.asyncio
 async def test_add_document_error(vector_service):
     vector_service.collection.add.side_effect = Exception("Chroma add error")
+    generation = vector_service.generation
     with pytest.raises(Exception, match="Chroma add error"):
         await vector_service.add_document("text")
+    assert vector_service.generation == generation
 
 @pytest.mark.asyncio
 async def test_query(vector_service):
@@ -145,3 +149,17 @@ async def test_health_check_error(vector_service):
     health = await vector_service.health_check()
     assert health["status"] == "unhealthy"
     assert "Chroma health error" in health["error"]
+
+@pytest.mark.asyncio
+async def test_query_batch(vector_service):
+    vector_service.collection.query.reset_mock()
+    vector_service.collection.query.side_effect = None
+    vector_service.collection.query.return_value = {
+        "documents": [["doc a"], []],
+        "metadatas": [[{"meta": "a"}], []],
+        "distances": [[0.2], []]
+    }
+    results = await vector_service.query_batch(["first", "second"], top_k=1)
+    vector_service.collection.query.assert_called_once()
+    assert vector_service.collection.query.call_args.kwargs["query_texts"] == ["first", "second"]
+    assert results == [[{"document": "doc a", "metadata": {"meta": "a"}, "distance": 0.2}], []]
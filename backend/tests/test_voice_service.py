@@ -1,12 +1,13 @@
 import pytest
 import asyncio
+import io
 from unittest.mock import AsyncMock, MagicMock, patch
 
 @pytest.fixture
 def voice_service():
     with patch("app.services.voice_service.whisper"), \
          patch("app.services.voice_service.torch"), \
-         patch("app.services.voice_service.aioredis.from_url") as mock_redis_from_url:
+         patch("app.services.voice_service.get_redis_client") as mock_redis_from_url:
         mock_redis = AsyncMock()
         mock_redis_from_url.return_value = mock_redis
         from app.services.voice_service import VoiceService
@@ -30,6 +31,29 @@ async def test_initialize(voice_service):
         assert hasattr(voice_service, "device")
         mock_loop.run_in_executor.assert_awaited_once() # Ensure executor was called
 
+def test_load_model_int8_quantization(voice_service):
+    voice_service.device = "cpu"
+    voice_service.settings = MagicMock(whisper_model="base", whisper_quantization="int8")
+    with patch("app.services.voice_service.whisper") as mock_whisper, \
+         patch("app.services.voice_service.torch") as mock_torch:
+        model = voice_service._load_model()
+
+    mock_whisper.load_model.assert_called_once_with("base", "cpu")
+    mock_torch.quantization.quantize_dynamic.assert_called_once_with(
+        mock_whisper.load_model.return_value, {mock_torch.nn.Linear}, dtype=mock_torch.qint8
+    )
+    assert model is mock_torch.quantization.quantize_dynamic.return_value
+
+def test_load_model_skips_quantization_on_cuda(voice_service):
+    voice_service.device = "cuda"
+    voice_service.settings = MagicMock(whisper_model="base", whisper_quantization="int8")
+    with patch("app.services.voice_service.whisper") as mock_whisper, \
+         patch("app.services.voice_service.torch") as mock_torch:
+        model = voice_service._load_model()
+
+    mock_torch.quantization.quantize_dynamic.assert_not_called()
+    assert model is mock_whisper.load_model.return_value
+
 @pytest.mark.asyncio
 async def test_health_check_healthy(voice_service):
     voice_service.model = MagicMock()
@@ -43,7 +67,7 @@ async def test_health_check_healthy(voice_service):
 async def test_health_check_unhealthy():
     with patch("app.services.voice_service.whisper"), \
          patch("app.services.voice_service.torch"), \
-         patch("app.services.voice_service.aioredis.from_url") as mock_redis_from_url:
+         patch("app.services.voice_service.get_redis_client") as mock_redis_from_url:
         mock_redis = AsyncMock()
         mock_redis_from_url.return_value = mock_redis
         mock_redis.ping.side_effect = Exception("Redis down")
@@ -64,33 +88,39 @@ async def test_transcribe_audio_success(voice_service):
         "segments": [{"avg_logprob": -0.1, "end": 1.0, "start": 0.0}]
     }
     audio_data = b"fake audio"
-    from app.models.voice import AudioFile, VoiceSettings
-    audio_file = AudioFile(filename="test.wav", content_type="audio/wav", size_bytes=len(audio_data))
+    from app.models.voice import AudioFileDTO, VoiceSettings
+    audio_file = AudioFileDTO(filename="test.wav", content_type="audio/wav", size_bytes=len(audio_data))
     voice_settings = VoiceSettings(model="base", language="en")
 
-    with patch("app.services.voice_service.AudioSegment.from_file", return_value=MagicMock(export=MagicMock(), set_frame_rate=MagicMock(return_value=MagicMock(set_channels=MagicMock())))), \
-         patch("app.services.voice_service.tempfile.NamedTemporaryFile", MagicMock(return_value=MagicMock(name="temp.wav", __enter__=MagicMock(return_value=MagicMock(name="temp.wav")), __exit__=MagicMock()))), \
-         patch("app.services.voice_service.os.unlink", MagicMock()):
-        
+    audio_segment = MagicMock(__len__=MagicMock(return_value=1000))
+    whisper_input = MagicMock()
+
+    with patch("app.services.voice_service.AudioSegment.from_file") as mock_from_file, \
+         patch.object(voice_service, "_to_whisper_input", return_value=whisper_input):
+
         voice_service.redis.setex = AsyncMock()
         voice_service.redis.get = AsyncMock(return_value=None) # No initial status
 
-        result = await voice_service.transcribe_audio(audio_data, audio_file, voice_settings)
-    
+        result = await voice_service.transcribe_audio(
+            audio_data, audio_file, voice_settings, audio_segment=audio_segment
+        )
+
     assert result.text == "hello"
     assert result.confidence is not None
+    # The already-decoded segment is reused and handed to Whisper as PCM
+    mock_from_file.assert_not_called()
+    assert voice_service.model.transcribe.call_args.args[0] is whisper_input
     voice_service.redis.setex.assert_called()
 
 @pytest.mark.asyncio
 async def test_transcribe_audio_error(voice_service):
     voice_service.model.transcribe.side_effect = Exception("fail")
     audio_data = b"fake audio"
-    from app.models.voice import AudioFile
-    audio_file = AudioFile(filename="test.wav", content_type="audio/wav", size_bytes=len(audio_data))
+    from app.models.voice import AudioFileDTO
+    audio_file = AudioFileDTO(filename="test.wav", content_type="audio/wav", size_bytes=len(audio_data))
     
-    with patch("app.services.voice_service.AudioSegment.from_file", return_value=MagicMock(export=MagicMock(), set_frame_rate=MagicMock(return_value=MagicMock(set_channels=MagicMock())))), \
-         patch("app.services.voice_service.tempfile.NamedTemporaryFile", MagicMock(return_value=MagicMock(name="temp.wav", __enter__=MagicMock(return_value=MagicMock(name="temp.wav")), __exit__=MagicMock()))), \
-         patch("app.services.voice_service.os.unlink", MagicMock()):
+    with patch("app.services.voice_service.AudioSegment.from_file", return_value=MagicMock()), \
+         patch.object(voice_service, "_to_whisper_input", return_value=MagicMock()):
 
         voice_service.redis.setex = AsyncMock()
         voice_service.redis.get = AsyncMock(return_value=None)
@@ -99,6 +129,22 @@ async def test_transcribe_audio_error(voice_service):
             await voice_service.transcribe_audio(audio_data, audio_file)
         voice_service.redis.setex.assert_called()
 
+@pytest.mark.asyncio
+async def test_transcribe_audio_stream_offsets_segments(voice_service):
+    audio_segment = MagicMock(__len__=MagicMock(return_value=45_000))  # 45s -> two windows
+    results = [
+        {"segments": [{"text": " first ", "start": 0.0, "end": 2.0, "avg_logprob": -0.1}]},
+        {"segments": [{"text": "second", "start": 1.0, "end": 3.0, "avg_logprob": -0.2},
+                      {"text": "  ", "start": 3.0, "end": 4.0}]}
+    ]
+    with patch.object(voice_service, "_transcribe_with_whisper", side_effect=results) as mock_transcribe:
+        segments = [s async for s in voice_service.transcribe_audio_stream(audio_segment)]
+
+    assert mock_transcribe.call_count == 2
+    audio_segment.__getitem__.assert_any_call(slice(30_000, 60_000))
+    assert [s["text"] for s in segments] == ["first", "second"]
+    assert segments[1]["start"] == 31.0 and segments[1]["end"] == 33.0
+
 @pytest.mark.asyncio
 async def test_validate_audio_valid(voice_service):
     # Mock AudioSegment.from_file
@@ -107,6 +153,65 @@ async def test_validate_audio_valid(voice_service):
         result = await voice_service.validate_audio(audio_data, "audio/wav")
         assert result is True
 
+@pytest.mark.asyncio
+async def test_validate_audio_file_object(voice_service):
+    audio_file = io.BytesIO(b"fake audio")
+    audio_file.seek(4)
+    with patch("app.services.voice_service.AudioSegment.from_file", return_value=MagicMock(__len__=MagicMock(return_value=1000))) as mock_from_file:
+        result = await voice_service.validate_audio(audio_file, "audio/wav")
+        assert result is True
+        # The file object is decoded in place, from the start
+        assert mock_from_file.call_args.args[0] is audio_file
+        assert audio_file.tell() == 0
+
+@pytest.mark.asyncio
+async def test_load_audio_returns_decoded_segment(voice_service):
+    audio_segment = MagicMock(__len__=MagicMock(return_value=1000))
+    with patch("app.services.voice_service.AudioSegment.from_file", return_value=audio_segment) as mock_from_file:
+        result = await voice_service.load_audio(b"fake audio", "audio/webm")
+    assert result is audio_segment
+    assert mock_from_file.call_args.kwargs["format"] == "webm"
+
+def test_hash_audio_file_object_matches_bytes():
+    from app.services.voice_service import hash_audio
+    audio_file = io.BytesIO(b"fake audio")
+    audio_file.seek(4)
+    assert hash_audio(audio_file) == hash_audio(b"fake audio")
+    assert audio_file.tell() == 0
+
+@pytest.mark.asyncio
+async def test_transcription_cache_roundtrip(voice_service):
+    from app.models.voice import TranscriptionResult, VoiceSettings
+    voice_service.redis.get = AsyncMock(return_value=None)
+    voice_service.redis.setex = AsyncMock()
+    settings = VoiceSettings(language="en")
+    digest = await voice_service.audio_digest(b"fake audio")
+
+    assert await voice_service.get_cached_transcription(digest, settings) is None
+
+    transcription = TranscriptionResult(text="hello")
+    await voice_service.cache_transcription(digest, transcription, settings)
+    voice_service.redis.setex.assert_awaited_once()
+
+    assert await voice_service.get_cached_transcription(digest, settings) is transcription
+    # Different options are a different cache entry
+    assert await voice_service.get_cached_transcription(digest, VoiceSettings(task="translate")) is None
+
+@pytest.mark.asyncio
+async def test_transcription_cache_key_includes_quantization(voice_service):
+    voice_service.settings = MagicMock(whisper_model="base", whisper_quantization="fp32")
+    fp32_key = voice_service._transcription_key("digest", None)
+    voice_service.settings.whisper_quantization = "int8"
+    assert voice_service._transcription_key("digest", None) != fp32_key
+
+@pytest.mark.asyncio
+async def test_unreadable_cached_transcription_is_a_miss(voice_service):
+    voice_service.redis.get = AsyncMock(return_value=b'{"text": 42, "confidence": "high"}')
+    voice_service.redis.delete = AsyncMock()
+
+    assert await voice_service.get_cached_transcription("digest") is None
+    voice_service.redis.delete.assert_awaited_once_with(voice_service._transcription_key("digest", None))
+
 @pytest.mark.asyncio
 async def test_validate_audio_too_large(voice_service):
     audio_data = b"x" * (26 * 1024 * 1024)  # 26MB
@@ -130,8 +235,8 @@ async def test_validate_audio_too_long(voice_service):
 @pytest.mark.asyncio
 async def test__convert_audio_success(voice_service):
     audio_data = b"fake_mp3_data"
-    from app.models.voice import AudioFile
-    audio_file = AudioFile(filename="test.mp3", content_type="audio/mp3", size_bytes=len(audio_data))
+    from app.models.voice import AudioFileDTO
+    audio_file = AudioFileDTO(filename="test.mp3", content_type="audio/mp3", size_bytes=len(audio_data))
 
     mock_audio_segment = MagicMock()
     mock_audio_segment.set_frame_rate.return_value = mock_audio_segment
@@ -146,8 +251,8 @@ async def test__convert_audio_success(voice_service):
 @pytest.mark.asyncio
 async def test__convert_audio_error(voice_service):
     audio_data = b"invalid_data"
-    from app.models.voice import AudioFile
-    audio_file = AudioFile(filename="test.mp3", content_type="audio/mp3", size_bytes=len(audio_data))
+    from app.models.voice import AudioFileDTO
+    audio_file = AudioFileDTO(filename="test.mp3", content_type="audio/mp3", size_bytes=len(audio_data))
 
     with patch("app.services.voice_service.AudioSegment.from_file", side_effect=Exception("Conversion error")):
         with pytest.raises(ValueError, match="Failed to process audio"):
@@ -235,3 +340,25 @@ async def test_validate_audio_formats(voice_service, content_type, expected_resu
         audio_data = b"fake audio"
         result = await voice_service.validate_audio(audio_data, content_type)
         assert result is expected_result
+
+def test_voice_models_defined_once():
+    import ast
+    import app.models.voice as voice_models
+    with open(voice_models.__file__, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+    assert len(names) == len(set(names))
+
+def test_voice_settings_from_form_fields_are_validated():
+    from fastapi import HTTPException
+    from app.api.routes.voice import _voice_settings
+
+    assert _voice_settings("en", "translate").task == "translate"
+    assert _voice_settings("haitian creole", "transcribe").language == "haitian creole"
+    assert _voice_settings(None, "transcribe").language is None
+    for language in ("en:translate", "x" * 33, "../etc"):
+        with pytest.raises(HTTPException) as exc_info:
+            _voice_settings(language, "transcribe")
+        assert exc_info.value.status_code == 422
+    with pytest.raises(HTTPException):
+        _voice_settings("en", "summarize")
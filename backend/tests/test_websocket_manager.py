@@ -2,6 +2,9 @@ import pytest
 import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from app.models.chat import WebSocketFrame
+
+
 @pytest.fixture
 def ws_manager():
     # Патчим до импорта WebSocketManager
@@ -67,7 +70,7 @@ async def test_get_connection_stats(ws_manager):
 async def test_handle_message_chat(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
-    data = {"type": "chat_message", "data": {"message": "hi"}, "session_id": "s1"}
+    data = WebSocketFrame(type="chat_message", data={"message": "hi"}, session_id="s1")
     ws_manager.broadcast_message = AsyncMock()
     with patch("app.services.websocket_manager.MessageHandlerService") as mock_handler:
         mock_handler().process_message = AsyncMock(return_value={"message": "ok", "message_id": "1", "session_id": "s1", "role": "assistant"})
@@ -79,7 +82,7 @@ async def test_handle_message_chat(ws_manager):
 async def test_handle_message_typing(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
-    data = {"type": "typing", "data": {}, "session_id": "s1"}
+    data = WebSocketFrame(type="typing", data={}, session_id="s1")
     await ws_manager.handle_message(ws, data)
     # Проверяем, что не было ошибок
     assert ws.send_text.call_count >= 1
@@ -88,7 +91,7 @@ async def test_handle_message_typing(ws_manager):
 async def test_handle_message_ping(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
-    data = {"type": "ping", "data": {}, "session_id": "s1"}
+    data = WebSocketFrame(type="ping", data={}, session_id="s1")
     await ws_manager.handle_message(ws, data)
     assert ws.send_text.call_count >= 1
 
@@ -97,7 +100,7 @@ async def test_handle_message_feedback(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
     ws_manager.broadcast_message = AsyncMock()
-    data = {"type": "feedback", "data": {"message_id": "1", "score": "good"}, "session_id": "s1"}
+    data = WebSocketFrame(type="feedback", data={"message_id": "1", "score": "good"}, session_id="s1")
     await ws_manager.handle_message(ws, data)
     assert ws_manager.broadcast_message.await_count >= 1
 
@@ -105,7 +108,7 @@ async def test_handle_message_feedback(ws_manager):
 async def test_handle_message_unknown_type(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
-    data = {"type": "unknown", "data": {}, "session_id": "s1"}
+    data = WebSocketFrame(type="unknown", data={}, session_id="s1")
     await ws_manager.handle_message(ws, data)
     # Должен быть отправлен error
     assert any("Unknown message type" in str(call) for call in ws.send_text.call_args_list)
@@ -115,8 +118,8 @@ async def test_handle_message_invalid_data(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
     # Нет type
-    data = {"data": {}, "session_id": "s1"}
-    await ws_manager.handle_message(ws, data)
+    data = '{"data": {}, "session_id": "s1"}'
+    await ws_manager.handle_raw_message(ws, data)
     # Должен быть отправлен error
     assert ws.send_text.call_count >= 1
 
@@ -144,7 +147,7 @@ async def test_handle_message_error_in_handler(ws_manager):
     ws = MagicMock(); ws.send_text = AsyncMock(); ws.accept = AsyncMock()
     await ws_manager.connect(ws)
     ws_manager.broadcast_message = AsyncMock()
-    data = {"type": "chat_message", "data": {"message": "hi"}, "session_id": "s1"}
+    data = WebSocketFrame(type="chat_message", data={"message": "hi"}, session_id="s1")
     with patch("app.services.websocket_manager.MessageHandlerService") as mock_handler:
         mock_handler().process_message = AsyncMock(side_effect=Exception("fail"))
         await ws_manager.handle_message(ws, data)
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { ChatRequest, ChatResponse, ConversationSummary } from '../types/chat';
+import { ChatRequest, ChatResponse, ConversationList } from '../types/chat';
 import { VoiceResponse } from '../types/voice';
 
 // API Base URL
@@ -53,9 +53,9 @@ export const chatAPI = {
     return response.data;
   },
 
-  async getConversations(page = 1, pageSize = 20): Promise<ConversationSummary[]> {
+  async getConversations(cursor?: string, limit = 20): Promise<ConversationList> {
     const response = await apiClient.get('/api/chat/conversations', {
-      params: { page, page_size: pageSize }
+      params: cursor ? { cursor, limit } : { limit }
     });
     return response.data;
   },
@@ -41,3 +41,9 @@ export interface ConversationSummary {
   updated_at: string;
   last_message_preview?: string;
 }
+
+export interface ConversationList {
+  conversations: ConversationSummary[];
+  has_more: boolean;
+  next_cursor?: string;
+}
@@ -7,7 +7,6 @@ import uvicorn
 import sys
 import os
 from pathlib import Path
-from backend.app.core.config import get_settings
 
 # Add backend to Python path
 backend_path = Path(__file__).parent / "backend"
@@ -17,14 +16,7 @@ if __name__ == "__main__":
     # Change to backend directory
     os.chdir(backend_path)
 
-    settings = get_settings()
+    from app.core.logging import configure_uvicorn
 
     # Run the server
-    uvicorn.run(
-        "app.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.reload,
-        log_level=settings.log_level.lower(),
-        access_log=settings.debug
-    )
+    uvicorn.run("app.main:app", **configure_uvicorn())